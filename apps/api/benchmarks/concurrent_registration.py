@@ -0,0 +1,42 @@
+"""
+Fire parallel registrations for the same phone number and check that exactly
+one succeeds while the rest are rejected with 400 (never a 500).
+
+Runs against whatever DATABASE_URL points at; use a local Postgres to exercise
+the unique index under real concurrency.
+
+Usage:
+    DATABASE_URL=postgresql://... python -m apps.api.benchmarks.concurrent_registration [--workers N]
+"""
+import argparse
+import random
+import sys
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+
+from apps.api.main import app
+
+def run(workers: int) -> int:
+    phone_number = f"+8491{random.randint(1000000, 9999999)}"
+    payload = {"phone_number": phone_number, "full_name": "Race Test", "password": "secret123"}
+
+    with TestClient(app) as client:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            statuses = list(pool.map(
+                lambda _: client.post("/api/auth/register", json=payload).status_code,
+                range(workers)
+            ))
+
+    counts = Counter(statuses)
+    print(f"{phone_number}: {dict(counts)}")
+    ok = counts[201] == 1 and counts[400] == workers - 1
+    print("OK" if ok else "FAIL: expected one 201 and only 400s otherwise")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+    sys.exit(run(args.workers))
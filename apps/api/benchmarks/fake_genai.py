@@ -0,0 +1,66 @@
+"""
+Stand-in for the google-genai client used by the generation services.
+
+Latency and failures are configurable so load tests can model the upstream
+models without network access or cost:
+    FAKE_GENAI_ENHANCE_LATENCY_MS  Gemini generate_content latency (default 300)
+    FAKE_GENAI_IMAGE_LATENCY_MS    Imagen generate/edit latency (default 1500)
+    FAKE_GENAI_JITTER              +/- fraction applied to latencies (default 0.2)
+    FAKE_GENAI_ERROR_RATE          probability that a call raises (default 0)
+    FAKE_GENAI_EDIT_UNSUPPORTED    "1" to make edit_image fail and exercise the fallback
+"""
+from types import SimpleNamespace
+import io
+import os
+import random
+import time
+from PIL import Image
+
+ENHANCE_LATENCY = float(os.getenv("FAKE_GENAI_ENHANCE_LATENCY_MS", "300")) / 1000
+IMAGE_LATENCY = float(os.getenv("FAKE_GENAI_IMAGE_LATENCY_MS", "1500")) / 1000
+JITTER = float(os.getenv("FAKE_GENAI_JITTER", "0.2"))
+ERROR_RATE = float(os.getenv("FAKE_GENAI_ERROR_RATE", "0"))
+EDIT_UNSUPPORTED = os.getenv("FAKE_GENAI_EDIT_UNSUPPORTED") == "1"
+
+def _png_bytes(size: int = 256) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (size, size), (178, 34, 52)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+_IMAGE = _png_bytes()
+
+class FakeUpstreamError(RuntimeError):
+    pass
+
+def _simulate(latency: float):
+    time.sleep(max(0.0, latency * random.uniform(1 - JITTER, 1 + JITTER)))
+    if random.random() < ERROR_RATE:
+        raise FakeUpstreamError("Injected upstream failure")
+
+def _images_response():
+    return SimpleNamespace(generated_images=[SimpleNamespace(image=SimpleNamespace(image_bytes=_IMAGE))])
+
+class _FakeModels:
+    def generate_content(self, model, contents, config=None):
+        _simulate(ENHANCE_LATENCY)
+        return SimpleNamespace(text=f"Seamless bandana pattern, flat vector style: {contents}")
+
+    def generate_images(self, model, prompt, config=None):
+        _simulate(IMAGE_LATENCY)
+        return _images_response()
+
+    def edit_image(self, model, prompt, image=None, mask=None, config=None):
+        if EDIT_UNSUPPORTED:
+            raise FakeUpstreamError("edit_image not supported")
+        _simulate(IMAGE_LATENCY)
+        return _images_response()
+
+class FakeClient:
+    def __init__(self, api_key=None, **kwargs):
+        self.models = _FakeModels()
+
+def install():
+    """Replace google.genai.Client for this process; call before serving requests"""
+    from google import genai
+    genai.Client = FakeClient
+    os.environ.setdefault("GEMINI_API_KEY", "fake-key")
@@ -0,0 +1,103 @@
+"""
+Import-time profile of the API and worker entry modules, with a startup budget.
+
+Each module is imported in a fresh interpreter under `python -X importtime`;
+the best of --runs is reported as the total, along with the packages and
+modules that cost the most. With --check the run fails when a module goes over
+its budget_ms in import_budget.json or pulls in one of its "forbidden" modules
+(heavy SDKs that are meant to load lazily). The forbidden list is the portable
+check; budget_ms depends on the hardware, so refresh it with --update-budget
+on the machine that runs the check.
+
+Usage:
+    DATABASE_URL=sqlite:///bench.db python -m apps.api.benchmarks.import_time [--check] [--runs 5]
+"""
+from pathlib import Path
+import argparse
+import json
+import math
+import re
+import subprocess
+import sys
+
+BUDGET_FILE = Path(__file__).with_name("import_budget.json")
+BUDGET_HEADROOM = 1.5
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+def profile(module: str) -> list[tuple[str, int, int, int]]:
+    """(name, self_us, cumulative_us, depth) for every module imported by `import module`"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr[-2000:]}")
+    rows = []
+    for line in completed.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            rows.append((match[4], int(match[1]), int(match[2]), len(match[3]) // 2))
+    return rows
+
+def total_ms(rows, module: str) -> float:
+    return next(cumulative for name, _, cumulative, _ in rows if name == module) / 1000
+
+def by_package(rows) -> list[tuple[str, float]]:
+    packages: dict[str, int] = {}
+    for name, self_us, _, _ in rows:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+    return sorted(((package, us / 1000) for package, us in packages.items()), key=lambda item: -item[1])
+
+def report(module: str, rows, top: int):
+    print(f"\n{module}: {total_ms(rows, module):.0f} ms, {len(rows)} modules")
+    print("  heaviest packages (self time):")
+    for package, ms in by_package(rows)[:top]:
+        print(f"    {ms:8.1f} ms  {package}")
+    print("  heaviest first-party modules (cumulative):")
+    own = sorted((row for row in rows if row[0].startswith("apps.") and row[0] != module), key=lambda row: -row[2])
+    for name, _, cumulative, _ in own[:top]:
+        print(f"    {cumulative / 1000:8.1f} ms  {name}")
+
+def check(module: str, rows, budget: dict) -> list[str]:
+    problems = []
+    elapsed = total_ms(rows, module)
+    if budget.get("budget_ms") and elapsed > budget["budget_ms"]:
+        problems.append(f"{module} took {elapsed:.0f} ms to import, budget is {budget['budget_ms']} ms")
+    imported = {name for name, _, _, _ in rows}
+    for forbidden in budget.get("forbidden", []):
+        if any(name == forbidden or name.startswith(forbidden + ".") for name in imported):
+            problems.append(f"{module} imports {forbidden} at load time")
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", action="append", help="Entry module to profile (default: all in the budget file)")
+    parser.add_argument("--runs", type=int, default=3, help="Imports per module; the fastest counts")
+    parser.add_argument("--top", type=int, default=12)
+    parser.add_argument("--check", action="store_true", help="Exit non-zero on a budget or forbidden-import violation")
+    parser.add_argument("--update-budget", action="store_true", help=f"Set budget_ms to {BUDGET_HEADROOM}x the measured time")
+    args = parser.parse_args()
+
+    budgets = json.loads(BUDGET_FILE.read_text())
+    problems = []
+    for module in args.module or list(budgets):
+        rows = min((profile(module) for _ in range(args.runs)), key=lambda rows: total_ms(rows, module))
+        report(module, rows, args.top)
+        if args.update_budget:
+            budgets.setdefault(module, {})["budget_ms"] = math.ceil(total_ms(rows, module) * BUDGET_HEADROOM)
+        problems += check(module, rows, budgets.get(module, {}))
+
+    if args.update_budget:
+        BUDGET_FILE.write_text(json.dumps(budgets, indent=2) + "\n")
+        print(f"\nUpdated {BUDGET_FILE.name}")
+    if problems:
+        print("\nStartup budget exceeded:")
+        for problem in problems:
+            print(f"  - {problem}")
+        if args.check:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
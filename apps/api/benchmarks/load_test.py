@@ -0,0 +1,235 @@
+"""
+Mixed-workload load test for the API.
+
+Starts `apps.api.benchmarks.serve` (fake genai backend, seeded catalog) unless
+--target points at a running server, drives a weighted mix of catalog browse,
+search, filter, detail, login, generation and edit requests from concurrent
+virtual users, and reports throughput and p50/p95/p99 per scenario.
+
+Results are written as JSON; --save-baseline keeps them as the reference and
+--compare fails (exit 1) when p95/p99 regress beyond --tolerance.
+
+Usage:
+    python -m apps.api.benchmarks.load_test --duration 30 --users 20
+    python -m apps.api.benchmarks.load_test --save-baseline
+    python -m apps.api.benchmarks.load_test --compare apps/api/benchmarks/results/baseline.json
+"""
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+import argparse
+import asyncio
+import base64
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import httpx
+
+from apps.api.benchmarks.serve import BENCH_PASSWORD, SEARCH_WORDS, bench_phone
+
+RESULTS_DIR = Path(__file__).parent / "results"
+DEFAULT_MIX = "browse=40,search=15,filter=15,detail=15,login=10,generate=3,edit=2"
+
+def _tiny_png_base64() -> str:
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new("L", (64, 64), 255).save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode()
+
+class Workload:
+    def __init__(self, client: httpx.AsyncClient, users: int):
+        self.client = client
+        self.users = users
+        self.product_ids: list[str] = []
+        self.category_ids: list[str] = []
+        self.image_base64 = _tiny_png_base64()
+
+    async def prepare(self):
+        response = await self.client.get("/api/products", params={"page_size": 100})
+        response.raise_for_status()
+        self.product_ids = [p["id"] for p in response.json()["products"]]
+        response = await self.client.get("/api/categories")
+        response.raise_for_status()
+        self.category_ids = [c["id"] for c in response.json()]
+
+    def browse(self):
+        return self.client.get("/api/products", params={"page": random.randint(1, 5), "page_size": 20})
+
+    def search(self):
+        return self.client.get("/api/products", params={"search": random.choice(SEARCH_WORDS)})
+
+    def filter(self):
+        return self.client.get("/api/products", params={
+            "category_id": random.choice(self.category_ids),
+            "min_price": 10,
+            "max_price": 40,
+            "sort_by": "price",
+        })
+
+    def detail(self):
+        return self.client.get(f"/api/products/{random.choice(self.product_ids)}")
+
+    def login(self):
+        return self.client.post("/api/auth/login", json={
+            "phone_number": bench_phone(random.randrange(self.users)),
+            "password": BENCH_PASSWORD,
+        })
+
+    def generate(self):
+        return self.client.post("/api/generation", json={"prompt": f"{random.choice(SEARCH_WORDS)} bandana"})
+
+    def edit(self):
+        return self.client.post("/api/generation/edit", json={
+            "image_base64": self.image_base64,
+            "mask_base64": self.image_base64,
+            "prompt": "add a red border",
+        })
+
+def parse_mix(mix: str) -> dict[str, int]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = int(weight)
+    return weights
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+async def run_load(target: str, mix: dict[str, int], concurrency: int, duration: float, users: int) -> dict:
+    samples: dict[str, list[tuple[float, bool]]] = {name: [] for name in mix}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=target, timeout=120, limits=limits) as client:
+        workload = Workload(client, users)
+        await workload.prepare()
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        deadline = time.perf_counter() + duration
+
+        async def virtual_user():
+            while time.perf_counter() < deadline:
+                name = random.choices(names, weights)[0]
+                start = time.perf_counter()
+                try:
+                    response = await getattr(workload, name)()
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                samples[name].append((time.perf_counter() - start, ok))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(virtual_user() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    scenarios = {}
+    for name, entries in samples.items():
+        latencies = sorted(latency for latency, _ in entries)
+        scenarios[name] = {
+            "requests": len(entries),
+            "errors": sum(1 for _, ok in entries if not ok),
+            "throughput_rps": round(len(entries) / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        }
+    return {"elapsed_s": round(elapsed, 2), "scenarios": scenarios}
+
+def print_report(results: dict):
+    print(f"{'scenario':<10} {'reqs':>7} {'errs':>5} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, s in results["scenarios"].items():
+        print(f"{name:<10} {s['requests']:>7} {s['errors']:>5} {s['throughput_rps']:>8} "
+              f"{s['p50_ms']:>9} {s['p95_ms']:>9} {s['p99_ms']:>9}")
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Return regressions where p95/p99 grew by more than tolerance (a fraction) over the baseline"""
+    regressions = []
+    for name, current in results["scenarios"].items():
+        previous = baseline["scenarios"].get(name)
+        if not previous or not current["requests"]:
+            continue
+        for metric in ("p95_ms", "p99_ms"):
+            if previous[metric] and current[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{name} {metric}: {previous[metric]} -> {current[metric]} "
+                    f"(+{(current[metric] / previous[metric] - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def start_server(port: int, products: int, users: int) -> subprocess.Popen:
+    env = {"DATABASE_URL": "sqlite:///bench.db", "LOG_LEVEL": "WARNING", **os.environ}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "apps.api.benchmarks.serve", "--port", str(port),
+         "--products", str(products), "--users", str(users)],
+        env=env
+    )
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Benchmark server exited during startup")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("Benchmark server did not become healthy in time")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", help="Base URL of a running server; omit to start one locally")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent virtual users")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Scenario weights, e.g. browse=50,login=10")
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--users", type=int, default=50, help="Seeded accounts used by the login scenario")
+    parser.add_argument("--output", type=Path, default=RESULTS_DIR / "latest.json")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", type=Path, help="Baseline results JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95/p99 growth, as a fraction")
+    args = parser.parse_args()
+
+    server = None if args.target else start_server(args.port, args.products, args.users)
+    target = args.target or f"http://127.0.0.1:{args.port}"
+    try:
+        results = asyncio.run(run_load(target, parse_mix(args.mix), args.concurrency, args.duration, args.users))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    results.update({
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {"concurrency": args.concurrency, "duration": args.duration, "mix": args.mix},
+    })
+    print_report(results)
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(results, indent=2))
+    if args.save_baseline:
+        (RESULTS_DIR / "baseline.json").write_text(json.dumps(results, indent=2))
+
+    if args.compare:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Micro-benchmark for phone number validation in the auth schemas.
+
+Compares the uncached phonenumbers parse/validate/format sequence with the
+memoized normalizer and with full LoginRequest validation.
+
+Usage:
+    python -m apps.api.benchmarks.phone_validation [--iterations N]
+"""
+import argparse
+import timeit
+
+import phonenumbers
+
+from apps.api.modules.auth.phone import normalize_phone_number, phone_cache_info
+from apps.api.modules.auth.schemas import LoginRequest
+
+SAMPLE_NUMBERS = [
+    "+84912345678",
+    "+84987654321",
+    "+14155552671",
+    "+442071838750",
+    "+819012345678",
+]
+
+def uncached(phone_number: str) -> str:
+    parsed = phonenumbers.parse(phone_number, None)
+    if not phonenumbers.is_valid_number(parsed):
+        raise ValueError("Invalid phone number")
+    return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
+
+def run(iterations: int) -> None:
+    cases = {
+        "uncached phonenumbers": lambda: [uncached(n) for n in SAMPLE_NUMBERS],
+        "normalize_phone_number": lambda: [normalize_phone_number(n) for n in SAMPLE_NUMBERS],
+        "LoginRequest validation": lambda: [
+            LoginRequest(phone_number=n, password="secret") for n in SAMPLE_NUMBERS
+        ],
+    }
+    calls = iterations * len(SAMPLE_NUMBERS)
+    for name, fn in cases.items():
+        seconds = timeit.timeit(fn, number=iterations)
+        print(f"{name:<26} {seconds / calls * 1e6:8.2f} us/call")
+    print(f"cache: {phone_cache_info()}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    run(args.iterations)
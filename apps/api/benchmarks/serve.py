@@ -0,0 +1,77 @@
+"""
+Boot the API with the fake genai backend and a seeded catalog for load testing.
+
+Set IMAGE_PROVIDER=local to use the procedural provider instead of the genai
+stand-in.
+
+Usage:
+    DATABASE_URL=sqlite:///bench.db python -m apps.api.benchmarks.serve [--port 8765]
+"""
+import argparse
+import random
+
+from apps.api.benchmarks import fake_genai
+
+BENCH_PASSWORD = "bench-password"
+SEARCH_WORDS = ["paisley", "floral", "geometric", "western", "skull", "wave", "camo", "tribal"]
+
+def bench_phone(index: int) -> str:
+    return f"+8491{index:07d}"
+
+def seed(products: int, users: int):
+    """Create bench users and products unless an earlier run already did"""
+    from apps.api.main import app  # noqa: F401 - registers every model on Base
+    from apps.api.modules.auth.database import SessionLocal, init_db
+    from apps.api.modules.auth.models import User
+    from apps.api.modules.auth.service import hash_password
+    from apps.api.modules.products.models import Product, ProductCategory, Collection, Tag
+    from apps.api.modules.products.facets import rebuild
+
+    init_db()
+    db = SessionLocal()
+    try:
+        if db.query(Product).count() >= products:
+            return
+
+        rng = random.Random(42)
+        hashed = hash_password(BENCH_PASSWORD)
+        db.add_all(User(phone_number=bench_phone(i), full_name=f"Bench User {i}", hashed_password=hashed)
+                   for i in range(users))
+
+        categories = [ProductCategory(name=f"Bench {word.title()}") for word in SEARCH_WORDS]
+        collections = [Collection(name=f"Bench Collection {year}", year=year) for year in range(2020, 2026)]
+        tags = [Tag(name=f"bench-{word}") for word in SEARCH_WORDS]
+        db.add_all(categories + collections + tags)
+
+        for i in range(products):
+            word = rng.choice(SEARCH_WORDS)
+            db.add(Product(
+                name=f"{word.title()} Bandana {i}",
+                description=f"A {word} bandana for load testing",
+                price=round(rng.uniform(5, 60), 2),
+                category=rng.choice(categories),
+                collection=rng.choice(collections),
+                tags=rng.sample(tags, 2),
+                stock=rng.randint(0, 100)
+            ))
+        db.commit()
+        rebuild(db) # Seeded rows bypass ProductService, so recount them
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--users", type=int, default=50)
+    args = parser.parse_args()
+
+    fake_genai.install()
+    seed(args.products, args.users)
+
+    import uvicorn
+    uvicorn.run("apps.api.main:app", host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""
+Shared test setup. Settings are read from the environment at import time, so
+the database and media paths point at a throwaway directory before any app
+module loads.
+"""
+import os
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix="genwear-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/test.db"
+os.environ["MEDIA_ROOT"] = os.path.join(_tmp, "media")
+
+import pytest
+
+@pytest.fixture
+def db():
+    from apps.api.modules.auth.database import SessionLocal, init_db
+    import apps.api.modules.products.models  # noqa: F401 - registers the catalog tables
+    init_db()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
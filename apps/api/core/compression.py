@@ -0,0 +1,169 @@
+"""
+Response compression negotiated from Accept-Encoding: brotli when the client
+takes it and the brotli package is installed, otherwise gzip.
+
+Only complete bodies of text-like types are compressed, each type with its own
+minimum size; images and other binary types, event streams, streamed bodies
+and responses that already carry a Content-Encoding go out untouched. Large
+bodies are probed first: a sample is compressed and, when it doesn't shrink
+below COMPRESSION_MAX_RATIO, the body is sent as-is. That is what keeps the
+base64 image payloads of the generation routes (about 0.76 under gzip) from
+costing CPU for little gain, while catalog and user lists (0.1-0.3) shrink.
+Bodies above COMPRESSION_THREADPOOL_BYTES are compressed on the threadpool so
+the event loop keeps serving.
+"""
+from typing import Optional
+import gzip
+import os
+import zlib
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from apps.api.core.metrics import RESPONSE_COMPRESSION
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_MAX_RATIO = float(os.getenv("COMPRESSION_MAX_RATIO", "0.7"))
+COMPRESSION_PROBE_BYTES = int(os.getenv("COMPRESSION_PROBE_BYTES", "16384"))
+COMPRESSION_THREADPOOL_BYTES = int(os.getenv("COMPRESSION_THREADPOOL_BYTES", "65536"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+# Brotli's default quality (11) is meant for static assets; 4 beats gzip -6 at a similar cost
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+# Media type -> smallest body worth compressing; anything not listed is never compressed
+MIN_BYTES_BY_TYPE = {
+    "application/json": COMPRESSION_MIN_BYTES,
+    "application/problem+json": COMPRESSION_MIN_BYTES,
+    "application/javascript": COMPRESSION_MIN_BYTES,
+    "application/xml": COMPRESSION_MIN_BYTES,
+    "image/svg+xml": COMPRESSION_MIN_BYTES,
+    "text/html": COMPRESSION_MIN_BYTES,
+    "text/plain": COMPRESSION_MIN_BYTES,  # Includes the Prometheus exposition format
+    "text/css": COMPRESSION_MIN_BYTES,
+    "text/csv": COMPRESSION_MIN_BYTES,
+}
+
+def _compress_gzip(body: bytes) -> bytes:
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0)
+
+def _compress_brotli(body: bytes) -> bytes:
+    return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+
+ENCODERS = {"gzip": _compress_gzip}
+if brotli is not None:
+    ENCODERS["br"] = _compress_brotli
+
+# Preferred first when the client weighs several encodings equally
+_PREFERENCE = ("br", "gzip")
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """The encoding to use for an Accept-Encoding header, or None for identity"""
+    weights: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding] = q
+    best, best_q = None, 0.0
+    for coding in _PREFERENCE:
+        if coding not in ENCODERS:
+            continue
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+def worth_compressing(body: bytes) -> bool:
+    """Probe a slice from the middle of a large body with a fast compressor"""
+    if len(body) <= COMPRESSION_PROBE_BYTES * 2:
+        return True
+    middle = len(body) // 2
+    sample = body[middle - COMPRESSION_PROBE_BYTES // 2:middle + COMPRESSION_PROBE_BYTES // 2]
+    return len(zlib.compress(sample, 1)) / len(sample) < COMPRESSION_MAX_RATIO
+
+def _min_bytes(headers: Headers) -> Optional[int]:
+    if "content-encoding" in headers:
+        return None
+    media_type = headers.get("content-type", "").split(";")[0].strip().lower()
+    return MIN_BYTES_BY_TYPE.get(media_type)
+
+class CompressionMiddleware:
+    """Pure ASGI middleware compressing complete text-like response bodies"""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        min_bytes = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, min_bytes, passthrough
+            if message["type"] == "http.response.start":
+                min_bytes = _min_bytes(Headers(raw=message["headers"]))
+                if min_bytes is None:
+                    passthrough = True
+                    await send(message)
+                    return
+                start_message = message  # Held until the body shows whether it's worth compressing
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            body = message.get("body", b"")
+            if message.get("more_body", False):
+                # Streamed bodies (downloads, event streams) go out as they are produced
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            if len(body) < min_bytes:
+                outcome = "too_small"
+            elif len(body) > COMPRESSION_THREADPOOL_BYTES:
+                compressed = await run_in_threadpool(self._compress, body, encoding)
+                outcome = encoding if compressed is not None else "incompressible"
+            else:
+                compressed = self._compress(body, encoding)
+                outcome = encoding if compressed is not None else "incompressible"
+            RESPONSE_COMPRESSION.labels(outcome).inc()
+
+            if outcome == encoding:
+                body = compressed
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body, "more_body": False})
+
+        await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    def _compress(body: bytes, encoding: str) -> Optional[bytes]:
+        """Compressed body, or None when the probe says it isn't worth it"""
+        if not worth_compressing(body):
+            return None
+        return ENCODERS[encoding](body)
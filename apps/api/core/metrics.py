@@ -0,0 +1,180 @@
+"""
+Prometheus metrics for the API: per-route latency, upstream model call timings,
+per-request SQLAlchemy query counts/durations and threadpool saturation.
+
+Set PROMETHEUS_MULTIPROC_DIR when running several worker processes so /metrics
+aggregates across them. In that mode gauges are read from what each process last
+wrote, so they are set explicitly (by the queues themselves, or at scrape time
+for the threadpool) rather than computed by callbacks, which only the scraped
+process would run.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+import os
+import time
+import anyio.to_thread
+from fastapi import Response
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from opentelemetry.trace import SpanKind
+from apps.api.core.tracing import tracer
+
+if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    # Metric files are created as metrics are defined below; a single uvicorn process has no hook that made the directory
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests currently being served",
+    ["method"], multiprocess_mode="livesum"
+)
+MODEL_CALL_LATENCY = Histogram(
+    "upstream_model_call_duration_seconds", "Latency of calls to upstream AI models",
+    ["operation", "model", "outcome"], buckets=LATENCY_BUCKETS
+)
+EDIT_FALLBACKS = Counter(
+    "generation_edit_fallbacks_total", "Region edits that fell back to full regeneration",
+    ["provider"]
+)
+PROMPT_CACHE_LOOKUPS = Counter(
+    "prompt_cache_lookups_total", "Semantic prompt cache lookups",
+    ["cache", "result"]
+)
+GENERATION_QUOTA_REJECTIONS = Counter(
+    "generation_quota_rejections_total", "Generation requests turned away by the scheduler",
+    ["reason"]
+)
+AUDIT_FORWARD_FAILURES = Counter(
+    "audit_buffer_forward_failures_total", "Flushes that couldn't move locally queued audit events to Redis"
+)
+RESPONSE_COMPRESSION = Counter(
+    "http_response_compression_total", "Response bodies seen by the compression middleware, by outcome",
+    ["outcome"]
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "Latency of individual SQL statements",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request", "SQL statements executed per HTTP request",
+    ["route"], buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "db_time_per_request_seconds", "Total SQL time per HTTP request",
+    ["route"], buckets=LATENCY_BUCKETS
+)
+THREADPOOL_IN_USE = Gauge(
+    "threadpool_threads_in_use", "Worker threads busy running sync endpoints and dependencies",
+    multiprocess_mode="livesum"
+)
+THREADPOOL_LIMIT = Gauge(
+    "threadpool_threads_limit", "Size of the threadpool for sync endpoints",
+    multiprocess_mode="livesum"
+)
+QUEUE_DEPTH = Gauge(
+    "background_queue_depth", "Items waiting in in-process background queues",
+    ["queue"], multiprocess_mode="livesum"
+)
+
+class _RequestStats:
+    __slots__ = ("db_queries", "db_time")
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_time = 0.0
+
+# Shared by reference with threadpool copies of the request context
+_request_stats: ContextVar[Optional[_RequestStats]] = ContextVar("request_stats", default=None)
+
+def instrument_engine(engine: Engine):
+    """Time every statement on the engine and attribute it to the current request"""
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+        DB_QUERY_LATENCY.observe(elapsed)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.db_queries += 1
+            stats.db_time += elapsed
+
+@contextmanager
+def track_model_call(operation: str, model: str):
+    """Time an upstream model call, labelled by operation, model and outcome, inside a trace span"""
+    start = time.perf_counter()
+    outcome = "error"
+    with tracer.start_as_current_span(
+        f"genai.{operation}", kind=SpanKind.CLIENT,
+        attributes={"genai.operation": operation, "genai.model": model}
+    ):
+        try:
+            yield
+            outcome = "success"
+        finally:
+            MODEL_CALL_LATENCY.labels(operation, model, outcome).observe(time.perf_counter() - start)
+
+def _route_label(scope) -> str:
+    # Use the route template, never the raw path, to keep label cardinality bounded
+    route = scope.get("route")
+    return getattr(route, "path", "unmatched")
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording request latency and per-request DB usage"""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = _RequestStats()
+        token = _request_stats.set(stats)
+        in_progress = REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_progress.dec()
+            route = _route_label(scope)
+            REQUEST_LATENCY.labels(method, route, str(status_code)).observe(elapsed)
+            DB_QUERIES_PER_REQUEST.labels(route).observe(stats.db_queries)
+            DB_TIME_PER_REQUEST.labels(route).observe(stats.db_time)
+            _request_stats.reset(token)
+
+async def metrics_response() -> Response:
+    """Render all metrics in the Prometheus text format"""
+    # The default limiter is bound to the event loop, so sample it here rather than in a callback
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    THREADPOOL_IN_USE.set(limiter.borrowed_tokens)
+    THREADPOOL_LIMIT.set(limiter.total_tokens)
+
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,54 @@
+"""
+Gunicorn worker class for production: uvicorn with uvloop and httptools, and a
+bounded wait for open connections on shutdown. Configured by gunicorn.conf.py.
+
+On SIGTERM the worker turns /health/ready to 503 straight away and keeps
+serving for SERVER_DRAIN_DELAY_SECONDS before uvicorn closes its listener, so
+load balancers see the worker draining and stop routing to it rather than
+finding the port refused. The app's shutdown hook only runs after the listener
+is closed and open connections are done, which is too late for that.
+"""
+import asyncio
+import os
+import signal
+import sys
+from typing import Optional
+from gunicorn.arbiter import Arbiter
+from uvicorn.server import Server
+from uvicorn.workers import UvicornWorker
+
+SERVER_DRAIN_DELAY_SECONDS = float(os.getenv("SERVER_DRAIN_DELAY_SECONDS", "5"))
+
+class DrainingServer(Server):
+    def __init__(self, config):
+        super().__init__(config)
+        self._drain_timer: Optional[asyncio.TimerHandle] = None
+
+    def handle_exit(self, sig, frame):
+        from apps.api.modules.health.service import lifecycle
+        lifecycle.mark_draining()
+        if sig != signal.SIGTERM or self._drain_timer is not None or SERVER_DRAIN_DELAY_SECONDS <= 0:
+            # SIGINT, a repeated SIGTERM or no delay configured: stop as uvicorn would
+            super().handle_exit(sig, frame)
+            return
+        self._drain_timer = asyncio.get_running_loop().call_later(
+            SERVER_DRAIN_DELAY_SECONDS, super().handle_exit, sig, frame
+        )
+
+class ProductionUvicornWorker(UvicornWorker):
+    CONFIG_KWARGS = {
+        "loop": os.getenv("SERVER_LOOP", "uvloop"),
+        "http": os.getenv("SERVER_HTTP", "httptools"),
+        # Long-lived SSE streams would otherwise hold shutdown until gunicorn kills the worker;
+        # clients reconnect with Last-Event-ID to another replica
+        "timeout_graceful_shutdown": int(os.getenv("SERVER_DRAIN_SECONDS", "60")),
+    }
+
+    async def _serve(self) -> None:
+        # UvicornWorker._serve with the draining server in place of uvicorn's
+        self.config.app = self.wsgi
+        server = DrainingServer(config=self.config)
+        self._install_sigquit_handler()
+        await server.serve(sockets=self.sockets)
+        if not server.started:
+            sys.exit(Arbiter.WORKER_BOOT_ERROR)
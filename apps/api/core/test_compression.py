@@ -0,0 +1,88 @@
+import base64
+import gzip
+import os
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from apps.api.core import compression
+from apps.api.core.compression import CompressionMiddleware, negotiate, worth_compressing
+
+LIST_BODY = b'{"products": [' + b",".join(b'{"name": "Paisley Bandana", "price": 12.5}' for _ in range(200)) + b"]}"
+PNG_LIKE = os.urandom(4096)
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware)
+
+@app.get("/list")
+def listing():
+    return Response(LIST_BODY, media_type="application/json")
+
+@app.get("/small")
+def small():
+    return Response(b'{"ok": true}', media_type="application/json")
+
+@app.get("/image")
+def image():
+    return Response(PNG_LIKE * 4, media_type="image/png")
+
+@app.get("/encoded")
+def encoded():
+    return Response(gzip.compress(LIST_BODY), media_type="application/json", headers={"Content-Encoding": "gzip"})
+
+@app.get("/base64")
+def base64_payload():
+    data_uri = "data:image/png;base64," + base64.b64encode(os.urandom(200_000)).decode()
+    return Response(f'{{"url": "{data_uri}"}}'.encode(), media_type="application/json")
+
+@app.get("/stream")
+def stream():
+    return StreamingResponse(iter([b"data: 1\n\n", b"data: 2\n\n"]), media_type="text/event-stream")
+
+client = TestClient(app)
+
+def _get(path: str, accept: str = "gzip"):
+    # stream() keeps the body as sent, so the test sees the encoded bytes
+    with client.stream("GET", path, headers={"Accept-Encoding": accept}) as response:
+        return response, b"".join(response.iter_raw())
+
+def test_json_list_is_gzipped():
+    response, raw = _get("/list")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-length"] == str(len(raw))
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert gzip.decompress(raw) == LIST_BODY
+    assert len(raw) < len(LIST_BODY) / 5
+
+@pytest.mark.parametrize("path", ["/image", "/stream"])
+def test_images_and_streamed_bodies_pass_through(path):
+    response, raw = _get(path)
+    assert "content-encoding" not in response.headers
+    assert raw == (PNG_LIKE * 4 if path == "/image" else b"data: 1\n\ndata: 2\n\n")
+
+def test_already_encoded_bodies_are_not_compressed_twice():
+    response, raw = _get("/encoded")
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(raw) == LIST_BODY
+
+def test_small_and_identity_responses_are_left_alone():
+    response, raw = _get("/small")
+    assert "content-encoding" not in response.headers and raw == b'{"ok": true}'
+    response, raw = _get("/list", accept="identity")
+    assert "content-encoding" not in response.headers and raw == LIST_BODY
+
+def test_base64_image_payloads_are_not_worth_compressing():
+    response, _ = _get("/base64")
+    assert "content-encoding" not in response.headers
+    assert not worth_compressing(base64.b64encode(os.urandom(200_000)))
+    assert worth_compressing(LIST_BODY * 20)
+
+def test_negotiation_follows_q_values(monkeypatch):
+    monkeypatch.setitem(compression.ENCODERS, "br", lambda body: body)
+    assert negotiate("gzip, br") == "br"
+    assert negotiate("br;q=0.4, gzip") == "gzip"
+    assert negotiate("*;q=0.5, gzip;q=0.2") == "br"
+    assert negotiate("gzip;q=0, br;q=0") is None
+    assert negotiate("") is None
+    monkeypatch.delitem(compression.ENCODERS, "br")
+    assert negotiate("br") is None
@@ -0,0 +1,37 @@
+import json
+import logging
+import queue
+import sys
+from apps.api.core.logging_config import DroppingQueueHandler, JsonFormatter
+
+def _through_queue(log_queue: queue.Queue, handler: DroppingQueueHandler, record: logging.LogRecord) -> logging.LogRecord:
+    handler.handle(record)
+    return log_queue.get_nowait()
+
+def _error_record() -> logging.LogRecord:
+    logger = logging.getLogger("test")
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        return logger.makeRecord("test", logging.ERROR, __file__, 1, "failed for %s", ("p1",), sys.exc_info())
+
+def test_json_keeps_the_traceback_as_its_own_field():
+    log_queue = queue.Queue()
+    queued = _through_queue(log_queue, DroppingQueueHandler(log_queue), _error_record())
+    payload = json.loads(JsonFormatter().format(queued))
+    assert payload["message"] == "failed for p1"
+    assert "Traceback" in payload["exc_info"] and "ValueError: boom" in payload["exc_info"]
+    assert queued.exc_info is None # The traceback object doesn't cross the queue
+
+def test_text_format_still_shows_the_traceback():
+    log_queue = queue.Queue()
+    queued = _through_queue(log_queue, DroppingQueueHandler(log_queue), _error_record())
+    text = logging.Formatter("%(message)s").format(queued)
+    assert text.startswith("failed for p1\n") and "ValueError: boom" in text
+
+def test_full_queue_drops_instead_of_blocking():
+    log_queue = queue.Queue(maxsize=1)
+    handler = DroppingQueueHandler(log_queue)
+    for _ in range(3):
+        handler.handle(logging.LogRecord("test", logging.INFO, __file__, 1, "x", None, None))
+    assert handler.dropped == 2
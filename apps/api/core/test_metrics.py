@@ -0,0 +1,55 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+from apps.api.core.metrics import MetricsMiddleware, instrument_engine, metrics_response, track_model_call
+
+engine = create_engine("sqlite://")
+instrument_engine(engine)
+
+app = FastAPI()
+app.add_middleware(MetricsMiddleware)
+
+@app.get("/metrics-test/items/{item_id}")
+def item(item_id: int):
+    # A sync endpoint, so the queries run in the threadpool
+    with engine.connect() as conn:
+        for _ in range(3):
+            conn.execute(text("SELECT 1"))
+    return {"id": item_id}
+
+app.add_api_route("/metrics", metrics_response)
+client = TestClient(app)
+
+def _sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+def test_requests_are_labelled_by_route_template_with_their_db_usage():
+    route = "/metrics-test/items/{item_id}"
+    before = _sample("db_queries_per_request_sum", route=route)
+    for item_id in (1, 2):
+        assert client.get(f"/metrics-test/items/{item_id}").status_code == 200
+    assert _sample("http_request_duration_seconds_count", method="GET", route=route, status="200") >= 2
+    assert _sample("db_queries_per_request_sum", route=route) - before == 6
+
+    client.get("/metrics-test/nowhere/42")
+    assert _sample("http_request_duration_seconds_count", method="GET", route="unmatched", status="404") >= 1
+    assert REGISTRY.get_sample_value("http_request_duration_seconds_count",
+                                     {"method": "GET", "route": "/metrics-test/items/1", "status": "200"}) is None
+
+def test_model_calls_record_their_outcome():
+    labels = {"operation": "test_op", "model": "test-model"}
+    with track_model_call("test_op", "test-model"):
+        pass
+    with pytest.raises(RuntimeError):
+        with track_model_call("test_op", "test-model"):
+            raise RuntimeError("quota")
+    assert _sample("upstream_model_call_duration_seconds_count", outcome="success", **labels) == 1
+    assert _sample("upstream_model_call_duration_seconds_count", outcome="error", **labels) == 1
+
+def test_metrics_endpoint_exposes_threadpool_gauges():
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "threadpool_threads_limit" in response.text
+    assert _sample("threadpool_threads_limit") > 0
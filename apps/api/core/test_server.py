@@ -0,0 +1,41 @@
+import asyncio
+import signal
+import pytest
+from uvicorn import Config
+from apps.api.core import server
+from apps.api.core.server import DrainingServer
+from apps.api.modules.health import service as health
+
+@pytest.fixture
+def lifecycle(monkeypatch):
+    lifecycle = health.Lifecycle()
+    lifecycle.mark_ready()
+    monkeypatch.setattr(health, "lifecycle", lifecycle)
+    return lifecycle
+
+def test_sigterm_marks_draining_before_the_listener_closes(lifecycle, monkeypatch):
+    monkeypatch.setattr(server, "SERVER_DRAIN_DELAY_SECONDS", 0.2)
+
+    async def run() -> list[bool]:
+        draining = DrainingServer(Config(app=None))
+        draining.handle_exit(signal.SIGTERM, None)
+        seen = [lifecycle.draining, draining.should_exit]
+        await asyncio.sleep(0.3)
+        return seen + [draining.should_exit]
+
+    # Readiness flips at once; uvicorn is only told to stop after the delay
+    assert asyncio.run(run()) == [True, False, True]
+
+def test_second_signal_or_sigint_stops_at_once(lifecycle, monkeypatch):
+    monkeypatch.setattr(server, "SERVER_DRAIN_DELAY_SECONDS", 30)
+
+    async def run() -> tuple[bool, bool]:
+        repeated = DrainingServer(Config(app=None))
+        repeated.handle_exit(signal.SIGTERM, None)
+        repeated.handle_exit(signal.SIGTERM, None)
+        interrupted = DrainingServer(Config(app=None))
+        interrupted.handle_exit(signal.SIGINT, None)
+        return repeated.should_exit, interrupted.should_exit
+
+    assert asyncio.run(run()) == (True, True)
+    assert lifecycle.draining
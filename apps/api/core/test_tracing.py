@@ -0,0 +1,70 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import StatusCode
+from sqlalchemy import create_engine, text
+from apps.api.core import tracing
+from apps.api.core.tracing import TracingMiddleware, trace_engine, traced
+
+TRACE_ID = "0af7651916cd43dd8448eb211c80319c"
+TRACEPARENT = f"00-{TRACE_ID}-b7ad6b7169203331-01"
+
+@pytest.fixture
+def spans(monkeypatch):
+    """Route spans to memory instead of installing a global provider"""
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    monkeypatch.setattr(tracing, "tracer", provider.get_tracer("test"))
+    monkeypatch.setattr(tracing, "_enabled", True)
+    return exporter
+
+@pytest.fixture
+def client(spans):
+    engine = create_engine("sqlite://")
+    trace_engine(engine)
+
+    @traced("items.load")
+    def load_item(item_id: int) -> dict:
+        with engine.connect() as conn:
+            return {"id": conn.execute(text("SELECT :id"), {"id": item_id}).scalar()}
+
+    app = FastAPI()
+    app.add_middleware(TracingMiddleware)
+
+    @app.get("/items/{item_id}")
+    def item(item_id: int):
+        return load_item(item_id)
+
+    @app.get("/broken")
+    def broken():
+        raise RuntimeError("boom")
+
+    return TestClient(app, raise_server_exceptions=False)
+
+def test_request_continues_the_incoming_trace_with_service_and_sql_children(client, spans):
+    assert client.get("/items/7", headers={"traceparent": TRACEPARENT}).json() == {"id": 7}
+    by_name = {span.name: span for span in spans.get_finished_spans()}
+    server, service, query = by_name["GET /items/{item_id}"], by_name["items.load"], by_name["db.query"]
+
+    assert {format(span.context.trace_id, "032x") for span in (server, service, query)} == {TRACE_ID}
+    assert format(server.parent.span_id, "016x") == "b7ad6b7169203331"
+    assert service.parent.span_id == server.context.span_id
+    assert query.parent.span_id == service.context.span_id
+    assert query.attributes["db.statement"].startswith("SELECT")
+    assert server.attributes["http.route"] == "/items/{item_id}"
+
+def test_server_errors_mark_the_span(client, spans):
+    assert client.get("/broken").status_code == 500
+    (server,) = [span for span in spans.get_finished_spans() if span.name == "GET /broken"]
+    assert server.status.status_code == StatusCode.ERROR
+    assert server.attributes["http.status_code"] == 500
+
+def test_disabled_tracing_adds_no_engine_listeners(monkeypatch):
+    monkeypatch.setattr(tracing, "_enabled", False)
+    engine = create_engine("sqlite://")
+    trace_engine(engine)
+    assert not engine.dispatch.before_cursor_execute
@@ -0,0 +1,215 @@
+"""
+Distributed tracing built on the OpenTelemetry API/SDK.
+
+Spans cover incoming requests, service functions (via @traced), SQL statements,
+upstream model calls and Celery tasks, with W3C trace context propagated from
+the API into tasks published on celery_app.
+
+Configured with environment variables:
+    TRACING_EXPORTER      none (default), file, console or otlp
+    TRACING_FILE          JSON-lines output path for the file exporter
+    TRACING_SAMPLE_RATIO  fraction of new traces to record (default 1.0)
+    OTEL_SERVICE_NAME     service name attached to every span
+
+With the default "none" no provider is installed and the API's no-op tracer
+keeps the overhead negligible.
+"""
+from functools import wraps
+from typing import TYPE_CHECKING, Optional, Sequence
+import os
+import threading
+from opentelemetry import context, propagate, trace
+from opentelemetry.propagators.textmap import Getter
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor, ConsoleSpanExporter, SpanExporter, SpanExportResult
+)
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from opentelemetry.trace import SpanKind, Status, StatusCode
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Engine
+
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none")
+TRACING_FILE = os.getenv("TRACING_FILE", "traces.jsonl")
+TRACING_SAMPLE_RATIO = float(os.getenv("TRACING_SAMPLE_RATIO", "1.0"))
+SQL_STATEMENT_MAX_LENGTH = 500
+
+tracer = trace.get_tracer("gen_wear")
+
+_enabled = False
+
+class JsonLinesFileExporter(SpanExporter):
+    """Append finished spans to a file, one JSON object per line (a local collector stand-in)"""
+    def __init__(self, path: str):
+        self._path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        lines = "".join(span.to_json(indent=None) + "\n" for span in spans)
+        with self._lock, open(self._path, "a", encoding="utf-8") as f:
+            f.write(lines)
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        pass
+
+def _make_exporter(name: str) -> SpanExporter:
+    if name == "file":
+        return JsonLinesFileExporter(TRACING_FILE)
+    if name == "console":
+        return ConsoleSpanExporter()
+    if name == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            raise RuntimeError(
+                "TRACING_EXPORTER=otlp requires the opentelemetry-exporter-otlp-proto-http package"
+            )
+        return OTLPSpanExporter() # Endpoint from OTEL_EXPORTER_OTLP_ENDPOINT
+    raise ValueError(f"Unknown TRACING_EXPORTER: {name}")
+
+def setup_tracing(service_name: str) -> bool:
+    """Install the tracer provider once per process; returns whether tracing is enabled"""
+    global _enabled
+    if _enabled or TRACING_EXPORTER == "none":
+        return _enabled
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME", service_name)}),
+        sampler=ParentBased(TraceIdRatioBased(TRACING_SAMPLE_RATIO))
+    )
+    provider.add_span_processor(BatchSpanProcessor(_make_exporter(TRACING_EXPORTER)))
+    trace.set_tracer_provider(provider)
+    _enabled = True
+    return True
+
+def traced(name: Optional[str] = None):
+    """Run the decorated function inside a span named after it"""
+    def decorator(fn):
+        # e.g. "auth.service.create_user"
+        module = ".".join(fn.__module__.split(".")[-2:])
+        span_name = name or f"{module}.{fn.__qualname__}"
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with tracer.start_as_current_span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def trace_engine(engine: "Engine"):
+    """Create a child span for every SQL statement executed on the engine"""
+    if not _enabled:
+        return
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        span = tracer.start_span(
+            "db.query",
+            kind=SpanKind.CLIENT,
+            attributes={
+                "db.system": conn.dialect.name,
+                "db.statement": statement[:SQL_STATEMENT_MAX_LENGTH],
+                "db.executemany": executemany,
+            }
+        )
+        conn.info.setdefault("trace_spans", []).append(span)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info["trace_spans"].pop().end()
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        spans = exception_context.connection.info.get("trace_spans") if exception_context.connection else None
+        if spans:
+            span = spans.pop()
+            span.record_exception(exception_context.original_exception)
+            span.set_status(Status(StatusCode.ERROR))
+            span.end()
+
+class TracingMiddleware:
+    """Pure ASGI middleware opening a server span per request, continuing any incoming traceparent"""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _enabled:
+            await self.app(scope, receive, send)
+            return
+
+        carrier = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        parent = propagate.extract(carrier)
+        method = scope["method"]
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        with tracer.start_as_current_span(
+            f"{method} {scope['path']}", context=parent, kind=SpanKind.SERVER
+        ) as span:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                # Name by route template once routing has resolved it
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    span.update_name(f"{method} {route}")
+                    span.set_attribute("http.route", route)
+                span.set_attribute("http.method", method)
+                span.set_attribute("http.status_code", status_code)
+                if status_code >= 500:
+                    span.set_status(Status(StatusCode.ERROR))
+
+class _CeleryRequestGetter(Getter):
+    # Custom message headers show up as attributes on task.request
+    def get(self, carrier, key):
+        value = getattr(carrier, key, None)
+        return [value] if isinstance(value, str) else None
+
+    def keys(self, carrier):
+        return []
+
+_task_spans: dict[str, tuple] = {}
+
+def instrument_celery(celery_app):
+    """Propagate trace context into Celery task headers and open a span around each task run"""
+    from celery.signals import before_task_publish, task_prerun, task_postrun
+
+    @before_task_publish.connect(weak=False)
+    def _inject_context(headers=None, **kwargs):
+        if _enabled and headers is not None:
+            propagate.inject(headers)
+
+    @task_prerun.connect(weak=False)
+    def _start_task_span(task_id=None, task=None, **kwargs):
+        if not _enabled:
+            return
+        parent = propagate.extract(task.request, getter=_CeleryRequestGetter())
+        span = tracer.start_span(f"celery.task {task.name}", context=parent, kind=SpanKind.CONSUMER)
+        token = context.attach(trace.set_span_in_context(span))
+        _task_spans[task_id] = (span, token)
+
+    @task_postrun.connect(weak=False)
+    def _end_task_span(task_id=None, state=None, **kwargs):
+        entry = _task_spans.pop(task_id, None)
+        if entry:
+            span, token = entry
+            span.set_attribute("celery.state", str(state))
+            if state == "FAILURE":
+                span.set_status(Status(StatusCode.ERROR))
+            span.end()
+            context.detach(token)
+
+def shutdown_tracing():
+    """Flush buffered spans before the process exits"""
+    provider = trace.get_tracer_provider()
+    if _enabled and hasattr(provider, "shutdown"):
+        provider.shutdown()
@@ -0,0 +1,82 @@
+"""
+Production server: `gunicorn -c apps/api/gunicorn.conf.py apps.api.main:app`
+
+Gunicorn runs WEB_CONCURRENCY uvicorn worker processes (uvloop + httptools). The
+app is preloaded in the master and frozen out of the garbage collector's view,
+so workers share its memory copy-on-write. On SIGTERM each worker turns
+/health/ready to 503 at once and keeps serving for SERVER_DRAIN_DELAY_SECONDS so
+load balancers take it out of rotation, then stops accepting connections, gives
+in-flight requests up to SERVER_DRAIN_SECONDS, and runs the app's shutdown:
+queued generation jobs get GENERATION_DRAIN_SECONDS to finish and the
+audit/history buffers are flushed. Use docker-compose's `uvicorn --reload` for
+development instead.
+
+With more than one worker, generation progress and quotas must live in Redis
+(PROGRESS_BACKEND and GENERATION_QUOTA_BACKEND): the memory backends are per
+process, so an SSE stream landing on another worker than its job would 404 and
+every worker would grant its own quota. Metrics need PROMETHEUS_MULTIPROC_DIR
+for the same reason, or /metrics only reports whichever worker answers the
+scrape. The config refuses to start otherwise.
+"""
+import gc
+import math
+import multiprocessing
+import os
+import shutil
+
+SERVER_DRAIN_DELAY_SECONDS = float(os.getenv("SERVER_DRAIN_DELAY_SECONDS", "5")) # Read by core/server.py too
+SERVER_DRAIN_SECONDS = int(os.getenv("SERVER_DRAIN_SECONDS", "60"))
+GENERATION_DRAIN_SECONDS = int(os.getenv("GENERATION_DRAIN_SECONDS", "30"))
+
+bind = os.getenv("SERVER_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = "apps.api.core.server.ProductionUvicornWorker"
+preload_app = os.getenv("SERVER_PRELOAD", "true").lower() == "true"
+keepalive = int(os.getenv("SERVER_KEEPALIVE_SECONDS", "5"))
+timeout = int(os.getenv("SERVER_WORKER_TIMEOUT", "60")) # A worker whose event loop misses heartbeats this long is restarted
+graceful_timeout = math.ceil(SERVER_DRAIN_DELAY_SECONDS) + SERVER_DRAIN_SECONDS + GENERATION_DRAIN_SECONDS + 10
+max_requests = int(os.getenv("SERVER_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1") # Proxies trusted for X-Forwarded-For (quotas key anonymous callers by IP)
+
+# State every worker must see; the defaults match progress.py and scheduler.py
+SHARED_BACKENDS = ("PROGRESS_BACKEND", "GENERATION_QUOTA_BACKEND")
+_per_process = [name for name in SHARED_BACKENDS if os.getenv(name, "memory") == "memory"]
+if workers > 1 and _per_process:
+    raise RuntimeError(
+        f"{', '.join(_per_process)} must be 'redis' with {workers} workers: "
+        "set them to redis, or run a single worker with WEB_CONCURRENCY=1"
+    )
+
+_metrics_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+if workers > 1 and not _metrics_dir:
+    raise RuntimeError(
+        f"PROMETHEUS_MULTIPROC_DIR must be set with {workers} workers so /metrics covers all of them, "
+        "or run a single worker with WEB_CONCURRENCY=1"
+    )
+if _metrics_dir:
+    # Here rather than in a server hook: the preloaded app creates its metric files before any hook runs.
+    # Files left by a previous run's workers would be summed into /metrics
+    shutil.rmtree(_metrics_dir, ignore_errors=True)
+    os.makedirs(_metrics_dir, exist_ok=True)
+
+def when_ready(server):
+    if preload_app:
+        # Create the schema once here, or workers booting together race each other's CREATE TABLEs
+        from apps.api.modules.auth.database import engine, init_db
+        init_db()
+        engine.dispose()
+        # Keep the collector off the preloaded objects so it doesn't write to (and copy) their pages in workers
+        gc.freeze()
+
+def post_fork(server, worker):
+    # Threads don't survive fork: give each worker its own log listener, and drop connections opened by the master
+    from apps.api.core.logging_config import restart_logging_after_fork
+    from apps.api.modules.auth.database import engine
+    restart_logging_after_fork()
+    engine.dispose(close=False)
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,7 +1,10 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from celery import Celery
-import os
+from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
+import logging
+import threading
 from apps.api.modules.generation.router import router as generation_router
 from apps.api.modules.auth.router import router as auth_router
 from apps.api.modules.products.router import router as product_router
@@ -9,9 +12,31 @@ from apps.api.modules.products.router import (
     category_router, collection_router, tag_router
 )
 from apps.api.modules.admin.router import router as admin_router
-from apps.api.modules.auth.database import init_db
+from apps.api.modules.audit.router import router as audit_router
+from apps.api.modules.images.router import router as images_router
+from apps.api.modules.health.router import router as health_router
+from apps.api.modules.products.facets import facet_rebuilder
+from apps.api.modules.health.service import lifecycle
+from apps.api.modules.audit.service import audit_log
+from apps.api.modules.generation.postprocess import MEDIA_ROOT, MEDIA_URL, shutdown_pool
+from apps.api.modules.generation.history import history_writer
+from apps.api.modules.generation.providers import IMAGE_PROVIDER
+from apps.api.modules.generation.providers.google import preload_sdk
+from apps.api.modules.generation.scheduler import scheduler
+from apps.api.modules.auth.database import init_db, engine
+from apps.api.core.compression import CompressionMiddleware
+from apps.api.core.metrics import MetricsMiddleware, instrument_engine, metrics_response
+from apps.api.core.tracing import TracingMiddleware, setup_tracing, trace_engine, shutdown_tracing
+from apps.api.core.logging_config import RequestIdMiddleware, setup_logging, shutdown_logging
+# Celery lives in its own module so workers don't import the API; re-exported for task publishers
+from apps.api.worker import celery_app  # noqa: F401
 
-app = FastAPI(title="Gen Wear API")
+setup_logging()
+setup_tracing("gen-wear-api")
+
+logger = logging.getLogger(__name__)
+
+app = FastAPI(title="Gen Wear API", default_response_class=ORJSONResponse)
 
 # CORS Config
 # origins = [
@@ -24,24 +49,50 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
+# Inside the metrics middleware so request latency includes compression time
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
+app.add_middleware(RequestIdMiddleware)
 
-# Celery Config
-redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
-celery_app = Celery("gen_wear", broker=redis_url, backend=redis_url)
+instrument_engine(engine)
+trace_engine(engine)
 
 # Initialize database on startup
 @app.on_event("startup")
 async def startup_event():
     init_db()
+    audit_log.start()
+    history_writer.start()
+    facet_rebuilder.start()
+    if IMAGE_PROVIDER == "google":
+        # The SDK is imported lazily; warm it in the background so the first generation doesn't pay for it
+        threading.Thread(target=preload_sdk, name="genai-preload", daemon=True).start()
+    lifecycle.mark_ready()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # The server has stopped taking requests; let background generation jobs finish before flushing.
+    # Under gunicorn the worker already marked itself draining when SIGTERM arrived (core/server.py)
+    lifecycle.mark_draining()
+    if not await run_in_threadpool(scheduler.drain):
+        logger.warning("Shutting down with %d generation runs unfinished", scheduler.pending())
+    audit_log.stop()
+    history_writer.stop()
+    facet_rebuilder.stop()
+    shutdown_pool()
+    shutdown_tracing()
+    shutdown_logging()
 
 @app.get("/")
 def read_root():
     return {"message": "Welcome to Gen Wear API"}
 
-@app.get("/health")
-def health_check():
-    return {"status": "ok"}
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return await metrics_response()
 
 app.include_router(generation_router, prefix="/api/generation", tags=["generation"])
 app.include_router(auth_router, prefix="/api/auth", tags=["auth"])
@@ -50,4 +101,9 @@ app.include_router(category_router, prefix="/api/categories", tags=["categories"
 app.include_router(collection_router, prefix="/api/collections", tags=["collections"])
 app.include_router(tag_router, prefix="/api/tags", tags=["tags"])
 app.include_router(admin_router, prefix="/api/admin", tags=["admin"])
+app.include_router(audit_router, prefix="/api/admin/audit", tags=["admin"])
+app.include_router(images_router, prefix="/api/images", tags=["images"])
+app.include_router(health_router, prefix="/health", tags=["health"])
 
+# Generated previews and print masters (content-addressed, written by the post-processing stage)
+app.mount(MEDIA_URL, StaticFiles(directory=MEDIA_ROOT, check_dir=False), name="media")
@@ -4,49 +4,40 @@ from apps.api.modules.auth.database import get_db
 from apps.api.modules.auth.service import get_current_admin_user
 from apps.api.modules.auth.models import User
 from apps.api.modules.auth.schemas import UserResponse
-from pydantic import BaseModel, Field
+from apps.api.modules.audit.service import record_event
+from apps.api.modules.admin.schemas import (
+    UserRoleUpdate, UserFilter, UserListResponse,
+    BulkRoleUpdate, BulkActiveUpdate, BulkUserDelete, BulkOperationResponse
+)
+from apps.api.modules.admin.service import (
+    list_users as list_users_service, invalidate_user_counts,
+    bulk_update_role, bulk_set_active, bulk_delete_users
+)
+from typing import Optional
 
 router = APIRouter()
 
-class UserRoleUpdate(BaseModel):
-    role: str = Field(..., pattern="^(USER|ADMIN)$", description="Role must be USER or ADMIN")
-
-class UserListResponse(BaseModel):
-    users: list[UserResponse]
-    total: int
-    page: int
-    page_size: int
-    total_pages: int
-
 @router.get("/users", response_model=UserListResponse)
 async def list_users(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
-    search: str = Query(None),
+    search: Optional[str] = Query(None),
+    role: Optional[str] = Query(None, pattern="^(USER|ADMIN)$"),
+    is_active: Optional[bool] = Query(None),
+    sort_order: str = Query("desc", pattern="^(asc|desc)$", description="Sort by created_at"),
     db: Session = Depends(get_db),
     admin: User = Depends(get_current_admin_user)
 ):
     """List all users (Admin only)"""
-    query = db.query(User)
-    
-    if search:
-        search_term = f"%{search}%"
-        query = query.filter(User.full_name.ilike(search_term) | User.phone_number.ilike(search_term))
-    
-    total = query.count()
-    offset = (page - 1) * page_size
-    users = query.offset(offset).limit(page_size).all()
-    
-    import math
-    total_pages = math.ceil(total / page_size) if total > 0 else 0
-    
-    return UserListResponse(
-        users=users,
-        total=total,
+    filters = UserFilter(
+        search=search,
+        role=role,
+        is_active=is_active,
+        sort_order=sort_order,
         page=page,
-        page_size=page_size,
-        total_pages=total_pages
+        page_size=page_size
     )
+    return list_users_service(db, filters)
 
 @router.put("/users/{user_id}/role", response_model=UserResponse)
 async def update_user_role(
@@ -60,10 +51,16 @@ async def update_user_role(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    previous_role = user.role
     user.role = role_update.role
     db.commit()
     db.refresh(user)
+    invalidate_user_counts()
     
+    record_event(
+        "user.role_update", "user", target_id=user_id, actor_id=admin.id,
+        details={"from": previous_role, "to": user.role}
+    )
     return user
 
 @router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -81,5 +78,48 @@ async def delete_user(
     if user.id == admin.id:
         raise HTTPException(status_code=400, detail="Cannot delete your own account")
         
+    phone_number = user.phone_number
     db.delete(user)
     db.commit()
+    invalidate_user_counts()
+    
+    record_event(
+        "user.delete", "user", target_id=user_id, actor_id=admin.id,
+        details={"phone_number": phone_number}
+    )
+
+@router.post("/users/bulk/role", response_model=BulkOperationResponse)
+def bulk_role_update(
+    request: BulkRoleUpdate,
+    db: Session = Depends(get_db),
+    admin: User = Depends(get_current_admin_user)
+):
+    """Set the role of users selected by ID list or filter (Admin only)"""
+    try:
+        return bulk_update_role(db, request, admin.id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/users/bulk/active", response_model=BulkOperationResponse)
+def bulk_active_update(
+    request: BulkActiveUpdate,
+    db: Session = Depends(get_db),
+    admin: User = Depends(get_current_admin_user)
+):
+    """Activate or deactivate users selected by ID list or filter (Admin only)"""
+    try:
+        return bulk_set_active(db, request, admin.id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/users/bulk/delete", response_model=BulkOperationResponse)
+def bulk_delete(
+    request: BulkUserDelete,
+    db: Session = Depends(get_db),
+    admin: User = Depends(get_current_admin_user)
+):
+    """Delete users selected by ID list or filter (Admin only)"""
+    try:
+        return bulk_delete_users(db, request, admin.id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
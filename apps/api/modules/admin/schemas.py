@@ -0,0 +1,58 @@
+from pydantic import BaseModel, Field, model_validator
+from typing import Optional
+from apps.api.modules.auth.schemas import UserResponse
+
+class UserRoleUpdate(BaseModel):
+    role: str = Field(..., pattern="^(USER|ADMIN)$", description="Role must be USER or ADMIN")
+
+class UserCriteria(BaseModel):
+    search: Optional[str] = None
+    role: Optional[str] = Field(None, pattern="^(USER|ADMIN)$")
+    is_active: Optional[bool] = None
+
+class UserFilter(UserCriteria):
+    sort_order: str = Field("desc", pattern="^(asc|desc)$", description="Sort by created_at: asc or desc")
+    page: int = Field(1, ge=1)
+    page_size: int = Field(20, ge=1, le=100)
+
+class UserListResponse(BaseModel):
+    users: list[UserResponse]
+    total: int
+    total_is_approximate: bool = False # True when total comes from planner statistics
+    page: int
+    page_size: int
+    total_pages: int
+
+# Bulk operations; a filter selection matching more users than this is rejected as well
+BULK_MAX_USERS = 10000
+
+class BulkUserSelection(BaseModel):
+    user_ids: Optional[list[str]] = Field(None, min_length=1, max_length=BULK_MAX_USERS)
+    filter: Optional[UserCriteria] = None
+    
+    @model_validator(mode="after")
+    def check_selection(self):
+        if (self.user_ids is None) == (self.filter is None):
+            raise ValueError("Provide exactly one of user_ids or filter")
+        if self.filter is not None and not self.filter.model_dump(exclude_none=True):
+            raise ValueError("filter must set at least one of search, role or is_active")
+        return self
+
+class BulkRoleUpdate(BulkUserSelection):
+    role: str = Field(..., pattern="^(USER|ADMIN)$", description="Role must be USER or ADMIN")
+
+class BulkActiveUpdate(BulkUserSelection):
+    is_active: bool
+
+class BulkUserDelete(BulkUserSelection):
+    pass
+
+class BulkUserResult(BaseModel):
+    user_id: str
+    status: str # "updated", "deleted", "not_found" or "skipped"
+    detail: Optional[str] = None
+
+class BulkOperationResponse(BaseModel):
+    results: list[BulkUserResult]
+    succeeded: int
+    failed: int
@@ -0,0 +1,187 @@
+from sqlalchemy.orm import Session, Query
+from sqlalchemy import text, desc, asc, update, delete
+from typing import Optional, Callable
+import math
+import os
+import threading
+import time
+from apps.api.modules.auth.models import User
+from apps.api.modules.auth.phone import normalize_phone_number
+from apps.api.core.tracing import traced
+from apps.api.modules.audit.service import record_event
+from apps.api.modules.admin.schemas import (
+    UserCriteria, UserFilter, UserListResponse,
+    BulkUserSelection, BulkRoleUpdate, BulkActiveUpdate, BulkUserDelete,
+    BulkUserResult, BulkOperationResponse, BULK_MAX_USERS
+)
+
+# Counts are cached briefly so paging through a listing doesn't re-run count() on every page
+USER_COUNT_CACHE_TTL = float(os.getenv("USER_COUNT_CACHE_TTL", "30"))
+USER_COUNT_CACHE_SIZE = 1024
+# Below this many rows an exact count is cheap and pg_class statistics are too coarse
+APPROXIMATE_COUNT_THRESHOLD = int(os.getenv("APPROXIMATE_COUNT_THRESHOLD", "100000"))
+# Rows per UPDATE/DELETE statement in bulk operations; each chunk commits on its own
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+
+_count_cache: dict[tuple, tuple[float, int]] = {}
+_count_lock = threading.Lock()
+
+def invalidate_user_counts():
+    """Drop cached user counts after users register, are removed or change role/state (this process only;
+    other workers catch up within USER_COUNT_CACHE_TTL)"""
+    with _count_lock:
+        _count_cache.clear()
+
+def _estimate_user_total(db: Session) -> Optional[int]:
+    """Row estimate from planner statistics, or None when unavailable or too small to trust"""
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    estimate = db.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'users'::regclass")
+    ).scalar()
+    if estimate is None or estimate < APPROXIMATE_COUNT_THRESHOLD:
+        return None
+    return estimate
+
+def _cached_count(query: Query, key: tuple) -> int:
+    now = time.monotonic()
+    with _count_lock:
+        cached = _count_cache.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+
+    total = query.order_by(None).count()
+
+    with _count_lock:
+        if len(_count_cache) >= USER_COUNT_CACHE_SIZE:
+            _count_cache.pop(next(iter(_count_cache)))
+        _count_cache[key] = (now + USER_COUNT_CACHE_TTL, total)
+    return total
+
+def _apply_filters(query: Query, filters: UserCriteria) -> Query:
+    if filters.role:
+        query = query.filter(User.role == filters.role)
+    
+    if filters.is_active is not None:
+        query = query.filter(User.is_active == filters.is_active)
+    
+    if filters.search:
+        # A full phone number hits the unique index instead of scanning with ILIKE
+        phone_number = normalize_phone_number(filters.search)
+        if phone_number:
+            query = query.filter(User.phone_number == phone_number)
+        else:
+            search_term = f"%{filters.search}%"
+            query = query.filter(User.full_name.ilike(search_term) | User.phone_number.ilike(search_term))
+    
+    return query
+
+@traced()
+def list_users(db: Session, filters: UserFilter) -> UserListResponse:
+    """List users with filtering, created_at ordering and pagination"""
+    query = _apply_filters(db.query(User), filters)
+    
+    total = None
+    is_approximate = False
+    if not (filters.search or filters.role or filters.is_active is not None):
+        total = _estimate_user_total(db)
+        is_approximate = total is not None
+    if total is None:
+        total = _cached_count(query, (filters.search, filters.role, filters.is_active))
+    
+    # The (role|is_active, created_at) indexes serve both the filter and the ordering; they aren't covering,
+    # so each page still reads its rows from the table
+    order = desc if filters.sort_order == "desc" else asc
+    query = query.order_by(order(User.created_at), order(User.id))
+    
+    offset = (filters.page - 1) * filters.page_size
+    users = query.offset(offset).limit(filters.page_size).all()
+    
+    total_pages = math.ceil(total / filters.page_size) if total > 0 else 0
+    
+    return UserListResponse(
+        users=users,
+        total=total,
+        total_is_approximate=is_approximate,
+        page=filters.page,
+        page_size=filters.page_size,
+        total_pages=total_pages
+    )
+
+def _resolve_user_ids(db: Session, selection: BulkUserSelection) -> list[str]:
+    if selection.user_ids is not None:
+        return list(dict.fromkeys(selection.user_ids))
+    query = _apply_filters(db.query(User.id), selection.filter)
+    # One row past the cap is enough to tell an oversized selection without loading all of it
+    user_ids = [user_id for (user_id,) in query.order_by(User.created_at, User.id).limit(BULK_MAX_USERS + 1)]
+    if len(user_ids) > BULK_MAX_USERS:
+        raise ValueError(f"Filter matches more than {BULK_MAX_USERS} users; narrow it down")
+    return user_ids
+
+@traced()
+def _run_bulk(
+    db: Session,
+    selection: BulkUserSelection,
+    admin_id: str,
+    make_statement: Callable,
+    success_status: str,
+    action: str,
+    details: Optional[dict] = None
+) -> BulkOperationResponse:
+    """Apply a set-based statement to the selected users chunk by chunk, reporting per-user results"""
+    results = []
+    targets = []
+    for user_id in _resolve_user_ids(db, selection):
+        if user_id == admin_id:
+            results.append(BulkUserResult(
+                user_id=user_id, status="skipped", detail="Cannot apply to your own account"
+            ))
+        else:
+            targets.append(user_id)
+    
+    for start in range(0, len(targets), BULK_CHUNK_SIZE):
+        chunk = targets[start:start + BULK_CHUNK_SIZE]
+        statement = (
+            make_statement(User.id.in_(chunk))
+            .returning(User.id)
+            .execution_options(synchronize_session=False)
+        )
+        affected = set(db.execute(statement).scalars())
+        db.commit()
+        
+        for user_id in chunk:
+            if user_id in affected:
+                results.append(BulkUserResult(user_id=user_id, status=success_status))
+                record_event(action, "user", target_id=user_id, actor_id=admin_id, details=details)
+            else:
+                results.append(BulkUserResult(user_id=user_id, status="not_found"))
+    
+    if targets:
+        invalidate_user_counts()
+    
+    succeeded = sum(1 for r in results if r.status == success_status)
+    return BulkOperationResponse(results=results, succeeded=succeeded, failed=len(results) - succeeded)
+
+def bulk_update_role(db: Session, request: BulkRoleUpdate, admin_id: str) -> BulkOperationResponse:
+    """Set the role of many users"""
+    return _run_bulk(
+        db, request, admin_id,
+        lambda condition: update(User).where(condition).values(role=request.role),
+        "updated", "user.role_update", {"to": request.role}
+    )
+
+def bulk_set_active(db: Session, request: BulkActiveUpdate, admin_id: str) -> BulkOperationResponse:
+    """Activate or deactivate many users"""
+    return _run_bulk(
+        db, request, admin_id,
+        lambda condition: update(User).where(condition).values(is_active=request.is_active),
+        "updated", "user.activate" if request.is_active else "user.deactivate"
+    )
+
+def bulk_delete_users(db: Session, request: BulkUserDelete, admin_id: str) -> BulkOperationResponse:
+    """Delete many users"""
+    return _run_bulk(
+        db, request, admin_id,
+        lambda condition: delete(User).where(condition),
+        "deleted", "user.delete"
+    )
@@ -0,0 +1,73 @@
+import random
+import uuid
+import pytest
+from fastapi import HTTPException
+from pydantic import ValidationError
+from apps.api.modules.admin import service
+from apps.api.modules.admin.router import bulk_active_update
+from apps.api.modules.admin.schemas import BulkActiveUpdate, BulkRoleUpdate, BulkUserDelete, UserCriteria, UserFilter
+from apps.api.modules.admin.service import bulk_delete_users, bulk_set_active, bulk_update_role, list_users
+from apps.api.modules.auth.models import User
+from apps.api.modules.auth.router import register
+from apps.api.modules.auth.schemas import RegisterRequest
+from apps.api.modules.auth.service import create_user
+
+def _phone() -> str:
+    return f"+8491{random.randint(0, 9_999_999):07d}"
+
+def _users(db, count: int, name: str) -> list[str]:
+    return [create_user(db, _phone(), name, "secret1").id for _ in range(count)]
+
+def test_registration_invalidates_cached_totals(db):
+    register(RegisterRequest(phone_number=_phone(), full_name="First", password="secret1"), db)
+    before = list_users(db, UserFilter()).total
+    # Served from the count cache now; a registration must not leave it stale
+    register(RegisterRequest(phone_number=_phone(), full_name="Second", password="secret1"), db)
+    assert list_users(db, UserFilter()).total == before + 1
+
+def test_bulk_role_reports_every_user_across_chunks(db, monkeypatch):
+    monkeypatch.setattr(service, "BULK_CHUNK_SIZE", 2)
+    admin_id, *user_ids = _users(db, 4, "Bulk Role")
+    missing = str(uuid.uuid4())
+    response = bulk_update_role(db, BulkRoleUpdate(user_ids=[admin_id, *user_ids, missing, user_ids[0]], role="ADMIN"), admin_id)
+
+    statuses = {result.user_id: result.status for result in response.results}
+    assert len(response.results) == 5 # The repeated id is reported once
+    assert statuses == {admin_id: "skipped", **{user_id: "updated" for user_id in user_ids}, missing: "not_found"}
+    assert (response.succeeded, response.failed) == (3, 2)
+    db.expire_all()
+    assert {db.get(User, user_id).role for user_id in user_ids} == {"ADMIN"}
+    assert db.get(User, admin_id).role == "USER"
+
+def test_bulk_filter_selection_and_cached_counts(db):
+    marker = uuid.uuid4().hex[:8]
+    admin_id = _users(db, 1, "Bulk Admin")[0]
+    _users(db, 3, f"Bulk {marker}")
+    criteria = UserFilter(search=marker)
+    assert list_users(db, criteria).total == 3
+
+    response = bulk_set_active(db, BulkActiveUpdate(filter=UserCriteria(search=marker), is_active=False), admin_id)
+    assert response.succeeded == 3
+    assert list_users(db, UserFilter(search=marker, is_active=False)).total == 3
+
+    bulk_delete_users(db, BulkUserDelete(filter=UserCriteria(search=marker)), admin_id)
+    assert list_users(db, criteria).total == 0
+
+def test_bulk_filter_selection_over_the_cap_is_rejected(db, monkeypatch):
+    monkeypatch.setattr(service, "BULK_MAX_USERS", 2)
+    marker = uuid.uuid4().hex[:8]
+    admin_id = _users(db, 1, "Bulk Admin")[0]
+    user_ids = _users(db, 3, f"Bulk {marker}")
+    with pytest.raises(HTTPException) as exc:
+        bulk_active_update(BulkActiveUpdate(filter=UserCriteria(search=marker), is_active=False), db, db.get(User, admin_id))
+    assert exc.value.status_code == 400
+    db.expire_all()
+    assert all(db.get(User, user_id).is_active for user_id in user_ids)
+
+    monkeypatch.setattr(service, "BULK_MAX_USERS", 3)
+    assert bulk_set_active(db, BulkActiveUpdate(filter=UserCriteria(search=marker), is_active=False), admin_id).succeeded == 3
+
+@pytest.mark.parametrize("selection", [{}, {"user_ids": ["a"], "filter": {"role": "USER"}}, {"filter": {}}])
+def test_bulk_selection_must_name_users_or_a_non_empty_filter(selection):
+    with pytest.raises(ValidationError):
+        BulkUserDelete(**selection)
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, String, DateTime, JSON, Index
+import uuid
+from datetime import datetime
+from apps.api.modules.auth.database import Base
+
+class AuditEvent(Base):
+    __tablename__ = "audit_events"
+    # Range-partitioned by month on Postgres (ignored by other dialects), so the
+    # partition key has to be part of the primary key
+    __table_args__ = (
+        Index("ix_audit_events_created_at_id", "created_at", "id"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    created_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
+    actor_id = Column(String, nullable=True, index=True) # No FK: events outlive deleted users
+    action = Column(String, nullable=False, index=True) # e.g. "user.role_update", "product.delete"
+    target_type = Column(String, nullable=False)
+    target_id = Column(String, nullable=True)
+    details = Column(JSON, nullable=True)
+    
+    def __repr__(self):
+        return f"<AuditEvent {self.action} {self.target_type}:{self.target_id}>"
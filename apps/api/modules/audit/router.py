@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Optional
+from apps.api.modules.auth.database import get_db
+from apps.api.modules.auth.service import get_current_admin_user
+from apps.api.modules.auth.models import User
+from apps.api.modules.audit.schemas import AuditEventListResponse
+from apps.api.modules.audit.service import list_events
+
+router = APIRouter()
+
+@router.get("", response_model=AuditEventListResponse)
+async def list_audit_events(
+    start: Optional[datetime] = Query(None, description="Inclusive lower bound (UTC)"),
+    end: Optional[datetime] = Query(None, description="Exclusive upper bound (UTC)"),
+    action: Optional[str] = Query(None),
+    actor_id: Optional[str] = Query(None),
+    target_type: Optional[str] = Query(None),
+    target_id: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    admin: User = Depends(get_current_admin_user)
+):
+    """List audit events, newest first (Admin only)"""
+    try:
+        return list_events(
+            db,
+            start=start,
+            end=end,
+            action=action,
+            actor_id=actor_id,
+            target_type=target_type,
+            target_id=target_id,
+            cursor=cursor,
+            limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional, Any
+
+class AuditEventResponse(BaseModel):
+    id: str
+    created_at: datetime
+    actor_id: Optional[str] = None
+    action: str
+    target_type: str
+    target_id: Optional[str] = None
+    details: Optional[dict[str, Any]] = None
+    
+    class Config:
+        from_attributes = True
+
+class AuditEventListResponse(BaseModel):
+    events: list[AuditEventResponse]
+    next_cursor: Optional[str] = None # Pass back as `cursor` to fetch the next (older) page
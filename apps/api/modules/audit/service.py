@@ -0,0 +1,305 @@
+from sqlalchemy import insert, text, or_, and_, desc
+from sqlalchemy.orm import Session
+from collections import deque
+from datetime import datetime, date
+from typing import Optional, Any
+import json
+import logging
+import os
+import threading
+import uuid
+from apps.api.core.metrics import AUDIT_FORWARD_FAILURES, QUEUE_DEPTH
+from apps.api.modules.auth.database import SessionLocal, engine
+from apps.api.modules.audit.models import AuditEvent
+from apps.api.modules.audit.schemas import AuditEventListResponse
+
+logger = logging.getLogger(__name__)
+
+# Buffer settings: "memory" keeps events per process, "redis" survives restarts and is shared by workers
+AUDIT_BUFFER = os.getenv("AUDIT_BUFFER", "memory")
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "2.0"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+AUDIT_MAX_BUFFERED = int(os.getenv("AUDIT_MAX_BUFFERED", "100000"))
+AUDIT_PARTITION_MONTHS_AHEAD = int(os.getenv("AUDIT_PARTITION_MONTHS_AHEAD", "2"))
+AUDIT_REDIS_KEY = "audit:events"
+
+class MemoryBuffer:
+    """Bounded in-process buffer; the oldest events are dropped if the flusher falls behind"""
+    def __init__(self, max_items: int):
+        self._events = deque(maxlen=max_items)
+        self.dropped = 0
+
+    def push(self, event: dict):
+        if len(self._events) == self._events.maxlen:
+            self.dropped += 1
+        self._events.append(event)
+
+    def drain(self, max_items: int) -> list[dict]:
+        batch = []
+        while len(batch) < max_items:
+            try:
+                batch.append(self._events.popleft())
+            except IndexError:
+                break
+        return batch
+
+    def requeue(self, events: list[dict]):
+        self._events.extendleft(reversed(events))
+
+    def backlog(self) -> int:
+        """Events waiting in this process"""
+        return len(self._events)
+
+    def __len__(self):
+        return len(self._events)
+
+class RedisBuffer:
+    """
+    Redis list buffer shared by every API and worker process. push() only appends
+    to a local deque; the flusher thread forwards those to Redis in one pipeline
+    before draining, so the request thread never makes a Redis round trip. While
+    Redis is unreachable, failed forwards are counted and the events stay local,
+    and drain() falls back to them so they still reach the database.
+    """
+    def __init__(self, redis_url: str, key: str = AUDIT_REDIS_KEY, max_local: int = AUDIT_MAX_BUFFERED):
+        import redis
+        self._client = redis.Redis.from_url(redis_url)
+        self._key = key
+        self._local = MemoryBuffer(max_local)
+        self.push_failures = 0
+
+    @property
+    def dropped(self) -> int:
+        return self._local.dropped
+
+    @staticmethod
+    def _encode(event: dict) -> str:
+        return json.dumps({**event, "created_at": event["created_at"].isoformat()})
+
+    @staticmethod
+    def _decode(raw: bytes) -> dict:
+        event = json.loads(raw)
+        event["created_at"] = datetime.fromisoformat(event["created_at"])
+        return event
+
+    def push(self, event: dict):
+        self._local.push(event)
+
+    def forward(self) -> bool:
+        """Move locally queued events to the Redis list; False if Redis couldn't take them"""
+        events = self._local.drain(len(self._local))
+        if not events:
+            return True
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            for start in range(0, len(events), AUDIT_BATCH_SIZE):
+                pipe.rpush(self._key, *[self._encode(e) for e in events[start:start + AUDIT_BATCH_SIZE]])
+            pipe.execute()
+        except Exception:
+            self.push_failures += 1
+            AUDIT_FORWARD_FAILURES.inc()
+            logger.warning("Could not forward %d audit events to Redis, keeping them locally", len(events), exc_info=True)
+            self._local.requeue(events)
+            return False
+        return True
+
+    def drain(self, max_items: int) -> list[dict]:
+        if self.forward():
+            try:
+                pipe = self._client.pipeline(transaction=True)
+                pipe.lrange(self._key, 0, max_items - 1)
+                pipe.ltrim(self._key, max_items, -1)
+                raw, _ = pipe.execute()
+                return [self._decode(item) for item in raw]
+            except Exception:
+                logger.warning("Could not drain audit events from Redis", exc_info=True)
+        return self._local.drain(max_items)
+
+    def requeue(self, events: list[dict]):
+        # Back into the local queue; the next forward puts them behind what's already in Redis
+        self._local.requeue(events)
+
+    def backlog(self) -> int:
+        return self._local.backlog()
+
+    def __len__(self):
+        try:
+            return self._client.llen(self._key) + len(self._local)
+        except Exception:
+            return len(self._local)
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+class AuditLog:
+    """
+    Append-only event log. Recording only appends to a buffer; a background
+    thread flushes batches to the audit_events table so write paths never wait
+    on the audit insert.
+    """
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._partitions: set[date] = set()
+
+    def record(
+        self,
+        action: str,
+        target_type: str,
+        target_id: Optional[str] = None,
+        actor_id: Optional[str] = None,
+        details: Optional[dict[str, Any]] = None
+    ):
+        """Queue an event; never touches the database on the caller's thread"""
+        self.buffer.push({
+            "id": str(uuid.uuid4()),
+            "created_at": datetime.utcnow(),
+            "actor_id": actor_id,
+            "action": action,
+            "target_type": target_type,
+            "target_id": target_id,
+            "details": details,
+        })
+        if self.buffer.backlog() >= AUDIT_BATCH_SIZE:
+            self._wake.set()
+
+    def start(self):
+        """Create upcoming partitions and start the background flusher"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._ensure_partitions(datetime.utcnow())
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="audit-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the flusher and write out anything still buffered"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=AUDIT_FLUSH_INTERVAL * 5)
+            self._thread = None
+        self.flush()
+
+    def flush(self) -> int:
+        """Write all buffered events in batches, returning how many were written"""
+        written = 0
+        while True:
+            batch = self.buffer.drain(AUDIT_BATCH_SIZE)
+            if not batch:
+                return written
+            try:
+                self._write(batch)
+            except Exception:
+                logger.exception("Failed to flush %d audit events, requeueing", len(batch))
+                self.buffer.requeue(batch)
+                return written
+            written += len(batch)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(AUDIT_FLUSH_INTERVAL)
+            self._wake.clear()
+            self.flush()
+            QUEUE_DEPTH.labels("audit").set(len(self.buffer))
+
+    def _write(self, events: list[dict]):
+        self._ensure_partitions(events[-1]["created_at"])
+        with SessionLocal() as db:
+            db.execute(insert(AuditEvent), events)
+            db.commit()
+
+    def _ensure_partitions(self, when: datetime):
+        """Create monthly partitions (plus a default catch-all) ahead of time on Postgres"""
+        if engine.dialect.name != "postgresql":
+            return
+        month = date(when.year, when.month, 1)
+        if month in self._partitions:
+            return
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(
+                    "CREATE TABLE IF NOT EXISTS audit_events_default PARTITION OF audit_events DEFAULT"
+                ))
+                for offset in range(AUDIT_PARTITION_MONTHS_AHEAD + 1):
+                    start = _add_months(month, offset)
+                    end = _add_months(start, 1)
+                    conn.execute(text(
+                        f"CREATE TABLE IF NOT EXISTS audit_events_{start:%Y_%m} PARTITION OF audit_events "
+                        f"FOR VALUES FROM ('{start}') TO ('{end}')"
+                    ))
+        except Exception:
+            # e.g. a pre-existing unpartitioned table; events still land in it
+            logger.exception("Could not create audit_events partitions")
+        self._partitions.add(month)
+
+def _make_buffer():
+    if AUDIT_BUFFER == "redis":
+        return RedisBuffer(os.getenv("REDIS_URL", "redis://localhost:6379"))
+    return MemoryBuffer(AUDIT_MAX_BUFFERED)
+
+audit_log = AuditLog(_make_buffer())
+
+def record_event(
+    action: str,
+    target_type: str,
+    target_id: Optional[str] = None,
+    actor_id: Optional[str] = None,
+    details: Optional[dict[str, Any]] = None
+):
+    """Record an audit event without blocking the calling request"""
+    audit_log.record(action, target_type, target_id=target_id, actor_id=actor_id, details=details)
+
+def _encode_cursor(event: AuditEvent) -> str:
+    return f"{event.created_at.isoformat()}|{event.id}"
+
+def _decode_cursor(cursor: str) -> tuple[datetime, str]:
+    created_at, event_id = cursor.split("|", 1)
+    return datetime.fromisoformat(created_at), event_id
+
+def list_events(
+    db: Session,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    action: Optional[str] = None,
+    actor_id: Optional[str] = None,
+    target_type: Optional[str] = None,
+    target_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50
+) -> AuditEventListResponse:
+    """List events newest first within a time range, using keyset pagination on (created_at, id)"""
+    query = db.query(AuditEvent)
+
+    # Time bounds let Postgres prune partitions outside the range
+    if start:
+        query = query.filter(AuditEvent.created_at >= start)
+    if end:
+        query = query.filter(AuditEvent.created_at < end)
+    if action:
+        query = query.filter(AuditEvent.action == action)
+    if actor_id:
+        query = query.filter(AuditEvent.actor_id == actor_id)
+    if target_type:
+        query = query.filter(AuditEvent.target_type == target_type)
+    if target_id:
+        query = query.filter(AuditEvent.target_id == target_id)
+
+    if cursor:
+        try:
+            cursor_created_at, cursor_id = _decode_cursor(cursor)
+        except ValueError:
+            raise ValueError("Invalid cursor")
+        query = query.filter(or_(
+            AuditEvent.created_at < cursor_created_at,
+            and_(AuditEvent.created_at == cursor_created_at, AuditEvent.id < cursor_id)
+        ))
+
+    # Fetch one extra row to know whether another page exists without a count()
+    events = query.order_by(desc(AuditEvent.created_at), desc(AuditEvent.id)).limit(limit + 1).all()
+    next_cursor = _encode_cursor(events[limit - 1]) if len(events) > limit else None
+
+    return AuditEventListResponse(events=events[:limit], next_cursor=next_cursor)
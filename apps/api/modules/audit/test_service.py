@@ -0,0 +1,43 @@
+from datetime import datetime
+import pytest
+from apps.api.modules.audit.service import AuditLog, MemoryBuffer, RedisBuffer
+
+def _event(i: int) -> dict:
+    return {"id": str(i), "created_at": datetime(2026, 1, 1), "actor_id": None, "action": "test",
+            "target_type": "thing", "target_id": None, "details": None}
+
+def test_memory_buffer_drops_oldest_when_full():
+    buffer = MemoryBuffer(3)
+    for i in range(5):
+        buffer.push(_event(i))
+    assert buffer.dropped == 2
+    assert [e["id"] for e in buffer.drain(10)] == ["2", "3", "4"]
+
+def test_redis_push_stays_local_until_the_flusher_forwards():
+    fakeredis = pytest.importorskip("fakeredis")
+    buffer = RedisBuffer("redis://localhost:6379", key="audit:test")
+    buffer._client = fakeredis.FakeRedis()
+    for i in range(3):
+        buffer.push(_event(i))
+    assert buffer._client.llen("audit:test") == 0
+    assert buffer.backlog() == 3
+
+    drained = buffer.drain(2)
+    assert [e["id"] for e in drained] == ["0", "1"]
+    assert buffer.backlog() == 0
+    assert buffer._client.llen("audit:test") == 1
+
+def test_redis_outage_is_counted_and_events_still_drain():
+    # Nothing listens on port 1: pushes must not raise, and drain falls back to the local queue
+    buffer = RedisBuffer("redis://127.0.0.1:1", key="audit:test")
+    buffer.push(_event(1))
+    buffer.push(_event(2))
+    assert [e["id"] for e in buffer.drain(10)] == ["1", "2"]
+    assert buffer.push_failures == 1
+    assert len(buffer) == 0
+
+def test_record_never_touches_redis_on_the_caller_thread():
+    buffer = RedisBuffer("redis://127.0.0.1:1", key="audit:test")
+    AuditLog(buffer).record("product.create", "product", target_id="p1")
+    assert buffer.push_failures == 0
+    assert buffer.backlog() == 1
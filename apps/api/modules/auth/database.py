@@ -27,3 +27,8 @@ def get_db():
 def init_db():
     from apps.api.modules.auth.models import User
     Base.metadata.create_all(bind=engine)
+    
+    # create_all skips tables that already exist, so add any indexes introduced since
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
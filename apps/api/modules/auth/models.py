@@ -1,10 +1,17 @@
-from sqlalchemy import Column, String, Boolean, DateTime
+from sqlalchemy import Column, String, Boolean, DateTime, Index
 import uuid
 from datetime import datetime
 from apps.api.modules.auth.database import Base
 
 class User(Base):
     __tablename__ = "users"
+    # Admin listing access paths: optional role/is_active filter, ordered by created_at. They locate and order
+    # rows but don't cover the selected columns, so the rows themselves are still read from the table
+    __table_args__ = (
+        Index("ix_users_created_at_id", "created_at", "id"),
+        Index("ix_users_role_created_at", "role", "created_at"),
+        Index("ix_users_is_active_created_at", "is_active", "created_at"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()), index=True)
     phone_number = Column(String, unique=True, index=True, nullable=False)
@@ -0,0 +1,38 @@
+from functools import lru_cache
+from typing import Optional
+import os
+
+# Bounded so a flood of distinct (possibly junk) numbers cannot grow memory
+PHONE_CACHE_SIZE = int(os.getenv("PHONE_CACHE_SIZE", "4096"))
+
+INVALID_PHONE_MESSAGE = "Invalid phone number format. Use international format (e.g., +84912345678)"
+
+@lru_cache(maxsize=PHONE_CACHE_SIZE)
+def _normalize(phone_number: str) -> Optional[str]:
+    # phonenumbers is imported lazily so its metadata does not add to API import time
+    import phonenumbers
+
+    try:
+        parsed = phonenumbers.parse(phone_number, None)
+    except phonenumbers.NumberParseException:
+        return None
+    if not phonenumbers.is_valid_number(parsed):
+        return None
+    return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
+
+def normalize_phone_number(phone_number: str) -> Optional[str]:
+    """Return the E.164 form of a phone number, or None if it is not valid"""
+    if not phone_number:
+        return None
+    return _normalize(phone_number.strip())
+
+def validate_phone_number(phone_number: str) -> str:
+    """Normalize a phone number for schema validators, raising ValueError if invalid"""
+    normalized = normalize_phone_number(phone_number)
+    if normalized is None:
+        raise ValueError(INVALID_PHONE_MESSAGE)
+    return normalized
+
+def phone_cache_info():
+    """Expose cache statistics (hits, misses, size) for diagnostics"""
+    return _normalize.cache_info()
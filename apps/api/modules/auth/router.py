@@ -11,12 +11,14 @@ from apps.api.modules.auth.service import (
 )
 from apps.api.modules.auth.database import get_db
 from apps.api.modules.auth.models import User
+from apps.api.modules.admin.service import invalidate_user_counts
 
 router = APIRouter()
 
 @router.post("/register", response_model=RegisterResponse, status_code=status.HTTP_201_CREATED)
-async def register(request: RegisterRequest, db: Session = Depends(get_db)):
+def register(request: RegisterRequest, db: Session = Depends(get_db)):
     """Register a new user with phone number and password"""
+    # Sync handler: bcrypt hashing runs in the threadpool instead of blocking the event loop
     try:
         user = create_user(
             db=db,
@@ -24,6 +26,7 @@ async def register(request: RegisterRequest, db: Session = Depends(get_db)):
             full_name=request.full_name,
             password=request.password
         )
+        invalidate_user_counts()
         
         return RegisterResponse(
             user_id=str(user.id),
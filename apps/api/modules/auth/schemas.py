@@ -1,7 +1,7 @@
 from pydantic import BaseModel, Field, field_validator
 from datetime import datetime
 from typing import Optional
-import phonenumbers
+from apps.api.modules.auth.phone import validate_phone_number as normalize_or_raise
 
 class RegisterRequest(BaseModel):
     phone_number: str = Field(..., description="Phone number with country code (e.g., +84912345678)")
@@ -11,13 +11,15 @@ class RegisterRequest(BaseModel):
     @field_validator('phone_number')
     @classmethod
     def validate_phone_number(cls, v):
-        try:
-            parsed = phonenumbers.parse(v, None)
-            if not phonenumbers.is_valid_number(parsed):
-                raise ValueError('Invalid phone number')
-            return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
-        except Exception:
-            raise ValueError('Invalid phone number format. Use international format (e.g., +84912345678)')
+        return normalize_or_raise(v)
+    
+    @field_validator('full_name')
+    @classmethod
+    def validate_full_name(cls, v):
+        v = v.strip()
+        if not v:
+            raise ValueError('Full name must not be blank')
+        return v
 
 class RegisterResponse(BaseModel):
     user_id: str
@@ -32,13 +34,7 @@ class LoginRequest(BaseModel):
     @field_validator('phone_number')
     @classmethod
     def validate_phone_number(cls, v):
-        try:
-            parsed = phonenumbers.parse(v, None)
-            if not phonenumbers.is_valid_number(parsed):
-                raise ValueError('Invalid phone number')
-            return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
-        except Exception:
-            raise ValueError('Invalid phone number format. Use international format (e.g., +84912345678)')
+        return normalize_or_raise(v)
 
 class TokenResponse(BaseModel):
     access_token: str
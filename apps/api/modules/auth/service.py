@@ -2,10 +2,12 @@ from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from apps.api.modules.auth.models import User
 from apps.api.modules.auth.database import get_db
+from apps.api.core.tracing import traced
 from typing import Optional
 import os
 
@@ -19,6 +21,7 @@ ACCESS_TOKEN_EXPIRE_DAYS = 7
 
 # Security scheme
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 def hash_password(password: str) -> str:
     """Hash a plain password"""
@@ -28,17 +31,10 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
     return pwd_context.verify(plain_password, hashed_password)
 
+@traced()
 def create_user(db: Session, phone_number: str, full_name: str, password: str) -> User:
     """Create a new user"""
-    # Check if user already exists
-    existing_user = db.query(User).filter(User.phone_number == phone_number).first()
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Phone number already registered"
-        )
-    
-    # Create new user
+    # Request validation has already run, so the slow bcrypt hash is only paid for well-formed input
     hashed_password = hash_password(password)
     user = User(
         phone_number=phone_number,
@@ -46,10 +42,21 @@ def create_user(db: Session, phone_number: str, full_name: str, password: str) -
         hashed_password=hashed_password
     )
     db.add(user)
-    db.commit()
+    
+    # No SELECT beforehand: the unique index on phone_number is the source of truth,
+    # which saves a round trip and closes the check-then-insert race
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Phone number already registered"
+        )
     db.refresh(user)
     return user
 
+@traced()
 def authenticate_user(db: Session, phone_number: str, password: str) -> Optional[User]:
     """Authenticate a user by phone number and password"""
     user = db.query(User).filter(User.phone_number == phone_number).first()
@@ -101,6 +108,15 @@ def get_current_user(
     
     return user
 
+def get_optional_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: Session = Depends(get_db)
+) -> Optional[User]:
+    """Current user if a token was sent, None for anonymous requests"""
+    if credentials is None:
+        return None
+    return get_current_user(credentials, db)
+
 def update_user(db: Session, user: User, full_name: str) -> User:
     """Update user profile"""
     user.full_name = full_name
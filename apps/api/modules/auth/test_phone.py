@@ -0,0 +1,21 @@
+import pytest
+from apps.api.modules.auth import phone
+from apps.api.modules.auth.phone import normalize_phone_number, validate_phone_number
+
+@pytest.mark.parametrize("raw", ["+84912345678", " +84 912 345 678 ", "+84-912-345-678"])
+def test_formats_of_one_number_normalize_to_e164(raw):
+    assert normalize_phone_number(raw) == "+84912345678"
+
+@pytest.mark.parametrize("raw", ["", "0912345678", "+8400", "not a number"])
+def test_invalid_numbers_normalize_to_none(raw):
+    assert normalize_phone_number(raw) is None
+    with pytest.raises(ValueError, match="international format"):
+        validate_phone_number(raw)
+
+def test_repeat_lookups_hit_the_bounded_cache():
+    phone._normalize.cache_clear()
+    for _ in range(3):
+        normalize_phone_number("+84912345678")
+    info = phone.phone_cache_info()
+    assert (info.hits, info.misses) == (2, 1)
+    assert info.maxsize == phone.PHONE_CACHE_SIZE
@@ -0,0 +1,45 @@
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from fastapi import HTTPException
+from pydantic import ValidationError
+from apps.api.modules.auth.database import SessionLocal
+from apps.api.modules.auth.schemas import RegisterRequest
+from apps.api.modules.auth.service import create_user
+
+def _phone() -> str:
+    return f"+8491{random.randint(1000000, 9999999)}"
+
+def test_parallel_registrations_for_one_phone_give_one_user_and_400s(db):
+    phone_number = _phone()
+    workers = 8
+    start = threading.Barrier(workers)
+
+    def register(_) -> int:
+        session = SessionLocal()
+        try:
+            start.wait(5)
+            create_user(session, phone_number, "Race Test", "secret123")
+            return 201
+        except HTTPException as exc:
+            return exc.status_code
+        finally:
+            session.close()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        statuses = sorted(pool.map(register, range(workers)))
+    assert statuses == [201] + [400] * (workers - 1)
+
+def test_duplicate_phone_is_a_400_and_the_session_stays_usable(db):
+    phone_number = _phone()
+    create_user(db, phone_number, "First", "secret123")
+    with pytest.raises(HTTPException) as excinfo:
+        create_user(db, phone_number, "Second", "secret123")
+    assert excinfo.value.status_code == 400
+    assert create_user(db, _phone(), "Third", "secret123").full_name == "Third"
+
+def test_blank_full_name_is_rejected_before_hashing():
+    with pytest.raises(ValidationError):
+        RegisterRequest(phone_number="+84912345678", full_name="   ", password="secret123")
+    assert RegisterRequest(phone_number="+84912345678", full_name=" Lan ", password="secret123").full_name == "Lan"
@@ -1,10 +1,17 @@
-import os
 import base64
-from google import genai
-from google.genai import types
+import logging
+from typing import Optional
+from apps.api.core.metrics import EDIT_FALLBACKS
+from apps.api.core.tracing import traced, tracer
 from .gemini_service import enhance_prompt
+from .image_service import build_image_result
+from .progress import report
+from .providers import get_provider
 
-def edit_region_service(image_base64: str, mask_base64: str, prompt: str) -> dict:
+logger = logging.getLogger(__name__)
+
+@traced()
+def edit_region_service(image_base64: str, mask_base64: str, prompt: str, provider: Optional[str] = None) -> dict:
     """
     Edit a region of the image based on the mask and prompt.
     
@@ -12,92 +19,50 @@ def edit_region_service(image_base64: str, mask_base64: str, prompt: str) -> dic
         image_base64: Original image as base64 string (without data URI prefix)
         mask_base64: Mask image as base64 string (white = area to edit)
         prompt: Description of the edit to apply
+        provider: Image provider name; defaults to IMAGE_PROVIDER
     
     Returns:
         dict with 'url' containing the edited image as data URI
     """
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        raise ValueError("GEMINI_API_KEY is not set in environment variables.")
+    image_provider = get_provider(provider)
 
     try:
-        # 1. Initialize Client
-        client = genai.Client(api_key=api_key)
-        
-        # 2. Enhance the edit prompt
-        enhanced_prompt = enhance_prompt(f"Edit the selected region to: {prompt}")
-        print(f"Edit Original: [{prompt}]")
-        print(f"Edit Enhanced: [{enhanced_prompt}]")
+        # 1. Enhance the edit prompt
+        enhanced_prompt = enhance_prompt(f"Edit the selected region to: {prompt}", provider)
+        logger.debug("Edit prompt enhanced", extra={"original_prompt": prompt, "enhanced_prompt": enhanced_prompt})
+        report("prompt_enhanced", prompt=enhanced_prompt)
         
-        # 3. Decode images from base64
+        # 2. Decode images from base64
         image_bytes = base64.b64decode(image_base64)
         mask_bytes = base64.b64decode(mask_base64)
         
-        # 4. Use Imagen's image editing capabilities
-        # Note: If Imagen edit is not available, we fall back to regenerating with context
+        # 3. Use the provider's image editing capabilities
+        # Note: If editing is not available, we fall back to regenerating with context
         try:
-            # Try using edit_image if available
-            response = client.models.edit_image(
-                model='imagen-4.0-generate-001',
-                prompt=enhanced_prompt,
-                image=types.RawReferenceImage(
-                    reference_id=1,
-                    reference_image=types.Image(image_bytes=image_bytes)
-                ),
-                mask=types.MaskReferenceImage(
-                    reference_id=2,
-                    config=types.MaskReferenceConfig(
-                        mask_mode=types.MaskMode.MASK_MODE_USER_PROVIDED,
-                        mask_dilation=0.03
-                    ),
-                    mask_image=types.Image(image_bytes=mask_bytes)
-                ),
-                config=types.EditImageConfig(
-                    edit_mode=types.EditMode.EDIT_MODE_INPAINT_INSERTION,
-                    number_of_images=1
-                )
-            )
-            
-            if not response.generated_images:
-                raise ValueError("No images returned from edit.")
-                
-            # Get the edited image
-            edited_bytes = response.generated_images[0].image.image_bytes
-            edited_base64 = base64.b64encode(edited_bytes).decode('utf-8')
-            
-            return {
-                "url": f"data:image/png;base64,{edited_base64}",
-                "prompt": enhanced_prompt
-            }
-            
+            report("image_queued")
+            edited_bytes = image_provider.edit_image(image_bytes, mask_bytes, enhanced_prompt)
         except Exception as edit_error:
-            print(f"Edit API not available or failed: {edit_error}")
-            print("Falling back to regeneration with prompt context...")
+            logger.warning("Edit API not available or failed, falling back to regeneration: %s", edit_error)
+            EDIT_FALLBACKS.labels(image_provider.name).inc()
+            report("edit_fallback", reason=str(edit_error))
             
             # Fallback: Generate a new image with context from the original
             # This is a simplified fallback - real implementation would be more sophisticated
             fallback_prompt = f"A bandana pattern design. {enhanced_prompt}. Style should match: seamless, tileable pattern suitable for fabric printing."
             
-            response = client.models.generate_images(
-                model='imagen-4.0-generate-001',
-                prompt=fallback_prompt,
-                config=types.GenerateImagesConfig(
-                    aspect_ratio='1:1'
-                )
-            )
-            
-            if not response.generated_images:
-                raise ValueError("No images returned from fallback generation.")
-                
-            generated_bytes = response.generated_images[0].image.image_bytes
-            generated_base64 = base64.b64encode(generated_bytes).decode('utf-8')
+            with tracer.start_as_current_span("generation.edit_fallback"):
+                report("image_queued")
+                generated_bytes = image_provider.generate_image(fallback_prompt)
+                report("image_ready")
             
-            return {
-                "url": f"data:image/png;base64,{generated_base64}",
-                "prompt": fallback_prompt,
-                "note": "Used fallback generation (edit API not available)"
-            }
+            result = build_image_result(generated_bytes, fallback_prompt)
+            result["note"] = "Used fallback generation (edit API not available)"
+            return result
+
+        report("image_ready")
+        # Outside the try above: a post-processing failure must surface, not trigger a paid regeneration
+        return build_image_result(edited_bytes, enhanced_prompt)
 
     except Exception as e:
-        print(f"Error in edit_region_service: {e}")
+        logger.error("Error in edit_region_service: %s", e)
         raise e
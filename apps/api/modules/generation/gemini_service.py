@@ -1,54 +1,47 @@
-import os
-from google import genai
-from google.genai import types
+from typing import Optional
+from apps.api.core.tracing import traced
+from .prompt_cache import PROMPT_CACHE_ENABLED, get_cache
+from .providers import get_provider
 
-def enhance_prompt(user_input: str) -> str:
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        print("Error: GEMINI_API_KEY not found.")
-        return user_input
+@traced()
+def enhance_prompt(user_input: str, provider: Optional[str] = None) -> str:
+    """
+    Enhance a user's idea into an image prompt; returns the input unchanged if enhancement fails.
+    Paraphrases of an earlier input reuse its enhanced prompt from the semantic cache.
+    """
+    image_provider = get_provider(provider)
+    cache = get_cache("enhance", image_provider.name) if PROMPT_CACHE_ENABLED else None
+    if cache is not None:
+        hit = cache.get(user_input)
+        if hit:
+            return hit[0]
 
-    try:
-        # Khởi tạo Client theo chuẩn mới
-        client = genai.Client(api_key=api_key)
-        
-        sys_instruct = """You are an expert textile and bandana design prompt engineer.
+    enhanced = image_provider.enhance_prompt(user_input)
+    # An unchanged prompt means enhancement failed; don't pin that in the cache
+    if cache is not None and enhanced != user_input:
+        cache.put(user_input, enhanced)
+    return enhanced
 
-TASK:
-Transform the user's idea into a single, precise English prompt for AI image generation.
+@traced()
+def enhance_prompts(user_inputs: list[str], provider: Optional[str] = None) -> list[str]:
+    """
+    Enhance many ideas at once, in order. Cached and repeated ideas are answered
+    without a model call; the rest go to the provider as one batch.
+    """
+    image_provider = get_provider(provider)
+    cache = get_cache("enhance", image_provider.name) if PROMPT_CACHE_ENABLED else None
+    results: dict[str, str] = {}
+    pending: list[str] = []
+    for user_input in dict.fromkeys(user_inputs):
+        hit = cache.get(user_input) if cache is not None else None
+        if hit:
+            results[user_input] = hit[0]
+        else:
+            pending.append(user_input)
 
-PRODUCT CONSTRAINTS:
-- Product type: bandana (square fabric scarf)
-- Flat 2D textile design, no 3D objects
-- Seamless or repeatable pattern
-- Centered and well-balanced composition
-- High contrast, clear shapes
-- Suitable for fabric printing
-
-STYLE CONSTRAINTS:
-- No text, no letters, no numbers
-- No logos, no watermarks
-- No photo-realism
-- No people, no animals unless explicitly requested
-- Clean vector-like illustration style
-
-OUTPUT RULES:
-- Return ONLY the final enhanced prompt
-- Do NOT include explanations, notes, or formatting
-- Do NOT mention any AI model names
-"""
-        
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=user_input,
-            config=types.GenerateContentConfig(
-                system_instruction=sys_instruct,
-                temperature=0.7
-            )
-        )
-        
-        # Lấy text kết quả
-        return response.text
-    except Exception as e:
-        print(f"Gemini Error: {e}")
-        return user_input
+    if pending:
+        for user_input, enhanced in zip(pending, image_provider.enhance_prompts(pending)):
+            results[user_input] = enhanced
+            if cache is not None and enhanced != user_input:
+                cache.put(user_input, enhanced)
+    return [results[user_input] for user_input in user_inputs]
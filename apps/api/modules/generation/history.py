@@ -0,0 +1,162 @@
+"""
+Per-user history of generated and edited designs.
+
+Recording only appends to an in-process buffer and returns the new id; a
+background thread inserts batches into `generations`, so the generation request
+path never waits on the database.
+"""
+from sqlalchemy import insert, select, or_, and_, desc
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Optional
+import logging
+import os
+import threading
+import uuid
+from apps.api.core.metrics import QUEUE_DEPTH
+from apps.api.modules.auth.database import SessionLocal
+from apps.api.modules.audit.service import MemoryBuffer
+from .models import Generation
+
+logger = logging.getLogger(__name__)
+
+HISTORY_FLUSH_INTERVAL = float(os.getenv("GENERATION_HISTORY_FLUSH_INTERVAL", "1.0"))
+HISTORY_BATCH_SIZE = int(os.getenv("GENERATION_HISTORY_BATCH_SIZE", "200"))
+HISTORY_MAX_BUFFERED = int(os.getenv("GENERATION_HISTORY_MAX_BUFFERED", "10000"))
+
+class HistoryWriter:
+    def __init__(self):
+        self.buffer = MemoryBuffer(HISTORY_MAX_BUFFERED)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(self, row: dict):
+        self.buffer.push(row)
+        if len(self.buffer) >= HISTORY_BATCH_SIZE:
+            self._wake.set()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="generation-history", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the writer and insert anything still buffered"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=HISTORY_FLUSH_INTERVAL * 5)
+            self._thread = None
+        self.flush()
+
+    def flush(self) -> int:
+        written = 0
+        while True:
+            batch = self.buffer.drain(HISTORY_BATCH_SIZE)
+            if not batch:
+                return written
+            try:
+                self._write(batch)
+            except Exception:
+                logger.exception("Failed to write %d generation history rows, requeueing", len(batch))
+                self.buffer.requeue(batch)
+                return written
+            written += len(batch)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(HISTORY_FLUSH_INTERVAL)
+            self._wake.clear()
+            self.flush()
+            QUEUE_DEPTH.labels("generation_history").set(len(self.buffer))
+
+    def _write(self, rows: list[dict]):
+        with SessionLocal() as db:
+            self._check_parents(db, rows)
+            try:
+                db.execute(insert(Generation), rows)
+                db.commit()
+            except IntegrityError:
+                # One bad row (e.g. its user was deleted meanwhile) shouldn't hold back the rest
+                db.rollback()
+                for row in rows:
+                    try:
+                        db.execute(insert(Generation), [row])
+                        db.commit()
+                    except IntegrityError:
+                        db.rollback()
+                        logger.warning("Dropping generation history row %s", row["id"])
+
+    @staticmethod
+    def _check_parents(db: Session, rows: list[dict]):
+        """Only keep parent links to the same user's generations"""
+        parent_ids = {row["parent_id"] for row in rows if row["parent_id"]}
+        if not parent_ids:
+            return
+        owners = {row["id"]: row["user_id"] for row in rows}
+        owners.update(db.execute(
+            select(Generation.id, Generation.user_id).where(Generation.id.in_(parent_ids))
+        ).all())
+        for row in rows:
+            if row["parent_id"] and owners.get(row["parent_id"]) != row["user_id"]:
+                row["parent_id"] = None
+
+history_writer = HistoryWriter()
+
+def record_generation(
+    user_id: str,
+    kind: str,
+    prompt: str,
+    result: dict,
+    provider: Optional[str] = None,
+    parent_id: Optional[str] = None,
+    duration_ms: Optional[int] = None
+) -> str:
+    """Queue a history row for a generation or edit result, returning its id"""
+    generation_id = str(uuid.uuid4())
+    history_writer.record({
+        "id": generation_id,
+        "user_id": user_id,
+        "kind": kind,
+        "prompt": prompt,
+        "enhanced_prompt": result.get("prompt"),
+        "provider": provider,
+        "digest": result.get("digest"),
+        "image_url": result.get("image_url"),
+        "preview_url": result.get("preview_url"),
+        "print_url": result.get("print_url"),
+        "parent_id": parent_id,
+        "cached": bool(result.get("cached")),
+        "duration_ms": duration_ms,
+        "created_at": datetime.utcnow(),
+    })
+    return generation_id
+
+def _encode_cursor(generation: Generation) -> str:
+    return f"{generation.created_at.isoformat()}|{generation.id}"
+
+def _decode_cursor(cursor: str) -> tuple[datetime, str]:
+    created_at, generation_id = cursor.split("|", 1)
+    return datetime.fromisoformat(created_at), generation_id
+
+def list_generations(db: Session, user_id: str, cursor: Optional[str] = None, limit: int = 20) -> dict:
+    """A user's generations newest first, using keyset pagination on (created_at, id)"""
+    query = db.query(Generation).filter(Generation.user_id == user_id)
+    if cursor:
+        try:
+            cursor_created_at, cursor_id = _decode_cursor(cursor)
+        except ValueError:
+            raise ValueError("Invalid cursor")
+        query = query.filter(or_(
+            Generation.created_at < cursor_created_at,
+            and_(Generation.created_at == cursor_created_at, Generation.id < cursor_id)
+        ))
+
+    # Fetch one extra row to know whether another page exists without a count()
+    generations = query.order_by(desc(Generation.created_at), desc(Generation.id)).limit(limit + 1).all()
+    next_cursor = _encode_cursor(generations[limit - 1]) if len(generations) > limit else None
+    return {"generations": generations[:limit], "next_cursor": next_cursor}
@@ -1,59 +1,47 @@
-import os
 import base64
-from google import genai
-from google.genai import types
+import logging
+from typing import Optional
+from apps.api.core.tracing import traced, tracer
+from .postprocess import POSTPROCESS_ENABLED, postprocess_image
+from .progress import report
+from .providers import get_provider
+from .similarity import index_design
 
-def generate_image(prompt: str) -> str:
-    """
-    Generates an image using Google Imagen 4 via the official google-genai SDK.
-    Returns the URL-safe Base64 string of the generated image.
-    """
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        raise ValueError("GEMINI_API_KEY is not set in environment variables.")
+logger = logging.getLogger(__name__)
 
+def generate_image_bytes(prompt: str, provider: Optional[str] = None) -> bytes:
+    """Generate a square bandana image with the configured provider, returning raw PNG bytes"""
+    image_provider = get_provider(provider)
     try:
-        # 1. Initialize Client
-        client = genai.Client(api_key=api_key)
-
-        # 2. Call Imagen 3 Model
-        response = client.models.generate_images(
-            model='imagen-4.0-generate-001',
-            prompt=prompt,
-            config=types.GenerateImagesConfig(
-                aspect_ratio='1:1'  # Square aspect ratio for Bandana
-            )
-        )
-
-        # 3. Process Response
-        if not response.generated_images:
-            raise ValueError("No images returned from Imagen 4.")
+        return image_provider.generate_image(prompt)
+    except Exception as e:
+        logger.error("Error generating image with provider %s: %s", image_provider.name, e)
+        raise e
 
-        # Get raw bytes from the first image
-        image_bytes = response.generated_images[0].image.image_bytes
+@traced()
+def generate_image(prompt: str, provider: Optional[str] = None) -> str:
+    """
+    Generates a square bandana image with the configured provider
+    (Imagen 4 via google-genai by default).
+    Returns the Base64 string of the generated PNG.
+    """
+    return base64.b64encode(generate_image_bytes(prompt, provider)).decode('utf-8')
 
-        # 4. Convert to Base64 String
-        # Check if image_bytes is already a base64 string (sometimes API returns string)
-        if isinstance(image_bytes, str):
-            # Already a string, might be base64 - return as-is
-            return image_bytes
-        elif isinstance(image_bytes, bytes):
-            # Check if it's already base64 encoded bytes (starts with typical b64 chars)
-            try:
-                # Try to decode as UTF-8 string first
-                decoded_str = image_bytes.decode('utf-8')
-                # If it decodes to a string and looks like base64, return it
-                if decoded_str.startswith('iVBOR') or decoded_str.startswith('/9j/'):
-                    return decoded_str
-            except UnicodeDecodeError:
-                pass
-            
-            # Raw image bytes - need to encode to base64
-            base64_str = base64.b64encode(image_bytes).decode('utf-8')
-            return base64_str
-        else:
-            raise ValueError(f"Unexpected image_bytes type: {type(image_bytes)}")
+def build_image_result(image_bytes: bytes, prompt: str) -> dict:
+    """
+    Build the API result for a generated or edited image, running post-processing
+    (seam repair, previews, print master, perceptual hash) when enabled.
+    Post-processed designs are added to the near-duplicate index.
+    """
+    result = {"prompt": prompt}
+    if POSTPROCESS_ENABLED:
+        with tracer.start_as_current_span("generation.postprocess"):
+            processed = postprocess_image(image_bytes)
+        report("postprocessed", preview_url=processed["preview_url"], seams_repaired=processed["seams_repaired"])
+        image_bytes = processed.pop("image")
+        result.update(processed)
+        index_design(result)
 
-    except Exception as e:
-        print(f"Error generating image with Imagen 4: {e}")
-        raise e
+    # Data URI so the frontend can use it directly in <img src="...">
+    result["url"] = f"data:image/png;base64,{base64.b64encode(image_bytes).decode('utf-8')}"
+    return result
@@ -0,0 +1,75 @@
+"""
+Generation and edit runs, either awaited by the blocking endpoints or as jobs
+whose stage events are streamed to the client while the pipeline works. Both go
+through the fair scheduler, so they share the caller's quota and queue.
+"""
+from concurrent.futures import Future
+from typing import Callable, Optional
+from starlette.concurrency import run_in_threadpool
+import asyncio
+import logging
+import time
+import uuid
+from .edit_service import edit_region_service
+from .history import record_generation
+from .progress import progress_bus, report, reporting_to
+from .providers import IMAGE_PROVIDER
+from .scheduler import Caller, schedule
+from .schemas import GenerateRequest, RegionEditRequest
+from .service import generate_pattern_service
+
+logger = logging.getLogger(__name__)
+
+def _elapsed_ms(started: float) -> int:
+    return round((time.perf_counter() - started) * 1000)
+
+def run_generation(request: GenerateRequest, user_id: Optional[str] = None) -> dict:
+    """Generate a pattern, saving it to the user's history when signed in"""
+    started = time.perf_counter()
+    result = generate_pattern_service(request.prompt, request.provider, request.use_cache, request.speculative)
+    if user_id:
+        result["generation_id"] = record_generation(
+            user_id, "generate", request.prompt, result,
+            provider=request.provider or IMAGE_PROVIDER, duration_ms=_elapsed_ms(started)
+        )
+    return result
+
+def run_edit(request: RegionEditRequest, user_id: Optional[str] = None) -> dict:
+    """Edit a region of a design, saving it to the user's history when signed in"""
+    started = time.perf_counter()
+    result = edit_region_service(request.image_base64, request.mask_base64, request.prompt, request.provider)
+    if user_id:
+        result["generation_id"] = record_generation(
+            user_id, "edit", request.prompt, result, provider=request.provider or IMAGE_PROVIDER,
+            parent_id=request.parent_id, duration_ms=_elapsed_ms(started)
+        )
+    return result
+
+async def run_scheduled(caller: Caller, run: Callable[[], dict], cost: float = 1.0) -> dict:
+    """Queue a run behind the caller's quota and wait for its result without holding a threadpool thread"""
+    # schedule() may make a Redis round trip for the quota, so only that part runs in the threadpool
+    future = await run_in_threadpool(schedule, caller, run, cost)
+    # Shielded so a client disconnect doesn't cancel a run whose quota is already spent
+    return await asyncio.shield(asyncio.wrap_future(future))
+
+def _run_job(run: Callable[[], dict]) -> dict:
+    report("started")
+    return run()
+
+def _finish_job(job_id: str, future: Future):
+    try:
+        result = future.result()
+    except Exception as e:
+        logger.exception("Generation job %s failed", job_id)
+        progress_bus.publish(job_id, "failed", {"detail": str(e)})
+    else:
+        progress_bus.publish(job_id, "completed", {"result": result})
+
+def start_job(caller: Caller, run: Callable[[], dict], cost: float = 1.0) -> str:
+    """Queue a run in the background and return its job id; progress goes to the bus"""
+    job_id = str(uuid.uuid4())
+    # The scheduler reports "queued" and runs the job in a copy of this context, reporter included
+    with reporting_to(job_id):
+        future = schedule(caller, lambda: _run_job(run), cost)
+    future.add_done_callback(lambda done: _finish_job(job_id, done))
+    return job_id
@@ -0,0 +1,42 @@
+from sqlalchemy import Column, String, DateTime, Text, BigInteger, Boolean, Integer, ForeignKey, Index
+import uuid
+from datetime import datetime
+from apps.api.modules.auth.database import Base
+
+class DesignHash(Base):
+    __tablename__ = "design_hashes"
+
+    digest = Column(String, primary_key=True) # Content address from post-processing
+    phash = Column(BigInteger, nullable=False) # 64-bit pHash stored as a signed bigint
+    prompt = Column(Text, nullable=True)
+    preview_url = Column(String, nullable=True)
+    print_url = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f"<DesignHash {self.digest}>"
+
+class Generation(Base):
+    __tablename__ = "generations"
+    # History listing: a user's generations newest first, keyset-paginated on (created_at, id)
+    __table_args__ = (
+        Index("ix_generations_user_id_created_at", "user_id", "created_at", "id"),
+    )
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String, nullable=False) # "generate" or "edit"
+    prompt = Column(Text, nullable=False)
+    enhanced_prompt = Column(Text, nullable=True)
+    provider = Column(String, nullable=True)
+    digest = Column(String, nullable=True) # Content address of the image under MEDIA_ROOT
+    image_url = Column(String, nullable=True)
+    preview_url = Column(String, nullable=True)
+    print_url = Column(String, nullable=True)
+    parent_id = Column(String, ForeignKey("generations.id", ondelete="SET NULL"), nullable=True) # Image an edit started from
+    cached = Column(Boolean, default=False, nullable=False)
+    duration_ms = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<Generation {self.kind} {self.id}>"
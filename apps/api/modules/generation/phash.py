@@ -0,0 +1,35 @@
+"""
+64-bit DCT perceptual hashes (pHash) of designs. Visually similar images get
+hashes a small Hamming distance apart, so near-duplicates can be found without
+comparing pixels.
+Depends only on NumPy and Pillow, like the post-processing workers that call it.
+"""
+from functools import lru_cache
+import numpy as np
+from PIL import Image
+
+@lru_cache(maxsize=1)
+def _dct_matrix(size: int) -> np.ndarray:
+    """Orthonormal DCT-II basis, so a 2D DCT is C @ X @ C.T"""
+    n = np.arange(size)
+    matrix = np.cos(np.pi * (2 * n[None, :] + 1) * n[:, None] / (2 * size)) * np.sqrt(2 / size)
+    matrix[0] /= np.sqrt(2)
+    return matrix.astype(np.float32)
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    return int("".join("1" if b else "0" for b in bits.flatten()), 2)
+
+def phash(image: Image.Image) -> int:
+    """DCT hash: low-frequency coefficients of a 32x32 greyscale copy compared to their median"""
+    pixels = np.asarray(image.convert("L").resize((32, 32), Image.LANCZOS), dtype=np.float32)
+    matrix = _dct_matrix(32)
+    low = (matrix @ pixels @ matrix.T)[:8, :8]
+    # The DC term only tracks overall brightness, so leave it out of the median
+    median = np.median(low.flatten()[1:])
+    return _bits_to_int(low > median)
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+def to_hex(value: int) -> str:
+    return f"{value:016x}"
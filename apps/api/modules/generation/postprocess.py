@@ -0,0 +1,171 @@
+"""
+Post-processing for generated bandana images, run in a process pool:
+
+1. Check the tile seams and repair them with offset-and-blend when the edges
+   don't wrap.
+2. Encode small WebP/AVIF previews for the UI and compute a perceptual hash
+   for near-duplicate lookups.
+3. Upscale to print resolution and write a lossless PNG print master, once per
+   image, in the background.
+
+Outputs are content-addressed under MEDIA_ROOT/generated/<digest>/ and served
+from /media, so the same image is never processed twice.
+
+This module only depends on NumPy and Pillow so pool workers start quickly.
+"""
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import threading
+import numpy as np
+from PIL import Image, features
+from .phash import phash, to_hex
+
+logger = logging.getLogger(__name__)
+
+MEDIA_ROOT = os.getenv("MEDIA_ROOT", "media")
+MEDIA_URL = "/media"
+POSTPROCESS_ENABLED = os.getenv("POSTPROCESS_ENABLED", "1") == "1"
+POSTPROCESS_WORKERS = int(os.getenv("POSTPROCESS_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+# Edge mismatch relative to the image's own neighbouring-pixel difference; ~1 means seamless
+SEAM_THRESHOLD = float(os.getenv("SEAM_THRESHOLD", "2.0"))
+PREVIEW_SIZE = int(os.getenv("PREVIEW_SIZE", "512"))
+PRINT_DPI = int(os.getenv("PRINT_DPI", "150"))
+PRINT_SIZE_INCHES = float(os.getenv("PRINT_SIZE_INCHES", "22")) # Standard bandana
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_pending_prints: set[str] = set()
+
+def seam_score(pixels: np.ndarray) -> float:
+    """How much more the opposite edges differ than neighbouring pixels do on average"""
+    a = pixels.astype(np.float32)
+    edge = (np.abs(a[:, 0] - a[:, -1]).mean() + np.abs(a[0, :] - a[-1, :]).mean()) / 2
+    interior = (np.abs(np.diff(a, axis=1)).mean() + np.abs(np.diff(a, axis=0)).mean()) / 2
+    return float(edge / max(interior, 1.0))
+
+def _blend_axis(pixels: np.ndarray, axis: int) -> np.ndarray:
+    # Blend with a half-period shifted copy: the original wins in the middle, where
+    # the copy has its seam, and the copy wins at the borders, where it wraps cleanly
+    size = pixels.shape[axis]
+    shifted = np.roll(pixels, size // 2, axis=axis)
+    weight = 1 - np.abs(np.linspace(-1, 1, size, dtype=np.float32))
+    shape = [1] * pixels.ndim
+    shape[axis] = size
+    weight = weight.reshape(shape)
+    return pixels * weight + shifted * (1 - weight)
+
+def repair_seams(pixels: np.ndarray) -> np.ndarray:
+    """Make an image tile seamlessly with offset-and-blend along both axes"""
+    blended = _blend_axis(_blend_axis(pixels.astype(np.float32), axis=1), axis=0)
+    return np.clip(blended, 0, 255).astype(np.uint8)
+
+def _encode(image: Image.Image, fmt: str, **options) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, **options)
+    return buffer.getvalue()
+
+def prepare_image(image_bytes: bytes) -> dict:
+    """Pool task: seam check/repair, preview encoding and perceptual hash"""
+    image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+    pixels = np.asarray(image)
+    score = seam_score(pixels)
+    repaired = score > SEAM_THRESHOLD
+    if repaired:
+        image = Image.fromarray(repair_seams(pixels))
+
+    preview = image.copy()
+    preview.thumbnail((PREVIEW_SIZE, PREVIEW_SIZE), Image.LANCZOS)
+    previews = {"webp": _encode(preview, "WEBP", quality=80, method=4)}
+    if features.check("avif"):
+        previews["avif"] = _encode(preview, "AVIF", quality=60)
+
+    return {
+        "image": _encode(image, "PNG") if repaired else image_bytes,
+        "seam_score": score,
+        "seams_repaired": repaired,
+        "previews": previews,
+        "phash": to_hex(phash(image)),
+    }
+
+def render_print_master(image_bytes: bytes, path: str):
+    """Pool task: upscale to print resolution and write a lossless PNG tagged with the DPI"""
+    image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+    size = round(PRINT_SIZE_INCHES * PRINT_DPI)
+    if image.width != size:
+        image = image.resize((size, size), Image.LANCZOS)
+    tmp_path = f"{path}.tmp"
+    image.save(tmp_path, format="PNG", dpi=(PRINT_DPI, PRINT_DPI))
+    os.replace(tmp_path, path) # Readers never see a half-written master
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: forking a process that runs logging/tracing threads can deadlock
+                _pool = ProcessPoolExecutor(
+                    max_workers=POSTPROCESS_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _pool
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=False)
+        _pool = None
+
+def _print_done(digest: str, future: Future):
+    _pending_prints.discard(digest)
+    if future.exception():
+        logger.error("Print master rendering failed for %s: %s", digest, future.exception())
+
+def _media_url(path: Path) -> str:
+    return f"{MEDIA_URL}/{path.relative_to(MEDIA_ROOT).as_posix()}"
+
+def postprocess_image(image_bytes: bytes) -> dict:
+    """
+    Run the post-processing stage for one generated image.
+    Returns the (possibly seam-repaired) PNG bytes plus image, preview and print master URLs;
+    the print master may still be rendering when this returns.
+    """
+    digest = hashlib.sha256(image_bytes).hexdigest()[:32]
+    directory = Path(MEDIA_ROOT) / "generated" / digest
+    directory.mkdir(parents=True, exist_ok=True)
+
+    prepared = _get_pool().submit(prepare_image, image_bytes).result()
+
+    preview_urls = {}
+    for fmt, data in prepared["previews"].items():
+        path = directory / f"preview.{fmt}"
+        if not path.exists():
+            path.write_bytes(data)
+        preview_urls[fmt] = _media_url(path)
+
+    image_path = directory / "image.png"
+    if not image_path.exists():
+        image_path.write_bytes(prepared["image"])
+
+    print_path = directory / "print.png"
+    if not print_path.exists() and digest not in _pending_prints:
+        _pending_prints.add(digest)
+        future = _get_pool().submit(render_print_master, prepared["image"], str(print_path))
+        future.add_done_callback(lambda f: _print_done(digest, f))
+
+    return {
+        "image": prepared["image"],
+        "digest": digest,
+        "seam_score": round(prepared["seam_score"], 3),
+        "seams_repaired": prepared["seams_repaired"],
+        "phash": prepared["phash"],
+        "image_url": _media_url(image_path),
+        "preview_url": preview_urls["webp"],
+        "preview_avif_url": preview_urls.get("avif"),
+        "print_url": _media_url(print_path),
+    }
@@ -0,0 +1,165 @@
+"""
+Stage events for generation jobs.
+
+The pipeline calls `report(stage, **data)` as it goes; when it runs as a job the
+events are appended to a per-job log on the progress bus, which SSE streams
+replay from any offset and then follow. PROGRESS_BACKEND selects the bus:
+"memory" works within one process, "redis" keeps the log in a Redis list and
+wakes followers over pub/sub, so any API worker can stream any job.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Callable, Optional
+import asyncio
+import json
+import os
+import threading
+import time
+
+PROGRESS_BACKEND = os.getenv("PROGRESS_BACKEND", "memory")
+PROGRESS_TTL_SECONDS = int(os.getenv("PROGRESS_TTL_SECONDS", "600"))
+PROGRESS_HEARTBEAT_SECONDS = float(os.getenv("PROGRESS_HEARTBEAT_SECONDS", "15"))
+
+TERMINAL_STAGES = frozenset({"completed", "failed"})
+
+class UnknownJobError(KeyError):
+    pass
+
+_reporter: ContextVar[Optional[Callable[[str, dict], None]]] = ContextVar("progress_reporter", default=None)
+
+def report(stage: str, **data):
+    """Publish a stage event for the job running on this thread, if any"""
+    reporter = _reporter.get()
+    if reporter is not None:
+        reporter(stage, data)
+
+@contextmanager
+def reporting_to(job_id: str):
+    """Send report() calls made inside the block to a job's event log"""
+    token = _reporter.set(lambda stage, data: progress_bus.publish(job_id, stage, data))
+    try:
+        yield
+    finally:
+        _reporter.reset(token)
+
+def _event(index: int, stage: str, data: dict) -> dict:
+    return {"id": index, "stage": stage, "data": data, "ts": time.time()}
+
+class MemoryBus:
+    """Per-process event logs; publishers are worker threads, followers are on the event loop"""
+    def __init__(self):
+        self._jobs: dict[str, list[dict]] = {}
+        self._finished: dict[str, float] = {}
+        self._waiters: dict[str, set[tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+        self._lock = threading.Lock()
+
+    def publish(self, job_id: str, stage: str, data: dict):
+        with self._lock:
+            events = self._jobs.setdefault(job_id, [])
+            events.append(_event(len(events), stage, data))
+            if stage in TERMINAL_STAGES:
+                self._finished[job_id] = time.monotonic()
+            waiters = list(self._waiters.get(job_id, ()))
+            self._expire()
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(waiter.set)
+
+    def _expire(self):
+        cutoff = time.monotonic() - PROGRESS_TTL_SECONDS
+        for job_id in [j for j, finished in self._finished.items() if finished < cutoff]:
+            self._jobs.pop(job_id, None)
+            self._finished.pop(job_id, None)
+
+    async def follow(self, job_id: str, after: int = 0) -> AsyncIterator[Optional[dict]]:
+        if job_id not in self._jobs:
+            raise UnknownJobError(job_id)
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._waiters.setdefault(job_id, set()).add(waiter)
+        try:
+            while True:
+                waiter[1].clear()
+                with self._lock:
+                    events = self._jobs.get(job_id, [])[after:]
+                    finished = job_id in self._finished
+                if not events and finished:
+                    return # Resumed past the final event
+                for event in events:
+                    yield event
+                    after = event["id"] + 1
+                    if event["stage"] in TERMINAL_STAGES:
+                        return
+                if not events:
+                    try:
+                        await asyncio.wait_for(waiter[1].wait(), PROGRESS_HEARTBEAT_SECONDS)
+                    except asyncio.TimeoutError:
+                        yield None
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(job_id)
+                if waiters is not None:
+                    waiters.discard(waiter)
+                    if not waiters:
+                        del self._waiters[job_id]
+
+class RedisBus:
+    """Event log in a Redis list per job, with a pub/sub channel to wake followers"""
+    def __init__(self, redis_url: str):
+        import redis
+        self._redis_url = redis_url
+        self._client = redis.Redis.from_url(redis_url)
+
+    @staticmethod
+    def _key(job_id: str) -> str:
+        return f"generation:job:{job_id}:events"
+
+    @staticmethod
+    def _channel(job_id: str) -> str:
+        return f"generation:job:{job_id}"
+
+    def publish(self, job_id: str, stage: str, data: dict):
+        key = self._key(job_id)
+        # The index is only known after the push, so it's assigned by position when read
+        payload = json.dumps({"stage": stage, "data": data, "ts": time.time()})
+        pipe = self._client.pipeline(transaction=True)
+        pipe.rpush(key, payload)
+        pipe.expire(key, PROGRESS_TTL_SECONDS)
+        pipe.publish(self._channel(job_id), stage)
+        pipe.execute()
+
+    async def follow(self, job_id: str, after: int = 0) -> AsyncIterator[Optional[dict]]:
+        import redis.asyncio as aioredis
+        client = aioredis.Redis.from_url(self._redis_url)
+        pubsub = client.pubsub()
+        try:
+            if not await client.exists(self._key(job_id)):
+                raise UnknownJobError(job_id)
+            # Subscribe before reading the log so nothing published in between is missed
+            await pubsub.subscribe(self._channel(job_id))
+            while True:
+                raw = await client.lrange(self._key(job_id), after, -1)
+                for offset, item in enumerate(raw):
+                    event = {"id": after + offset, **json.loads(item)}
+                    yield event
+                    if event["stage"] in TERMINAL_STAGES:
+                        return
+                after += len(raw)
+                if not raw:
+                    last = await client.lindex(self._key(job_id), -1)
+                    if last is not None and json.loads(last)["stage"] in TERMINAL_STAGES:
+                        return # Resumed past the final event
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True, timeout=PROGRESS_HEARTBEAT_SECONDS
+                    )
+                    if message is None:
+                        yield None
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+
+def _make_bus():
+    if PROGRESS_BACKEND == "redis":
+        return RedisBus(os.getenv("REDIS_URL", "redis://localhost:6379"))
+    return MemoryBus()
+
+progress_bus = _make_bus()
@@ -0,0 +1,137 @@
+"""
+Semantic cache for prompt enhancement and image generation.
+
+Prompts are embedded with a hashed n-gram vectorizer (word unigrams plus
+character trigrams, order-insensitive, no model to load) and compared by cosine
+similarity against every cached prompt in one NumPy matrix-vector product, so
+"blue paisley bandana" and "paisley bandana in blue" share an entry while
+"red paisley bandana" does not. Each cache is a fixed-size LRU, per process.
+"""
+from collections import OrderedDict
+from typing import Any, Optional
+import os
+import re
+import threading
+import zlib
+import numpy as np
+from apps.api.core.metrics import PROMPT_CACHE_LOOKUPS
+
+PROMPT_CACHE_ENABLED = os.getenv("PROMPT_CACHE_ENABLED", "1") == "1"
+EMBEDDING_DIM = int(os.getenv("PROMPT_EMBEDDING_DIM", "2048"))
+ENHANCE_CACHE_SIZE = int(os.getenv("ENHANCE_CACHE_SIZE", "2048"))
+ENHANCE_CACHE_THRESHOLD = float(os.getenv("ENHANCE_CACHE_THRESHOLD", "0.85"))
+# Cached results hold the full image, so keep fewer of them and match more strictly
+GENERATION_CACHE_SIZE = int(os.getenv("GENERATION_CACHE_SIZE", "64"))
+GENERATION_CACHE_THRESHOLD = float(os.getenv("GENERATION_CACHE_THRESHOLD", "0.9"))
+
+STOPWORDS = frozenset({
+    "a", "an", "and", "the", "in", "on", "of", "with", "for", "to", "some", "style",
+    "please", "make", "me", "design", "pattern", "bandana", "bandanna",
+})
+WORD_WEIGHT = 1.0
+TRIGRAM_WEIGHT = 0.35
+
+def _stem(word: str) -> str:
+    """Fold simple plurals ("skulls" -> "skull")"""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+def _tokens(text: str) -> list[str]:
+    return [_stem(word) for word in re.findall(r"[a-z0-9]+", text.lower()) if word not in STOPWORDS]
+
+def _bucket(feature: str) -> tuple[int, float]:
+    # Signed feature hashing: collisions cancel out on average instead of adding up
+    value = zlib.crc32(feature.encode("utf-8"))
+    return value % EMBEDDING_DIM, 1.0 if value & 0x80000000 else -1.0
+
+def embed(text: str) -> np.ndarray:
+    """Unit-length hashed bag of words and character trigrams"""
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    for word in set(_tokens(text)):
+        index, sign = _bucket(f"w:{word}")
+        vector[index] += sign * WORD_WEIGHT
+        padded = f"<{word}>"
+        for i in range(len(padded) - 2):
+            index, sign = _bucket(f"c:{padded[i:i + 3]}")
+            vector[index] += sign * TRIGRAM_WEIGHT
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+class SemanticCache:
+    """Fixed-capacity LRU whose lookups match the most similar cached prompt above a threshold"""
+    def __init__(self, name: str, capacity: int, threshold: float):
+        self.name = name
+        self.capacity = capacity
+        self.threshold = threshold
+        self._vectors = np.zeros((capacity, EMBEDDING_DIM), dtype=np.float32)
+        self._entries: OrderedDict[int, tuple[str, Any]] = OrderedDict() # slot -> (prompt, value), LRU first
+        self._slots_by_prompt: dict[str, int] = {}
+        self._free = list(range(capacity - 1, -1, -1))
+        self._lock = threading.Lock()
+
+    def get(self, prompt: str) -> Optional[tuple[Any, str, float]]:
+        """(value, cached prompt, similarity) of the closest entry, or None below the threshold"""
+        vector = embed(prompt)
+        with self._lock:
+            if not self._entries or not vector.any():
+                PROMPT_CACHE_LOOKUPS.labels(self.name, "miss").inc()
+                return None
+            # Free slots are zero rows, so they can never beat the threshold
+            similarities = self._vectors @ vector
+            slot = int(np.argmax(similarities))
+            similarity = float(similarities[slot])
+            if similarity < self.threshold or slot not in self._entries:
+                PROMPT_CACHE_LOOKUPS.labels(self.name, "miss").inc()
+                return None
+            self._entries.move_to_end(slot)
+            cached_prompt, value = self._entries[slot]
+        PROMPT_CACHE_LOOKUPS.labels(self.name, "hit").inc()
+        return value, cached_prompt, similarity
+
+    def put(self, prompt: str, value: Any):
+        vector = embed(prompt)
+        if not vector.any():
+            return
+        with self._lock:
+            slot = self._slots_by_prompt.get(prompt)
+            if slot is None:
+                if self._free:
+                    slot = self._free.pop()
+                else:
+                    slot, (evicted, _) = self._entries.popitem(last=False)
+                    del self._slots_by_prompt[evicted]
+                self._slots_by_prompt[prompt] = slot
+                self._vectors[slot] = vector
+            self._entries[slot] = (prompt, value)
+            self._entries.move_to_end(slot)
+
+    def clear(self):
+        with self._lock:
+            self._vectors[:] = 0
+            self._entries.clear()
+            self._slots_by_prompt.clear()
+            self._free = list(range(self.capacity - 1, -1, -1))
+
+    def __len__(self):
+        return len(self._entries)
+
+_caches: dict[tuple[str, str], SemanticCache] = {}
+_caches_lock = threading.Lock()
+
+def get_cache(kind: str, provider: str) -> SemanticCache:
+    """The "enhance" or "generate" cache for a provider; providers never share results"""
+    key = (kind, provider)
+    cache = _caches.get(key)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(key)
+            if cache is None:
+                if kind == "generate":
+                    cache = SemanticCache(kind, GENERATION_CACHE_SIZE, GENERATION_CACHE_THRESHOLD)
+                else:
+                    cache = SemanticCache(kind, ENHANCE_CACHE_SIZE, ENHANCE_CACHE_THRESHOLD)
+                _caches[key] = cache
+    return cache
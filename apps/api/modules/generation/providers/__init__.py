@@ -0,0 +1,45 @@
+"""
+Image-generation provider registry.
+
+The provider is chosen per request (the `provider` field on generation
+requests) or per environment with IMAGE_PROVIDER; "google" is the default and
+"local" needs no network access.
+"""
+from typing import Callable, Optional
+import os
+import threading
+from .base import ImageProvider, UnknownProviderError
+from .google import GoogleProvider
+from .local import LocalProvider
+
+IMAGE_PROVIDER = os.getenv("IMAGE_PROVIDER", "google")
+
+_factories: dict[str, Callable[[], ImageProvider]] = {}
+_instances: dict[str, ImageProvider] = {}
+_lock = threading.Lock()
+
+def register_provider(name: str, factory: Callable[[], ImageProvider]):
+    """Make a provider available by name; the factory is called once, on first use"""
+    _factories[name] = factory
+    _instances.pop(name, None)
+
+def available_providers() -> list[str]:
+    return sorted(_factories)
+
+def get_provider(name: Optional[str] = None) -> ImageProvider:
+    """Return the named provider, or the environment default"""
+    name = name or IMAGE_PROVIDER
+    provider = _instances.get(name)
+    if provider is not None:
+        return provider
+    if name not in _factories:
+        raise UnknownProviderError(
+            f"Unknown image provider '{name}'. Available: {', '.join(available_providers())}"
+        )
+    with _lock:
+        if name not in _instances:
+            _instances[name] = _factories[name]()
+        return _instances[name]
+
+register_provider("google", GoogleProvider)
+register_provider("local", LocalProvider)
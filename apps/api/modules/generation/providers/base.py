@@ -0,0 +1,27 @@
+from abc import ABC, abstractmethod
+
+class UnknownProviderError(ValueError):
+    pass
+
+class ImageProvider(ABC):
+    """
+    Backend for the generation pipeline: prompt enhancement, image generation
+    and masked region editing. Images are exchanged as raw PNG bytes.
+    """
+    name: str
+
+    @abstractmethod
+    def enhance_prompt(self, user_input: str) -> str:
+        """Turn a user's idea into a detailed image prompt; fall back to the input on failure"""
+
+    def enhance_prompts(self, user_inputs: list[str]) -> list[str]:
+        """Enhance several ideas, in order; providers that can batch them into one call override this"""
+        return [self.enhance_prompt(user_input) for user_input in user_inputs]
+
+    @abstractmethod
+    def generate_image(self, prompt: str) -> bytes:
+        """Generate one square bandana image for the prompt"""
+
+    @abstractmethod
+    def edit_image(self, image_bytes: bytes, mask_bytes: bytes, prompt: str) -> bytes:
+        """Repaint the white area of the mask according to the prompt"""
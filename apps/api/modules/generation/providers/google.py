@@ -0,0 +1,249 @@
+import os
+import base64
+import json
+import logging
+import threading
+import time
+from typing import Optional
+from pydantic import BaseModel
+from apps.api.core.metrics import track_model_call
+from .base import ImageProvider
+
+logger = logging.getLogger(__name__)
+
+ENHANCE_MODEL = "gemini-2.5-flash"
+IMAGE_MODEL = "imagen-4.0-generate-001"
+
+ENHANCE_SYSTEM_INSTRUCTION = """You are an expert textile and bandana design prompt engineer.
+
+TASK:
+Transform the user's idea into a single, precise English prompt for AI image generation.
+
+PRODUCT CONSTRAINTS:
+- Product type: bandana (square fabric scarf)
+- Flat 2D textile design, no 3D objects
+- Seamless or repeatable pattern
+- Centered and well-balanced composition
+- High contrast, clear shapes
+- Suitable for fabric printing
+
+STYLE CONSTRAINTS:
+- No text, no letters, no numbers
+- No logos, no watermarks
+- No photo-realism
+- No people, no animals unless explicitly requested
+- Clean vector-like illustration style
+
+OUTPUT RULES:
+- Return ONLY the final enhanced prompt
+- Do NOT include explanations, notes, or formatting
+- Do NOT mention any AI model names
+"""
+
+BATCH_INSTRUCTION = ENHANCE_SYSTEM_INSTRUCTION + """
+BATCH MODE:
+The user message is a JSON array of ideas, each with an "index".
+Enhance every idea independently, following all the rules above.
+Return a JSON array with one {"index", "prompt"} object per idea, reusing its index.
+"""
+
+ENHANCE_BATCH_SIZE = int(os.getenv("ENHANCE_BATCH_SIZE", "25"))
+ENHANCE_CONTEXT_CACHE = os.getenv("ENHANCE_CONTEXT_CACHE", "true").lower() == "true"
+ENHANCE_CONTEXT_CACHE_TTL_SECONDS = int(os.getenv("ENHANCE_CONTEXT_CACHE_TTL_SECONDS", "3600"))
+
+class EnhancedPrompt(BaseModel):
+    index: int
+    prompt: str
+
+def _types():
+    # google.genai.types takes well over a second to import, so load it on the first model call
+    from google.genai import types
+    return types
+
+def preload_sdk():
+    """Import the SDK ahead of the first model call; run it off the startup path, e.g. in a thread"""
+    _types()
+    from google import genai  # noqa: F401
+
+def _to_raw_bytes(image_bytes) -> bytes:
+    # The SDK has been seen returning base64 text instead of raw bytes
+    if isinstance(image_bytes, str):
+        return base64.b64decode(image_bytes)
+    if isinstance(image_bytes, bytes):
+        if image_bytes.startswith((b'iVBOR', b'/9j/')):
+            return base64.b64decode(image_bytes)
+        return image_bytes
+    raise ValueError(f"Unexpected image_bytes type: {type(image_bytes)}")
+
+class GoogleProvider(ImageProvider):
+    """Gemini for prompt enhancement and Imagen 4 for generation and editing, via google-genai"""
+    name = "google"
+
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+        self._instruction_cache: Optional[str] = None
+        self._instruction_cache_expires = 0.0
+        self._instruction_cache_failed = False
+
+    def _get_client(self):
+        # One client per process so HTTP connections are reused across requests
+        if self._client is None:
+            api_key = os.getenv("GEMINI_API_KEY")
+            if not api_key:
+                raise ValueError("GEMINI_API_KEY is not set in environment variables.")
+            with self._lock:
+                if self._client is None:
+                    from google import genai
+                    self._client = genai.Client(api_key=api_key)
+        return self._client
+
+    def enhance_prompt(self, user_input: str) -> str:
+        try:
+            client = self._get_client()
+            types = _types()
+            with track_model_call("enhance", ENHANCE_MODEL):
+                response = client.models.generate_content(
+                    model=ENHANCE_MODEL,
+                    contents=user_input,
+                    config=types.GenerateContentConfig(
+                        system_instruction=ENHANCE_SYSTEM_INSTRUCTION,
+                        temperature=0.7
+                    )
+                )
+            return response.text
+        except Exception as e:
+            logger.error("Gemini error, using the prompt as-is: %s", e)
+            return user_input
+
+    def _batch_instruction_cache(self, client) -> Optional[str]:
+        """
+        Name of a cached context holding the batch instruction, created on first use
+        and renewed before it expires. The API has a minimum cacheable size, so when
+        creation is refused the instruction is sent inline from then on.
+        """
+        if not ENHANCE_CONTEXT_CACHE or self._instruction_cache_failed:
+            return None
+        with self._lock:
+            if self._instruction_cache and time.monotonic() < self._instruction_cache_expires:
+                return self._instruction_cache
+            try:
+                types = _types()
+                cached = client.caches.create(
+                    model=ENHANCE_MODEL,
+                    config=types.CreateCachedContentConfig(
+                        display_name="bandana-enhance-batch",
+                        system_instruction=BATCH_INSTRUCTION,
+                        ttl=f"{ENHANCE_CONTEXT_CACHE_TTL_SECONDS}s"
+                    )
+                )
+            except Exception as e:
+                logger.info("Context caching unavailable for the batch instruction, sending it inline: %s", e)
+                self._instruction_cache_failed = True
+                return None
+            self._instruction_cache = cached.name
+            # Renew a minute early so a call never references an expired cache
+            self._instruction_cache_expires = time.monotonic() + ENHANCE_CONTEXT_CACHE_TTL_SECONDS - 60
+            return self._instruction_cache
+
+    def _enhance_batch(self, client, user_inputs: list[str]) -> dict[int, str]:
+        cache_name = self._batch_instruction_cache(client)
+        types = _types()
+        config = types.GenerateContentConfig(
+            temperature=0.7,
+            response_mime_type="application/json",
+            response_schema=list[EnhancedPrompt]
+        )
+        if cache_name:
+            config.cached_content = cache_name
+        else:
+            config.system_instruction = BATCH_INSTRUCTION
+
+        ideas = [{"index": i, "idea": user_input} for i, user_input in enumerate(user_inputs)]
+        try:
+            with track_model_call("enhance_batch", ENHANCE_MODEL):
+                response = client.models.generate_content(
+                    model=ENHANCE_MODEL,
+                    contents=json.dumps(ideas, ensure_ascii=False),
+                    config=config
+                )
+        except Exception:
+            if cache_name: # It may have been evicted early; make a new one next time
+                self._instruction_cache = None
+            raise
+        items = response.parsed or [EnhancedPrompt(**item) for item in json.loads(response.text)]
+        return {item.index: item.prompt.strip() for item in items if item.prompt.strip()}
+
+    def enhance_prompts(self, user_inputs: list[str]) -> list[str]:
+        """
+        Enhance many ideas with one structured-output call per ENHANCE_BATCH_SIZE ideas,
+        mapping answers back by index; ideas the model skipped are enhanced one by one.
+        """
+        results: list[Optional[str]] = [None] * len(user_inputs)
+        try:
+            client = self._get_client()
+            for start in range(0, len(user_inputs), ENHANCE_BATCH_SIZE):
+                chunk = user_inputs[start:start + ENHANCE_BATCH_SIZE]
+                try:
+                    enhanced = self._enhance_batch(client, chunk)
+                except Exception as e:
+                    logger.error("Gemini batch enhancement failed for %d ideas: %s", len(chunk), e)
+                    continue
+                for index, prompt in enhanced.items():
+                    if 0 <= index < len(chunk):
+                        results[start + index] = prompt
+        except ValueError as e:
+            logger.error("Gemini error, using the prompts as-is: %s", e)
+            return list(user_inputs)
+
+        missing = [i for i, prompt in enumerate(results) if prompt is None]
+        if missing:
+            logger.warning("Batch enhancement missed %d of %d ideas, enhancing them individually", len(missing), len(user_inputs))
+        for i in missing:
+            results[i] = self.enhance_prompt(user_inputs[i])
+        return results
+
+    def generate_image(self, prompt: str) -> bytes:
+        client = self._get_client()
+        types = _types()
+        with track_model_call("generate", IMAGE_MODEL):
+            response = client.models.generate_images(
+                model=IMAGE_MODEL,
+                prompt=prompt,
+                config=types.GenerateImagesConfig(
+                    aspect_ratio='1:1'  # Square aspect ratio for Bandana
+                )
+            )
+
+        if not response.generated_images:
+            raise ValueError("No images returned from Imagen 4.")
+        return _to_raw_bytes(response.generated_images[0].image.image_bytes)
+
+    def edit_image(self, image_bytes: bytes, mask_bytes: bytes, prompt: str) -> bytes:
+        client = self._get_client()
+        types = _types()
+        with track_model_call("edit", IMAGE_MODEL):
+            response = client.models.edit_image(
+                model=IMAGE_MODEL,
+                prompt=prompt,
+                image=types.RawReferenceImage(
+                    reference_id=1,
+                    reference_image=types.Image(image_bytes=image_bytes)
+                ),
+                mask=types.MaskReferenceImage(
+                    reference_id=2,
+                    config=types.MaskReferenceConfig(
+                        mask_mode=types.MaskMode.MASK_MODE_USER_PROVIDED,
+                        mask_dilation=0.03
+                    ),
+                    mask_image=types.Image(image_bytes=mask_bytes)
+                ),
+                config=types.EditImageConfig(
+                    edit_mode=types.EditMode.EDIT_MODE_INPAINT_INSERTION,
+                    number_of_images=1
+                )
+            )
+
+        if not response.generated_images:
+            raise ValueError("No images returned from edit.")
+        return _to_raw_bytes(response.generated_images[0].image.image_bytes)
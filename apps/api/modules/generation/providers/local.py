@@ -0,0 +1,86 @@
+import colorsys
+import hashlib
+import io
+import os
+import numpy as np
+from PIL import Image
+from apps.api.core.metrics import track_model_call
+from .base import ImageProvider
+
+LOCAL_MODEL = "local-procedural"
+LOCAL_IMAGE_SIZE = int(os.getenv("LOCAL_IMAGE_SIZE", "1024"))
+
+def _seed(text: str) -> int:
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+
+def _palette(rng: np.random.Generator) -> np.ndarray:
+    """Background, main and accent colours: a base hue with a contrasting complement"""
+    hue = rng.random()
+    colors = [
+        colorsys.hsv_to_rgb(hue, 0.75, 0.55),
+        colorsys.hsv_to_rgb((hue + 0.5) % 1.0, 0.15, 0.97),
+        colorsys.hsv_to_rgb((hue + rng.uniform(0.25, 0.4)) % 1.0, 0.8, 0.9),
+    ]
+    return (np.array(colors) * 255).astype(np.uint8)
+
+def render_pattern(prompt: str, size: int = LOCAL_IMAGE_SIZE) -> Image.Image:
+    """
+    Render a deterministic, seamlessly tileable bandana pattern for a prompt.
+    Every component uses whole periods across the tile, so the edges wrap.
+    """
+    rng = np.random.default_rng(_seed(prompt))
+    colors = _palette(rng)
+    repeats = int(rng.integers(3, 9))
+
+    axis = np.arange(size, dtype=np.float32) / size * 2 * np.pi
+    x, y = np.meshgrid(axis, axis)
+
+    motif = rng.integers(0, 4)
+    if motif == 0:  # polka dots
+        field = np.cos(repeats * x) * np.cos(repeats * y)
+    elif motif == 1:  # diamonds
+        field = np.abs(np.sin(repeats * (x + y) / 2)) + np.abs(np.sin(repeats * (x - y) / 2)) - 1
+    elif motif == 2:  # waves
+        field = np.sin(repeats * y + 2 * np.sin(repeats * x))
+    else:  # paisley-like swirls
+        field = np.sin(repeats * x + np.cos(2 * repeats * y)) * np.cos(repeats * y + np.sin(repeats * x))
+
+    # Fine accent lattice on a different frequency, for the vector-print look
+    accent = np.cos(2 * repeats * x) * np.cos(2 * repeats * y)
+
+    index = np.zeros((size, size), dtype=np.uint8)
+    index[field > rng.uniform(-0.2, 0.4)] = 1
+    index[(accent > 0.85) & (index == 0)] = 2
+
+    return Image.fromarray(colors[index])
+
+def _png(image: Image.Image) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+class LocalProvider(ImageProvider):
+    """
+    Offline provider producing procedural patterns from a hash of the prompt.
+    Same prompt, same image: meant for load tests, CI and development without
+    network access or upstream cost.
+    """
+    name = "local"
+
+    def enhance_prompt(self, user_input: str) -> str:
+        with track_model_call("enhance", LOCAL_MODEL):
+            return (
+                "Seamless bandana pattern, flat 2D vector-like textile illustration, "
+                f"high contrast, suitable for fabric printing: {user_input.strip()}"
+            )
+
+    def generate_image(self, prompt: str) -> bytes:
+        with track_model_call("generate", LOCAL_MODEL):
+            return _png(render_pattern(prompt))
+
+    def edit_image(self, image_bytes: bytes, mask_bytes: bytes, prompt: str) -> bytes:
+        with track_model_call("edit", LOCAL_MODEL):
+            original = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+            mask = Image.open(io.BytesIO(mask_bytes)).convert("L").resize(original.size)
+            replacement = render_pattern(prompt, size=original.width).resize(original.size)
+            return _png(Image.composite(replacement, original, mask))
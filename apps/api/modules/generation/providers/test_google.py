@@ -0,0 +1,70 @@
+import json
+from types import SimpleNamespace
+import pytest
+from apps.api.modules.generation.providers import google
+from apps.api.modules.generation.providers.google import EnhancedPrompt, GoogleProvider
+
+class Config(SimpleNamespace):
+    """Stands in for the SDK's config types, which just hold their fields"""
+
+class FakeClient:
+    def __init__(self, skip=(), fail_on=(), cache_error=None):
+        self.skip, self.fail_on, self.cache_error = set(skip), set(fail_on), cache_error
+        self.batches: list[list[str]] = []
+        self.configs: list[Config] = []
+        self.singles: list[str] = []
+        self.caches_created = 0
+        self.models = SimpleNamespace(generate_content=self.generate_content)
+        self.caches = SimpleNamespace(create=self.create_cache)
+
+    def create_cache(self, model, config):
+        self.caches_created += 1
+        if self.cache_error:
+            raise self.cache_error
+        return SimpleNamespace(name="cachedContents/enhance")
+
+    def generate_content(self, model, contents, config):
+        if config.response_mime_type is None:
+            self.singles.append(contents)
+            return SimpleNamespace(text=f"single {contents}")
+        ideas = json.loads(contents)
+        self.batches.append([item["idea"] for item in ideas])
+        self.configs.append(config)
+        if any(item["idea"] in self.fail_on for item in ideas):
+            raise RuntimeError("model overloaded")
+        # Answered out of order, so results must be mapped back by index
+        parsed = [EnhancedPrompt(index=item["index"], prompt=f"batch {item['idea']}")
+                  for item in reversed(ideas) if item["idea"] not in self.skip]
+        return SimpleNamespace(parsed=parsed, text=None)
+
+@pytest.fixture
+def provider(monkeypatch):
+    monkeypatch.setattr(google, "_types", lambda: SimpleNamespace(
+        GenerateContentConfig=lambda **fields: Config(**{"response_mime_type": None, **fields}),
+        CreateCachedContentConfig=Config
+    ))
+    monkeypatch.setattr(google, "ENHANCE_BATCH_SIZE", 2)
+
+    def make(client: FakeClient) -> GoogleProvider:
+        provider = GoogleProvider()
+        provider._client = client
+        return provider
+    return make
+
+def test_batches_map_back_by_index_and_misses_fall_back_to_single_calls(provider):
+    client = FakeClient(skip={"c"}, fail_on={"e"})
+    results = provider(client).enhance_prompts(["a", "b", "c", "d", "e"])
+    assert client.batches == [["a", "b"], ["c", "d"], ["e"]]
+    assert results == ["batch a", "batch b", "single c", "batch d", "single e"]
+    assert client.singles == ["c", "e"]
+
+def test_instruction_cache_is_reused_or_sent_inline_once_refused(provider):
+    client = FakeClient()
+    provider(client).enhance_prompts(["a", "b", "c"])
+    assert client.caches_created == 1
+    assert {config.cached_content for config in client.configs} == {"cachedContents/enhance"}
+
+    refused = FakeClient(cache_error=RuntimeError("content too small to cache"))
+    provider(refused).enhance_prompts(["a", "b", "c"])
+    assert refused.caches_created == 1
+    assert all(config.system_instruction == google.BATCH_INSTRUCTION for config in refused.configs)
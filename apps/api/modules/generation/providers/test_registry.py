@@ -0,0 +1,44 @@
+import io
+import numpy as np
+import pytest
+from PIL import Image
+from apps.api.modules.generation import providers
+from apps.api.modules.generation.postprocess import SEAM_THRESHOLD, seam_score
+from apps.api.modules.generation.providers import UnknownProviderError, get_provider, register_provider
+from apps.api.modules.generation.providers.local import LocalProvider, render_pattern
+
+def test_providers_are_created_once_on_first_use(monkeypatch):
+    monkeypatch.setattr(providers, "_factories", dict(providers._factories))
+    monkeypatch.setattr(providers, "_instances", {})
+    created = []
+
+    def factory() -> LocalProvider:
+        created.append(1)
+        return LocalProvider()
+
+    register_provider("counting", factory)
+    assert get_provider("counting") is get_provider("counting")
+    assert len(created) == 1
+    with pytest.raises(UnknownProviderError, match="Available: counting, google, local"):
+        get_provider("missing")
+
+def test_local_patterns_are_deterministic_and_tile():
+    first, again = np.asarray(render_pattern("paisley", 256)), np.asarray(render_pattern("paisley", 256))
+    assert np.array_equal(first, again)
+    assert not np.array_equal(first, np.asarray(render_pattern("stars", 256)))
+    assert seam_score(first) < SEAM_THRESHOLD
+
+def test_local_edit_only_repaints_the_masked_area():
+    provider = LocalProvider()
+    original = provider.generate_image("paisley")
+    size = Image.open(io.BytesIO(original)).width
+    half = size // 2
+    mask = Image.new("L", (size, size), 0)
+    mask.paste(255, (0, 0, half, size))
+    buffer = io.BytesIO()
+    mask.save(buffer, format="PNG")
+
+    edited = np.asarray(Image.open(io.BytesIO(provider.edit_image(original, buffer.getvalue(), "stars"))))
+    source = np.asarray(Image.open(io.BytesIO(original)))
+    assert np.array_equal(edited[:, half:], source[:, half:])
+    assert not np.array_equal(edited[:, :half], source[:, :half])
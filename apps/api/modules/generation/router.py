@@ -1,37 +1,181 @@
-from fastapi import APIRouter
-from .schemas import GenerateRequest, RegionEditRequest
-from .service import generate_pattern_service
-from .edit_service import edit_region_service
-
-router = APIRouter()
+from fastapi import APIRouter, Depends, Header, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import Optional
+import json
+import math
+from apps.api.modules.auth.database import get_db
+from apps.api.modules.auth.models import User
+from apps.api.modules.auth.service import get_current_admin_user, get_current_user, get_optional_user
+from .schemas import (
+    GenerateRequest, RegionEditRequest, SimilarDesignsRequest, SimilarDesignsResponse, GenerationListResponse,
+    JobResponse, QuotaResponse, EnhanceBatchRequest, EnhanceBatchResponse
+)
+from .gemini_service import enhance_prompts
+from .jobs import run_edit, run_generation, run_scheduled, start_job
+from .progress import UnknownJobError, progress_bus
+from .providers import UnknownProviderError, get_provider
+from .scheduler import Caller, QuotaExceededError, caller_for, quota_state
+from .speculative import image_calls
+from .similarity import find_similar_designs
+from .history import list_generations
 
 import logging
 from fastapi import HTTPException
 
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+def get_caller(request: Request, current_user: Optional[User] = Depends(get_optional_user)) -> Caller:
+    """Who generations are billed to: the signed-in user, or the client's IP"""
+    return caller_for(current_user, request.client.host if request.client else None)
+
+def _quota_exceeded(e: QuotaExceededError) -> HTTPException:
+    headers = {"Retry-After": str(math.ceil(e.retry_after))} if e.retry_after else None
+    return HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e), headers=headers)
+
 @router.post("")
-def generate_pattern(request: GenerateRequest):
+async def generate_pattern(request: GenerateRequest, caller: Caller = Depends(get_caller)):
+    """Generate a pattern; signed-in users get it saved to their history"""
     try:
-        return generate_pattern_service(request.prompt)
+        return await run_scheduled(caller, lambda: run_generation(request, caller.user_id), image_calls(request.speculative))
+    except QuotaExceededError as e:
+        raise _quota_exceeded(e)
+    except UnknownProviderError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logging.exception("Error generating pattern")
+        logger.exception("Error generating pattern")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/edit")
-def edit_region(request: RegionEditRequest):
+async def edit_region(request: RegionEditRequest, caller: Caller = Depends(get_caller)):
     """
     Edit a region of an existing image based on a mask and prompt.
     
     - image_base64: The original image as base64 (without data URI prefix)
     - mask_base64: Mask image as base64 (white = area to edit, black = keep)
     - prompt: Description of what to change in the masked region
+    - parent_id: generation_id of the design being edited (optional, links the history)
     """
     try:
-        return edit_region_service(
-            request.image_base64,
-            request.mask_base64,
-            request.prompt
-        )
+        return await run_scheduled(caller, lambda: run_edit(request, caller.user_id))
+    except QuotaExceededError as e:
+        raise _quota_exceeded(e)
+    except UnknownProviderError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logging.exception("Error editing region")
+        logger.exception("Error editing region")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/enhance/batch", response_model=EnhanceBatchResponse)
+def enhance_batch(request: EnhanceBatchRequest, admin: User = Depends(get_current_admin_user)):
+    """Enhance many ideas in a few batched model calls, for bulk seeding and batch generation"""
+    try:
+        return {"prompts": enhance_prompts(request.prompts, request.provider)}
+    except UnknownProviderError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _job_response(job_id: str) -> JobResponse:
+    return JobResponse(job_id=job_id, events_url=f"/api/generation/jobs/{job_id}/events")
+
+def _check_provider(name: Optional[str]):
+    try:
+        get_provider(name)
+    except UnknownProviderError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/jobs", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+def start_generation_job(request: GenerateRequest, caller: Caller = Depends(get_caller)):
+    """Start a generation in the background; follow it at events_url"""
+    _check_provider(request.provider)
+    try:
+        return _job_response(start_job(
+            caller, lambda: run_generation(request, caller.user_id), image_calls(request.speculative)
+        ))
+    except QuotaExceededError as e:
+        raise _quota_exceeded(e)
+
+@router.post("/edit/jobs", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+def start_edit_job(request: RegionEditRequest, caller: Caller = Depends(get_caller)):
+    """Start a region edit in the background; follow it at events_url"""
+    _check_provider(request.provider)
+    try:
+        return _job_response(start_job(caller, lambda: run_edit(request, caller.user_id)))
+    except QuotaExceededError as e:
+        raise _quota_exceeded(e)
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(
+    job_id: str,
+    request: Request,
+    after: Optional[int] = Query(None, ge=0, description="Resume after this event id"),
+    last_event_id: Optional[int] = Header(None, ge=0)
+):
+    """
+    Server-Sent Events stream of a job's stages: queued (with the queue position), started, cache_hit,
+    draft_ready (speculative mode), prompt_enhanced, image_queued, image_ready, edit_fallback, postprocessed and
+    finally completed (with the result) or failed. Reconnecting with
+    Last-Event-ID resumes where the stream left off instead of restarting the job.
+    """
+    resume = after if after is not None else last_event_id
+    start = resume + 1 if resume is not None else 0
+    events = progress_bus.follow(job_id, start)
+    try:
+        first = await anext(events)
+    except UnknownJobError:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    except StopAsyncIteration:
+        # Already past the final event; 204 tells EventSource not to reconnect
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+    async def stream():
+        event = first
+        try:
+            while True:
+                if event is None:
+                    yield ": keep-alive\n\n" # Comment line: keeps proxies from timing out idle streams
+                else:
+                    yield f"id: {event['id']}\nevent: {event['stage']}\ndata: {json.dumps(event['data'])}\n\n"
+                if await request.is_disconnected():
+                    return
+                event = await anext(events)
+        except StopAsyncIteration:
+            return
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/quota", response_model=QuotaResponse)
+def generation_quota(caller: Caller = Depends(get_caller)):
+    """The caller's remaining generation quota and their runs in the queue"""
+    return quota_state(caller)
+
+@router.get("/history", response_model=GenerationListResponse)
+def generation_history(
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """The current user's generated and edited designs, newest first"""
+    try:
+        return list_generations(db, current_user.id, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/similar", response_model=SimilarDesignsResponse)
+def similar_designs(request: SimilarDesignsRequest):
+    """
+    Find already generated designs that look like an image (or a known phash),
+    so a near-match can be offered instead of paying for a new generation.
+    """
+    try:
+        return find_similar_designs(request.image_base64, request.phash, request.max_distance, request.limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,335 @@
+"""
+Quotas and fair scheduling for generation and edit runs.
+
+Each caller (signed-in users by id, anonymous callers by IP) has a token bucket
+that refills continuously; a run spends one token when it's admitted and gets it
+back if it was answered from the prompt cache. Buckets and daily usage counters
+live in Redis when GENERATION_QUOTA_BACKEND is "redis", so every API worker
+enforces the same quota.
+
+Admitted runs wait in a weighted fair queue in front of a fixed set of workers,
+which caps how many upstream model calls this process makes at once. Each run
+gets a virtual finish time spaced by cost / weight after its caller's previous
+run, so a caller with a long backlog only delays their own runs. Admins skip the
+queue in a priority lane and have no quota.
+"""
+from collections import Counter, deque
+from concurrent.futures import Future
+from contextvars import copy_context
+from datetime import date
+from typing import Callable, Optional
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from apps.api.core.metrics import GENERATION_QUOTA_REJECTIONS, QUEUE_DEPTH
+from .progress import report
+
+GENERATION_QUOTA_BACKEND = os.getenv("GENERATION_QUOTA_BACKEND", "memory")
+GENERATION_WORKERS = int(os.getenv("GENERATION_WORKERS", "8"))
+MAX_QUEUED_PER_CALLER = int(os.getenv("GENERATION_MAX_QUEUED_PER_CALLER", "4"))
+GENERATION_DRAIN_SECONDS = float(os.getenv("GENERATION_DRAIN_SECONDS", "30"))
+
+# Signed-in users: a burst of 10, then 30 an hour; anonymous callers get less and a smaller share of the queue
+USER_QUOTA_BURST = float(os.getenv("GENERATION_USER_QUOTA_BURST", "10"))
+USER_QUOTA_PER_HOUR = float(os.getenv("GENERATION_USER_QUOTA_PER_HOUR", "30"))
+USER_WEIGHT = float(os.getenv("GENERATION_USER_WEIGHT", "1"))
+ANON_QUOTA_BURST = float(os.getenv("GENERATION_ANON_QUOTA_BURST", "3"))
+ANON_QUOTA_PER_HOUR = float(os.getenv("GENERATION_ANON_QUOTA_PER_HOUR", "10"))
+ANON_WEIGHT = float(os.getenv("GENERATION_ANON_WEIGHT", "0.5"))
+
+class QuotaExceededError(Exception):
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class Caller:
+    """Who a run is billed to and how it's queued"""
+    __slots__ = ("key", "user_id", "burst", "per_hour", "weight", "priority")
+
+    def __init__(self, key: str, user_id: Optional[str], burst: float, per_hour: float, weight: float, priority: bool = False):
+        self.key = key
+        self.user_id = user_id
+        self.burst = burst
+        self.per_hour = per_hour
+        self.weight = weight
+        self.priority = priority
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.per_hour / 3600
+
+def caller_for(user, client_host: Optional[str]) -> Caller:
+    """The caller for a request: the signed-in user, or the client's IP when anonymous"""
+    if user is None:
+        return Caller(f"ip:{client_host or 'unknown'}", None, ANON_QUOTA_BURST, ANON_QUOTA_PER_HOUR, ANON_WEIGHT)
+    return Caller(
+        f"user:{user.id}", user.id, USER_QUOTA_BURST, USER_QUOTA_PER_HOUR, USER_WEIGHT,
+        priority=user.role == "ADMIN"
+    )
+
+class MemoryQuotaStore:
+    """Per-process buckets and usage counters"""
+    def __init__(self):
+        self._buckets: dict[str, tuple[float, float, float, float]] = {} # key -> (tokens, updated, burst, rate)
+        self._usage: Counter = Counter()
+        self._usage_day = date.today()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, cost: float, burst: float, rate: float) -> tuple[bool, float]:
+        """Refill the bucket, spend `cost` if it's there (a negative cost refunds), return (allowed, tokens)"""
+        now = time.time()
+        with self._lock:
+            tokens, updated, _, _ = self._buckets.get(key, (burst, now, burst, rate))
+            tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens = min(burst, tokens - cost)
+            self._buckets[key] = (tokens, now, burst, rate)
+            if len(self._buckets) > 10000:
+                self._prune(now)
+        return allowed, tokens
+
+    def _prune(self, now: float):
+        # A bucket that has refilled completely is the same as no bucket
+        full = [
+            key for key, (tokens, updated, burst, rate) in self._buckets.items()
+            if tokens + (now - updated) * rate >= burst
+        ]
+        for key in full:
+            del self._buckets[key]
+
+    def _roll_day(self):
+        if self._usage_day != date.today():
+            self._usage.clear()
+            self._usage_day = date.today()
+
+    def count_usage(self, key: str):
+        with self._lock:
+            self._roll_day()
+            self._usage[key] += 1
+
+    def usage(self, key: str) -> int:
+        with self._lock:
+            self._roll_day()
+            return self._usage[key]
+
+# Same rules as MemoryQuotaStore.take, atomically on a hash; floats go back as strings since Lua numbers become integers
+_TAKE_SCRIPT = """
+local burst = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local now = tonumber(ARGV[4])
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+local updated = tonumber(redis.call('HGET', KEYS[1], 'updated'))
+if tokens == nil then
+    tokens = burst
+    updated = now
+end
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = math.min(burst, tokens - cost)
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 60)
+return {allowed, tostring(tokens)}
+"""
+
+class RedisQuotaStore:
+    """Buckets and usage counters shared by all workers"""
+    def __init__(self, redis_url: str):
+        import redis
+        self._client = redis.Redis.from_url(redis_url)
+        self._take = self._client.register_script(_TAKE_SCRIPT)
+
+    @staticmethod
+    def _usage_key(key: str) -> str:
+        return f"generation:quota:{key}:used:{date.today().isoformat()}"
+
+    def take(self, key: str, cost: float, burst: float, rate: float) -> tuple[bool, float]:
+        allowed, tokens = self._take(keys=[f"generation:quota:{key}"], args=[burst, rate, cost, time.time()])
+        return bool(allowed), float(tokens)
+
+    def count_usage(self, key: str):
+        usage_key = self._usage_key(key)
+        pipe = self._client.pipeline(transaction=False)
+        pipe.incr(usage_key)
+        pipe.expire(usage_key, 2 * 24 * 3600)
+        pipe.execute()
+
+    def usage(self, key: str) -> int:
+        return int(self._client.get(self._usage_key(key)) or 0)
+
+def _make_store():
+    if GENERATION_QUOTA_BACKEND == "redis":
+        return RedisQuotaStore(os.getenv("REDIS_URL", "redis://localhost:6379"))
+    return MemoryQuotaStore()
+
+quota_store = _make_store()
+
+class _Task:
+    __slots__ = ("caller", "run", "future", "context")
+
+    def __init__(self, caller: Caller, run: Callable[[], dict]):
+        self.caller = caller
+        self.run = run
+        self.future: Future = Future()
+        # Carries the request id, trace context and progress reporter to the worker
+        self.context = copy_context()
+
+class FairScheduler:
+    """Weighted fair queue with an admin priority lane, drained by a fixed set of worker threads"""
+    def __init__(self, workers: int):
+        self._workers = workers
+        self._threads: list[threading.Thread] = []
+        self._cond = threading.Condition()
+        self._priority: deque[_Task] = deque()
+        self._heap: list[tuple[float, int, _Task]] = []
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._last_finish: dict[str, float] = {}
+        self._queued: Counter = Counter()
+        self._running: Counter = Counter()
+
+    def load(self, key: str) -> tuple[int, int]:
+        """(queued, running) runs for a caller"""
+        with self._cond:
+            return self._queued[key], self._running[key]
+
+    def pending(self) -> int:
+        """Runs queued or running across all callers"""
+        with self._cond:
+            return len(self._priority) + len(self._heap) + sum(self._running.values())
+
+    def drain(self, timeout: float = GENERATION_DRAIN_SECONDS) -> bool:
+        """Wait for every queued and running run to finish; returns False if some were still going at the timeout"""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: not self._priority and not self._heap and not self._running, timeout
+            )
+
+    def submit(self, caller: Caller, run: Callable[[], dict], cost: float = 1.0) -> Future:
+        task = _Task(caller, run)
+        with self._cond:
+            if caller.priority:
+                self._priority.append(task)
+                position = len(self._priority)
+            else:
+                if self._queued[caller.key] >= MAX_QUEUED_PER_CALLER:
+                    raise QuotaExceededError(f"Too many queued generations (max {MAX_QUEUED_PER_CALLER})")
+                start = max(self._virtual_time, self._last_finish.get(caller.key, 0.0))
+                finish = start + cost / caller.weight
+                self._last_finish[caller.key] = finish
+                heapq.heappush(self._heap, (finish, next(self._seq), task))
+                position = len(self._priority) + sum(1 for entry in self._heap if entry[0] <= finish)
+            self._queued[caller.key] += 1
+            # Reported under the lock so a job's "queued" always precedes its "started"
+            task.context.run(report, "queued", position=position)
+            self._ensure_workers()
+            QUEUE_DEPTH.labels("generation_scheduler").set(len(self._priority) + len(self._heap))
+            self._cond.notify()
+        return task.future
+
+    def _ensure_workers(self):
+        while len(self._threads) < self._workers:
+            thread = threading.Thread(target=self._work, name=f"generation-worker-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _next(self) -> _Task:
+        with self._cond:
+            while not self._priority and not self._heap:
+                self._cond.wait()
+            if self._priority:
+                task = self._priority.popleft()
+            else:
+                self._virtual_time, _, task = heapq.heappop(self._heap)
+            key = task.caller.key
+            self._queued[key] -= 1
+            if not self._queued[key]:
+                del self._queued[key]
+                self._last_finish.pop(key, None)
+            self._running[key] += 1
+            QUEUE_DEPTH.labels("generation_scheduler").set(len(self._priority) + len(self._heap))
+            return task
+
+    def _work(self):
+        while True:
+            task = self._next()
+            try:
+                if task.future.set_running_or_notify_cancel():
+                    try:
+                        result = task.context.run(task.run)
+                    except BaseException as e:
+                        task.future.set_exception(e)
+                    else:
+                        task.future.set_result(result)
+            finally:
+                with self._cond:
+                    self._running[task.caller.key] -= 1
+                    if not self._running[task.caller.key]:
+                        del self._running[task.caller.key]
+                    self._cond.notify_all() # Wakes drain() as well as idle workers
+
+scheduler = FairScheduler(GENERATION_WORKERS)
+
+def _spend(caller: Caller, cost: float):
+    allowed, tokens = quota_store.take(caller.key, cost, caller.burst, caller.refill_per_second)
+    if not allowed:
+        GENERATION_QUOTA_REJECTIONS.labels("quota").inc()
+        retry_after = (cost - tokens) / caller.refill_per_second
+        raise QuotaExceededError(f"Generation quota exceeded, try again in {math.ceil(retry_after)}s", retry_after)
+
+def _metered(caller: Caller, run: Callable[[], dict], cost: float) -> Callable[[], dict]:
+    def metered() -> dict:
+        result = run()
+        # Cache hits never reached the model, and speculative runs may stop after the draft
+        spent = 0 if result.get("cached") else min(cost, result.pop("image_calls", cost))
+        if spent < cost and not caller.priority:
+            quota_store.take(caller.key, spent - cost, caller.burst, caller.refill_per_second)
+        if spent:
+            quota_store.count_usage(caller.key)
+        return result
+    return metered
+
+def schedule(caller: Caller, run: Callable[[], dict], cost: float = 1.0) -> Future:
+    """Spend the caller's quota and queue the run; raises QuotaExceededError when over quota or backlog"""
+    if caller.priority:
+        return scheduler.submit(caller, _metered(caller, run, cost), cost)
+    queued, _ = scheduler.load(caller.key)
+    if queued >= MAX_QUEUED_PER_CALLER:
+        GENERATION_QUOTA_REJECTIONS.labels("backlog").inc()
+        raise QuotaExceededError(f"Too many queued generations (max {MAX_QUEUED_PER_CALLER})")
+    _spend(caller, cost)
+    try:
+        return scheduler.submit(caller, _metered(caller, run, cost), cost)
+    except QuotaExceededError:
+        # Lost a race for the last queue slot; give the token back
+        GENERATION_QUOTA_REJECTIONS.labels("backlog").inc()
+        quota_store.take(caller.key, -cost, caller.burst, caller.refill_per_second)
+        raise
+
+def quota_state(caller: Caller) -> dict:
+    """What a caller can see about their quota and queue"""
+    queued, running = scheduler.load(caller.key)
+    state = {
+        "priority": caller.priority,
+        "used_today": quota_store.usage(caller.key),
+        "queued": queued,
+        "running": running,
+        "max_queued": None if caller.priority else MAX_QUEUED_PER_CALLER,
+    }
+    if caller.priority:
+        return state
+    _, tokens = quota_store.take(caller.key, 0, caller.burst, caller.refill_per_second)
+    return {
+        **state,
+        "limit": int(caller.burst),
+        "remaining": math.floor(tokens),
+        "refill_per_hour": caller.per_hour,
+        "retry_after_seconds": 0 if tokens >= 1 else math.ceil((1 - tokens) / caller.refill_per_second),
+    }
@@ -1,11 +1,86 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import Literal, Optional
+from datetime import datetime
+from .similarity import NEAR_DUPLICATE_DISTANCE, SIMILAR_IMAGE_MAX_BASE64
 
 class GenerateRequest(BaseModel):
     prompt: str
+    provider: Optional[str] = None  # Image provider name, e.g. "google" or "local"
+    use_cache: bool = True          # False forces a fresh design, e.g. for "regenerate"
+    speculative: Optional[Literal["draft", "refine", "auto"]] = None # Draft from a templated prompt alongside enhancement
 
 class RegionEditRequest(BaseModel):
     image_base64: str  # Original image as base64 (without data URI prefix)
     mask_base64: str   # Mask image as base64 (white = edit area)
     prompt: str        # Edit description
+    provider: Optional[str] = None  # Image provider name, e.g. "google" or "local"
+    parent_id: Optional[str] = None # generation_id of the design being edited, for history
 
+class EnhanceBatchRequest(BaseModel):
+    prompts: list[str] = Field(..., min_length=1, max_length=500) # User ideas, e.g. for seeding the catalog
+    provider: Optional[str] = None
+
+class EnhanceBatchResponse(BaseModel):
+    prompts: list[str] # Enhanced prompts, in the same order as the request
+
+class JobResponse(BaseModel):
+    job_id: str
+    events_url: str  # Server-Sent Events stream of the job's stages and result
+
+class SimilarDesignsRequest(BaseModel):
+    image_base64: Optional[str] = Field(None, max_length=SIMILAR_IMAGE_MAX_BASE64) # Image to match, as base64 (without data URI prefix)
+    phash: Optional[str] = None         # Or a hash returned by an earlier generation
+    max_distance: int = Field(NEAR_DUPLICATE_DISTANCE, ge=0, le=32, description="Max differing bits out of 64")
+    limit: int = Field(10, ge=1, le=100)
+
+    @model_validator(mode="after")
+    def check_query(self):
+        if (self.image_base64 is None) == (self.phash is None):
+            raise ValueError("Provide exactly one of image_base64 or phash")
+        return self
+
+class SimilarDesign(BaseModel):
+    digest: str
+    phash: str
+    distance: int
+    prompt: Optional[str] = None
+    preview_url: Optional[str] = None
+    print_url: Optional[str] = None
+    created_at: datetime
+
+class SimilarDesignsResponse(BaseModel):
+    phash: str
+    designs: list[SimilarDesign]
+
+class GenerationResponse(BaseModel):
+    id: str
+    kind: str
+    prompt: str
+    enhanced_prompt: Optional[str] = None
+    provider: Optional[str] = None
+    digest: Optional[str] = None
+    image_url: Optional[str] = None
+    preview_url: Optional[str] = None
+    print_url: Optional[str] = None
+    parent_id: Optional[str] = None
+    cached: bool = False
+    duration_ms: Optional[int] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class GenerationListResponse(BaseModel):
+    generations: list[GenerationResponse]
+    next_cursor: Optional[str] = None # Pass back as `cursor` to fetch the next (older) page
+
+class QuotaResponse(BaseModel):
+    priority: bool # Admin lane: not queued behind other users and no quota
+    limit: Optional[int] = None # Bucket size, i.e. the most generations that can be started back to back
+    remaining: Optional[int] = None
+    refill_per_hour: Optional[float] = None
+    retry_after_seconds: Optional[int] = None # Until the next generation can start, 0 if one can now
+    used_today: int
+    queued: int
+    running: int
+    max_queued: Optional[int] = None
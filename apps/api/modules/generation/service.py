@@ -1,20 +1,48 @@
+from typing import Optional
 from .gemini_service import enhance_prompt
-from .image_service import generate_image
+from .image_service import generate_image_bytes, build_image_result
+from .prompt_cache import PROMPT_CACHE_ENABLED, get_cache
+from .progress import report
+from .providers import get_provider
+from .speculative import generate_speculative
+from apps.api.core.tracing import traced
+import logging
 
-def generate_pattern_service(prompt: str):
-    # 1. Enhance the prompt using Gemini 1.5 Flash
-    optimized_prompt = enhance_prompt(prompt)
-    print(f"Original: [{prompt}]")
-    print(f"Optimized: [{optimized_prompt}]")
+logger = logging.getLogger(__name__)
+
+@traced()
+def generate_pattern_service(
+    prompt: str, provider: Optional[str] = None, use_cache: bool = True, speculative: Optional[str] = None
+):
+    # 0. Reuse the design of an earlier, semantically equivalent prompt
+    cache = get_cache("generate", get_provider(provider).name) if PROMPT_CACHE_ENABLED else None
+    if cache is not None and use_cache:
+        hit = cache.get(prompt)
+        if hit:
+            result, cached_prompt, similarity = hit
+            logger.debug("Generation cache hit", extra={"original_prompt": prompt, "cached_prompt": cached_prompt})
+            report("cache_hit", cached_prompt=cached_prompt, similarity=round(similarity, 3))
+            return {**result, "cached": True, "cached_prompt": cached_prompt, "similarity": round(similarity, 3)}
+
+    # Speculative mode: a draft from a templated prompt races the enhancement
+    if speculative:
+        result = generate_speculative(prompt, speculative, provider)
+        if cache is not None and not result["draft"]:
+            cache.put(prompt, {k: v for k, v in result.items() if k != "image_calls"})
+        return result
+
+    # 1. Enhance the prompt (Gemini by default)
+    optimized_prompt = enhance_prompt(prompt, provider)
+    logger.debug("Prompt enhanced", extra={"original_prompt": prompt, "enhanced_prompt": optimized_prompt})
+    report("prompt_enhanced", prompt=optimized_prompt)
     
-    # 2. Generate image using Imagen 3
-    # generate_image returns a raw base64 string
-    base64_image = generate_image(optimized_prompt)
+    # 2. Generate the image (Imagen by default)
+    report("image_queued")
+    image_bytes = generate_image_bytes(optimized_prompt, provider)
+    report("image_ready")
     
-    # 3. Construct response
-    # Returning Data URI schema so frontend can use it directly in <img src="...">
-    return {
-        "url": f"data:image/png;base64,{base64_image}",
-        "prompt": optimized_prompt
-    }
-
+    # 3. Post-process and construct response (data URI plus preview/print URLs)
+    result = build_image_result(image_bytes, optimized_prompt)
+    if cache is not None: # A forced regeneration replaces the cached design
+        cache.put(prompt, dict(result)) # Copy: callers add per-request fields to what they get back
+    return result
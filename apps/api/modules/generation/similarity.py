@@ -0,0 +1,185 @@
+"""
+Near-duplicate index of generated designs, keyed by perceptual hash.
+
+Hashes are persisted in `design_hashes` and held in memory in a BK-tree, which
+answers "everything within Hamming distance d" by visiting only the subtrees the
+triangle inequality allows. Each process loads the table lazily and picks up
+rows written by other workers every DESIGN_INDEX_REFRESH_SECONDS.
+"""
+from datetime import datetime, timedelta
+from typing import Optional
+import base64
+import binascii
+import io
+import logging
+import os
+import threading
+import time
+from sqlalchemy.exc import IntegrityError
+from apps.api.modules.auth.database import SessionLocal
+from .models import DesignHash
+from .phash import hamming, phash, to_hex
+
+logger = logging.getLogger(__name__)
+
+DESIGN_INDEX_REFRESH_SECONDS = float(os.getenv("DESIGN_INDEX_REFRESH_SECONDS", "30"))
+# created_at is stamped by each worker before its commit, so a refresh re-reads this far behind the
+# newest row it has seen to catch rows that committed late or came from a worker with a slower clock
+DESIGN_INDEX_REFRESH_OVERLAP_SECONDS = float(
+    os.getenv("DESIGN_INDEX_REFRESH_OVERLAP_SECONDS", str(DESIGN_INDEX_REFRESH_SECONDS * 2))
+)
+# Distance at which two designs count as the same design for reuse
+NEAR_DUPLICATE_DISTANCE = int(os.getenv("NEAR_DUPLICATE_DISTANCE", "6"))
+# Bounds on images uploaded to the similar-designs lookup, which is open to anonymous callers
+SIMILAR_IMAGE_MAX_BYTES = int(os.getenv("SIMILAR_IMAGE_MAX_BYTES", str(10 * 1024 * 1024)))
+SIMILAR_IMAGE_MAX_BASE64 = -(-SIMILAR_IMAGE_MAX_BYTES // 3) * 4
+SIMILAR_IMAGE_MAX_PIXELS = int(os.getenv("SIMILAR_IMAGE_MAX_PIXELS", str(4096 * 4096)))
+
+def _to_signed(value: int) -> int:
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+def _to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+class BKTree:
+    """BK-tree over 64-bit hashes with Hamming distance; a node holds every key sharing its hash"""
+    def __init__(self):
+        self._root: Optional[list] = None # [hash, keys, {distance: child}]
+
+    def add(self, value: int, key: str):
+        if self._root is None:
+            self._root = [value, [key], {}]
+            return
+        node = self._root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(key)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [key], {}]
+                return
+            node = child
+
+    def search(self, value: int, max_distance: int) -> list[tuple[int, str]]:
+        """All (distance, key) pairs within max_distance, nearest first"""
+        if self._root is None:
+            return []
+        found = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= max_distance:
+                found.extend((distance, key) for key in node[1])
+            for edge, child in node[2].items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+        return sorted(found)
+
+class DesignIndex:
+    def __init__(self):
+        self._tree = BKTree()
+        self._designs: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._loaded_until: Optional[datetime] = None
+        self._refreshed_at = 0.0
+
+    def _insert(self, digest: str, phash: int, prompt: Optional[str], preview_url: Optional[str],
+                print_url: Optional[str], created_at: datetime):
+        if digest in self._designs:
+            return
+        self._designs[digest] = {
+            "digest": digest,
+            "phash": to_hex(phash),
+            "prompt": prompt,
+            "preview_url": preview_url,
+            "print_url": print_url,
+            "created_at": created_at,
+        }
+        self._tree.add(phash, digest)
+
+    def refresh(self, force: bool = False):
+        """Load rows added since the last refresh (all rows on first use)"""
+        if not force and time.monotonic() - self._refreshed_at < DESIGN_INDEX_REFRESH_SECONDS:
+            return
+        db = SessionLocal()
+        try:
+            query = db.query(DesignHash)
+            if self._loaded_until is not None:
+                since = self._loaded_until - timedelta(seconds=DESIGN_INDEX_REFRESH_OVERLAP_SECONDS)
+                query = query.filter(DesignHash.created_at >= since)
+            rows = query.order_by(DesignHash.created_at).all()
+        finally:
+            db.close()
+        with self._lock:
+            # Rows from the overlap window are already indexed; _insert skips them by digest
+            for row in rows:
+                self._insert(row.digest, _to_unsigned(row.phash), row.prompt, row.preview_url,
+                             row.print_url, row.created_at)
+            # Only rows read back from the table move the watermark, so rows other
+            # workers wrote before this process's own writes are still picked up
+            if rows and (self._loaded_until is None or rows[-1].created_at > self._loaded_until):
+                self._loaded_until = rows[-1].created_at
+            self._refreshed_at = time.monotonic()
+
+    def add(self, digest: str, phash: int, prompt: Optional[str], preview_url: Optional[str], print_url: Optional[str]):
+        """Persist a generated design's hash and add it to this process's tree"""
+        created_at = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            db.add(DesignHash(
+                digest=digest, phash=_to_signed(phash), prompt=prompt,
+                preview_url=preview_url, print_url=print_url, created_at=created_at
+            ))
+            db.commit()
+        except IntegrityError:
+            db.rollback() # Same image generated before; it is already indexed
+        finally:
+            db.close()
+        with self._lock:
+            self._insert(digest, phash, prompt, preview_url, print_url, created_at)
+
+    def search(self, phash: int, max_distance: int, limit: int) -> list[dict]:
+        """Indexed designs within max_distance of a hash, nearest first"""
+        self.refresh()
+        with self._lock:
+            matches = self._tree.search(phash, max_distance)[:limit]
+            return [{**self._designs[key], "distance": distance} for distance, key in matches]
+
+    def __len__(self):
+        return len(self._designs)
+
+design_index = DesignIndex()
+
+def index_design(result: dict):
+    """Index a post-processed generation result; failures never fail the generation"""
+    try:
+        design_index.add(
+            result["digest"], int(result["phash"], 16), result.get("prompt"),
+            result.get("preview_url"), result.get("print_url")
+        )
+    except Exception:
+        logger.exception("Failed to index design %s", result.get("digest"))
+
+def find_similar_designs(image_base64: Optional[str], phash_hex: Optional[str], max_distance: int, limit: int) -> dict:
+    """Look up existing designs close to an image or a known hash, so a near-match can be reused"""
+    if image_base64 is not None:
+        from PIL import Image
+        try:
+            image = Image.open(io.BytesIO(base64.b64decode(image_base64)))
+            # open() only reads the header, so oversized images are turned away before decoding
+            if image.width * image.height > SIMILAR_IMAGE_MAX_PIXELS:
+                raise ValueError("Image is too large")
+            value = phash(image)
+        except (binascii.Error, OSError, Image.DecompressionBombError):
+            raise ValueError("Invalid image")
+    else:
+        try:
+            value = int(phash_hex, 16)
+        except ValueError:
+            raise ValueError("Invalid phash")
+        if not 0 <= value < 1 << 64:
+            raise ValueError("Invalid phash")
+    return {"phash": to_hex(value), "designs": design_index.search(value, max_distance, limit)}
@@ -0,0 +1,84 @@
+"""
+Speculative generation: start the prompt enhancement and a draft image from a
+templated prompt at the same time, so the first image no longer waits for the
+enhancement. Policies:
+
+- "draft": return the draft without waiting for the enhancement, which still
+  finishes in the background and warms the enhancement cache
+- "refine": return the draft as a stage event, then generate the refined image
+  from the enhanced prompt; the result carries both
+- "auto": like "refine", but keep the draft if the enhancement hasn't finished
+  within SPECULATIVE_ENHANCE_TIMEOUT_SECONDS of the start
+
+Either way a failed enhancement (the idea comes back unchanged) keeps the draft,
+since the template already does better than the raw idea.
+"""
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextvars import copy_context
+from typing import Optional
+import logging
+import os
+import time
+from .gemini_service import enhance_prompt
+from .image_service import build_image_result, generate_image_bytes
+from .progress import report
+
+logger = logging.getLogger(__name__)
+
+SPECULATIVE_POLICIES = ("draft", "refine", "auto")
+SPECULATIVE_ENHANCE_TIMEOUT_SECONDS = float(os.getenv("SPECULATIVE_ENHANCE_TIMEOUT_SECONDS", "6"))
+SPECULATIVE_WORKERS = int(os.getenv("SPECULATIVE_WORKERS", "8"))
+
+DRAFT_PROMPT_TEMPLATE = (
+    "Flat 2D square bandana textile design, seamless repeatable pattern of {idea}, "
+    "centered balanced composition, high contrast clean vector-like illustration, "
+    "suitable for fabric printing, no text, no logos"
+)
+
+# Enhancement is a text model call, so it runs beside the image call instead of taking a generation worker
+_enhance_executor = ThreadPoolExecutor(max_workers=SPECULATIVE_WORKERS, thread_name_prefix="speculative-enhance")
+
+def draft_prompt(idea: str) -> str:
+    return DRAFT_PROMPT_TEMPLATE.format(idea=idea.strip())
+
+def image_calls(policy: Optional[str]) -> int:
+    """Most image model calls a run with this policy can make"""
+    return 2 if policy in ("refine", "auto") else 1
+
+def _wait_enhanced(enhancement, idea: str, policy: str, deadline: float) -> Optional[str]:
+    """The enhanced prompt, or None when the policy says to keep the draft"""
+    try:
+        timeout = max(0.0, deadline - time.monotonic()) if policy == "auto" else None
+        enhanced = enhancement.result(timeout=timeout)
+    except FutureTimeoutError:
+        logger.info("Enhancement missed the speculative deadline, keeping the draft")
+        return None
+    except Exception:
+        logger.exception("Speculative enhancement failed, keeping the draft")
+        return None
+    return enhanced if enhanced != idea else None
+
+def generate_speculative(idea: str, policy: str, provider: Optional[str] = None) -> dict:
+    """Generate a draft alongside the enhancement and apply the policy; the result says which image it is"""
+    started = time.monotonic()
+    enhancement = _enhance_executor.submit(copy_context().run, enhance_prompt, idea, provider)
+
+    prompt = draft_prompt(idea)
+    report("image_queued", draft=True)
+    draft = build_image_result(generate_image_bytes(prompt, provider), prompt)
+    report("draft_ready", result=draft)
+    draft.update({"draft": True, "image_calls": 1})
+
+    if policy == "draft":
+        return draft # The enhancement runs on, so a later refine of this idea hits the cache
+    enhanced = _wait_enhanced(enhancement, idea, policy, started + SPECULATIVE_ENHANCE_TIMEOUT_SECONDS)
+    if enhanced is None:
+        enhancement.cancel()
+        return draft
+
+    report("prompt_enhanced", prompt=enhanced)
+    report("image_queued")
+    refined = build_image_result(generate_image_bytes(enhanced, provider), enhanced)
+    report("image_ready")
+    del draft["image_calls"]
+    return {**refined, "draft": False, "draft_result": draft, "image_calls": 2}
@@ -0,0 +1,50 @@
+import base64
+import pytest
+from apps.api.modules.generation import edit_service
+
+class FakeProvider:
+    name = "fake"
+
+    def __init__(self, edit_error=None):
+        self.edit_error = edit_error
+        self.generated: list[str] = []
+
+    def edit_image(self, image, mask, prompt):
+        if self.edit_error:
+            raise self.edit_error
+        return b"edited"
+
+    def generate_image(self, prompt):
+        self.generated.append(prompt)
+        return b"regenerated"
+
+@pytest.fixture
+def edit(monkeypatch):
+    def run(provider, build=lambda data, prompt: {"url": data.decode(), "prompt": prompt}):
+        monkeypatch.setattr(edit_service, "get_provider", lambda name=None: provider)
+        monkeypatch.setattr(edit_service, "enhance_prompt", lambda prompt, provider=None: "enhanced")
+        monkeypatch.setattr(edit_service, "build_image_result", build)
+        image = base64.b64encode(b"image").decode()
+        return edit_service.edit_region_service(image, image, "add stars")
+    return run
+
+def test_edit_result_is_post_processed(edit):
+    provider = FakeProvider()
+    assert edit(provider) == {"url": "edited", "prompt": "enhanced"}
+    assert provider.generated == []
+
+def test_failed_edit_falls_back_to_regeneration(edit):
+    provider = FakeProvider(edit_error=RuntimeError("no edit support"))
+    result = edit(provider)
+    assert result["url"] == "regenerated" and "note" in result
+    assert len(provider.generated) == 1
+
+def test_post_processing_errors_do_not_pay_for_a_regeneration(edit):
+    provider = FakeProvider()
+
+    def broken(data, prompt):
+        raise ValueError("cannot decode image")
+
+    with pytest.raises(ValueError):
+        edit(provider, build=broken)
+    assert provider.generated == []
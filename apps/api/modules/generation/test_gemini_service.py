@@ -0,0 +1,22 @@
+from apps.api.modules.generation import gemini_service
+from apps.api.modules.generation.prompt_cache import SemanticCache
+
+def test_service_answers_repeats_and_cached_ideas_without_the_model(monkeypatch):
+    class Provider:
+        name = "fake"
+        batches: list[list[str]] = []
+
+        def enhance_prompts(self, user_inputs):
+            self.batches.append(list(user_inputs))
+            return [f"enhanced {idea}" for idea in user_inputs]
+
+    cache = SemanticCache("test", capacity=8, threshold=0.99)
+    cache.put("teal waves", "cached teal waves")
+    monkeypatch.setattr(gemini_service, "PROMPT_CACHE_ENABLED", True)
+    monkeypatch.setattr(gemini_service, "get_cache", lambda kind, name: cache)
+    monkeypatch.setattr(gemini_service, "get_provider", lambda name=None: Provider())
+
+    results = gemini_service.enhance_prompts(["paisley", "teal waves", "paisley", "stars"])
+    assert results == ["enhanced paisley", "cached teal waves", "enhanced paisley", "enhanced stars"]
+    assert Provider.batches == [["paisley", "stars"]]
+    assert cache.get("stars")[0] == "enhanced stars"
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+import uuid
+import pytest
+from apps.api.modules.auth.service import create_user
+from apps.api.modules.generation import history
+from apps.api.modules.generation.history import HistoryWriter, list_generations
+from apps.api.modules.generation.models import Generation
+
+def _user(db):
+    return create_user(db, f"+8491{uuid.uuid4().int % 10_000_000:07d}", "History Test", "secret123")
+
+def _row(user_id: str, created_at: datetime, parent_id=None) -> dict:
+    return {
+        "id": str(uuid.uuid4()), "user_id": user_id, "kind": "generate", "prompt": "paisley",
+        "enhanced_prompt": None, "provider": None, "digest": None, "image_url": None, "preview_url": None,
+        "print_url": None, "parent_id": parent_id, "cached": False, "duration_ms": None, "created_at": created_at,
+    }
+
+@pytest.fixture
+def writer(monkeypatch):
+    writer = HistoryWriter()
+    monkeypatch.setattr(history, "history_writer", writer)
+    return writer
+
+def test_pages_walk_every_row_newest_first_across_timestamp_ties(db, writer):
+    user = _user(db)
+    now = datetime(2026, 1, 1, 12)
+    # Three rows share a timestamp, so the cursor has to break ties on id
+    rows = [_row(user.id, now + timedelta(seconds=offset)) for offset in (0, 1, 1, 1, 2)]
+    for row in rows:
+        writer.record(row)
+    assert writer.flush() == len(rows)
+
+    seen, cursor = [], None
+    while True:
+        page = list_generations(db, user.id, cursor=cursor, limit=2)
+        seen += [generation.id for generation in page["generations"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    expected = sorted(rows, key=lambda row: (row["created_at"], row["id"]), reverse=True)
+    assert seen == [row["id"] for row in expected]
+
+    with pytest.raises(ValueError):
+        list_generations(db, user.id, cursor="garbage")
+
+def test_record_returns_an_id_before_the_row_is_written(db, writer):
+    user = _user(db)
+    generation_id = history.record_generation(user.id, "generate", "paisley", {"prompt": "enhanced", "cached": True})
+    assert db.get(Generation, generation_id) is None
+    writer.flush()
+    generation = db.get(Generation, generation_id)
+    assert generation.enhanced_prompt == "enhanced" and generation.cached
+
+def test_parent_links_to_other_users_designs_are_dropped(db, writer):
+    owner, other = _user(db), _user(db)
+    now = datetime(2026, 1, 1, 12)
+    original = _row(owner.id, now)
+    same_batch_edit = _row(owner.id, now, parent_id=original["id"])
+    writer.record(original)
+    writer.record(same_batch_edit)
+    writer.flush()
+    foreign_edit = _row(other.id, now, parent_id=original["id"])
+    own_edit = _row(owner.id, now, parent_id=original["id"])
+    writer.record(foreign_edit)
+    writer.record(own_edit)
+    writer.flush()
+
+    assert db.get(Generation, same_batch_edit["id"]).parent_id == original["id"]
+    assert db.get(Generation, own_edit["id"]).parent_id == original["id"]
+    assert db.get(Generation, foreign_edit["id"]).parent_id is None
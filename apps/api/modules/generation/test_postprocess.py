@@ -0,0 +1,38 @@
+import io
+import numpy as np
+from PIL import Image
+from apps.api.modules.generation.postprocess import PREVIEW_SIZE, SEAM_THRESHOLD, prepare_image, repair_seams, seam_score
+
+def _png(pixels: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def _gradient(size: int = 128) -> np.ndarray:
+    # Dark on the left, bright on the right: the left and right edges can't meet
+    row = np.linspace(0, 255, size, dtype=np.float32)
+    return np.repeat(np.tile(row, (size, 1))[..., None], 3, axis=2).astype(np.uint8)
+
+def _tileable(size: int = 128) -> np.ndarray:
+    x = np.arange(size)
+    wave = 128 + 100 * np.sin(2 * np.pi * x / size)
+    grid = (wave[None, :] + wave[:, None]) / 2
+    return np.repeat(grid[..., None], 3, axis=2).astype(np.uint8)
+
+def test_seam_repair_makes_a_non_wrapping_pattern_tile():
+    pixels = _gradient()
+    assert seam_score(pixels) > SEAM_THRESHOLD
+    assert seam_score(repair_seams(pixels)) < SEAM_THRESHOLD
+
+def test_tileable_images_are_kept_byte_for_byte():
+    original = _png(_tileable())
+    prepared = prepare_image(original)
+    assert not prepared["seams_repaired"]
+    assert prepared["image"] == original
+    assert "webp" in prepared["previews"]
+
+def test_repaired_images_are_re_encoded_with_a_bounded_preview():
+    prepared = prepare_image(_png(_gradient(1024)))
+    assert prepared["seams_repaired"]
+    assert seam_score(np.asarray(Image.open(io.BytesIO(prepared["image"])))) < SEAM_THRESHOLD
+    assert max(Image.open(io.BytesIO(prepared["previews"]["webp"])).size) == PREVIEW_SIZE
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+import pytest
+from apps.api.modules.generation import progress
+from apps.api.modules.generation.progress import MemoryBus, RedisBus, UnknownJobError, report
+
+async def _collect(bus, job_id: str, after: int = 0) -> list:
+    return [event and (event["id"], event["stage"]) async for event in bus.follow(job_id, after=after)]
+
+def _memory_bus():
+    return MemoryBus()
+
+def _redis_bus(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    import redis.asyncio as aioredis
+    server = fakeredis.FakeServer()
+    bus = RedisBus("redis://localhost:6379")
+    bus._client = fakeredis.FakeRedis(server=server)
+    monkeypatch.setattr(aioredis.Redis, "from_url", classmethod(lambda cls, url: fakeredis.FakeAsyncRedis(server=server)))
+    return bus
+
+@pytest.fixture(params=["memory", "redis"])
+def bus(request, monkeypatch):
+    return _memory_bus() if request.param == "memory" else _redis_bus(monkeypatch)
+
+def test_follow_replays_then_resumes_from_an_offset(bus):
+    for stage in ("queued", "started", "image_ready", "completed"):
+        bus.publish("job", stage, {})
+    assert asyncio.run(_collect(bus, "job")) == [(0, "queued"), (1, "started"), (2, "image_ready"), (3, "completed")]
+    assert asyncio.run(_collect(bus, "job", after=2)) == [(2, "image_ready"), (3, "completed")]
+    assert asyncio.run(_collect(bus, "job", after=4)) == [] # Reconnected after the final event
+
+def test_follow_waits_for_events_published_from_another_thread(bus):
+    bus.publish("live", "queued", {})
+
+    async def follow() -> list:
+        publisher = threading.Timer(0.1, lambda: [bus.publish("live", stage, {}) for stage in ("started", "failed")])
+        publisher.start()
+        try:
+            return await _collect(bus, "live")
+        finally:
+            publisher.join()
+
+    # fakeredis doesn't block in get_message, so that backend may heartbeat while it waits
+    assert [event for event in asyncio.run(follow()) if event] == [(0, "queued"), (1, "started"), (2, "failed")]
+
+def test_idle_streams_yield_heartbeats(bus, monkeypatch):
+    monkeypatch.setattr(progress, "PROGRESS_HEARTBEAT_SECONDS", 0.05)
+    bus.publish("idle", "queued", {})
+
+    async def first_two() -> list:
+        events = []
+        async for event in bus.follow("idle"):
+            events.append(event and event["stage"])
+            if len(events) == 2:
+                break
+        return events
+
+    assert asyncio.run(first_two()) == ["queued", None]
+
+def test_unknown_jobs_are_rejected(bus):
+    with pytest.raises(UnknownJobError):
+        asyncio.run(_collect(bus, "missing"))
+
+def test_report_only_publishes_inside_a_job(monkeypatch):
+    bus = MemoryBus()
+    monkeypatch.setattr(progress, "progress_bus", bus)
+    report("image_ready") # No job on this thread: a no-op
+    with progress.reporting_to("job"):
+        report("image_ready", attempt=1)
+    report("completed")
+    assert list(bus._jobs) == ["job"]
+    assert [(event["stage"], event["data"]) for event in bus._jobs["job"]] == [("image_ready", {"attempt": 1})]
@@ -0,0 +1,26 @@
+from apps.api.modules.generation.prompt_cache import SemanticCache
+
+def test_rephrased_prompt_hits_and_unrelated_prompt_misses():
+    cache = SemanticCache("test", capacity=8, threshold=0.85)
+    cache.put("blue paisley bandana with white flowers", "enhanced")
+    hit = cache.get("Blue paisley bandana, with white flowers")
+    assert hit is not None and hit[0] == "enhanced" and hit[2] >= 0.85
+    assert cache.get("red skulls on black leather") is None
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SemanticCache("test", capacity=2, threshold=0.99)
+    cache.put("orange tiger stripes", 1)
+    cache.put("green fern leaves", 2)
+    assert cache.get("orange tiger stripes")[0] == 1 # Now the most recent
+    cache.put("purple galaxy swirls", 3)
+    assert len(cache) == 2
+    assert cache.get("green fern leaves") is None
+    assert cache.get("orange tiger stripes")[0] == 1
+    assert cache.get("purple galaxy swirls")[0] == 3
+
+def test_putting_the_same_prompt_replaces_its_value():
+    cache = SemanticCache("test", capacity=2, threshold=0.99)
+    cache.put("teal waves", "old")
+    cache.put("teal waves", "new")
+    assert len(cache) == 1
+    assert cache.get("teal waves")[0] == "new"
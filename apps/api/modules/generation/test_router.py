@@ -0,0 +1,68 @@
+import threading
+import time
+import anyio
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from apps.api.modules.generation import router as generation_router
+from apps.api.modules.generation import scheduler as sched
+from apps.api.modules.generation.router import get_caller, router
+from apps.api.modules.generation.scheduler import Caller, FairScheduler, MemoryQuotaStore
+
+THREADPOOL_SIZE = 4
+
+def test_queued_generations_hold_no_threadpool_threads(monkeypatch):
+    monkeypatch.setattr(sched, "quota_store", MemoryQuotaStore())
+    monkeypatch.setattr(sched, "scheduler", FairScheduler(workers=1))
+    release = threading.Event()
+
+    def blocked_generation(request, user_id=None) -> dict:
+        release.wait(10)
+        return {"url": "x"}
+
+    monkeypatch.setattr(generation_router, "run_generation", blocked_generation)
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api/generation")
+    def caller_per_client(request: Request) -> Caller:
+        # One anonymous caller per client, the way distinct IPs would arrive
+        return Caller(f"ip:{request.headers['x-client']}", None, burst=5, per_hour=60, weight=1)
+
+    app.dependency_overrides[get_caller] = caller_per_client
+
+    @app.post("/threadpool")
+    async def shrink_threadpool():
+        anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+
+    @app.get("/ping")
+    def ping():
+        return {"ok": True}
+
+    callers = THREADPOOL_SIZE * 2
+    with TestClient(app) as client:
+        client.post("/threadpool")
+        statuses: list[int] = []
+        generations = [
+            threading.Thread(target=lambda i=i: statuses.append(
+                client.post("/api/generation", json={"prompt": "paisley"}, headers={"x-client": str(i)}).status_code
+            ))
+            for i in range(callers)
+        ]
+        for thread in generations:
+            thread.start()
+        deadline = time.monotonic() + 10
+        while sched.scheduler.pending() < callers and time.monotonic() < deadline: # One running, the rest queued
+            time.sleep(0.01)
+
+        answered = []
+        pinger = threading.Thread(target=lambda: answered.append(client.get("/ping").status_code))
+        pinger.start()
+        pinger.join(5)
+        stalled = pinger.is_alive()
+        release.set()
+        for thread in generations:
+            thread.join(10)
+        pinger.join(5)
+
+    # Answered while every generation was still queued or running
+    assert not stalled and answered == [200]
+    assert statuses == [200] * callers
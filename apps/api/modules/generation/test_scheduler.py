@@ -0,0 +1,106 @@
+import threading
+import pytest
+from apps.api.modules.generation import scheduler as sched
+from apps.api.modules.generation.scheduler import (
+    Caller, FairScheduler, MemoryQuotaStore, QuotaExceededError, RedisQuotaStore
+)
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sched.time, "time", clock)
+    return clock
+
+def _redis_store() -> RedisQuotaStore:
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa") # fakeredis needs it to run the Lua script
+    store = RedisQuotaStore("redis://localhost:6379")
+    store._client = fakeredis.FakeRedis()
+    store._take = store._client.register_script(sched._TAKE_SCRIPT)
+    return store
+
+@pytest.mark.parametrize("make_store", [MemoryQuotaStore, _redis_store], ids=["memory", "redis"])
+def test_bucket_rejects_when_empty_and_refills_over_time(clock, make_store):
+    store = make_store()
+    assert store.take("k", 1, burst=2, rate=0.5) == (True, 1.0)
+    assert store.take("k", 1, burst=2, rate=0.5) == (True, 0.0)
+    allowed, tokens = store.take("k", 1, burst=2, rate=0.5)
+    assert not allowed and tokens == 0.0
+
+    clock.now += 1 # Half a token back
+    assert not store.take("k", 1, burst=2, rate=0.5)[0]
+    clock.now += 1
+    assert store.take("k", 1, burst=2, rate=0.5)[0]
+
+    clock.now += 3600 # Never refills past the burst
+    assert store.take("k", 0, burst=2, rate=0.5) == (True, 2.0)
+    # Refunds are capped at the burst too
+    assert store.take("k", -1, burst=2, rate=0.5) == (True, 2.0)
+
+def test_schedule_rejects_over_quota_with_retry_after(clock, monkeypatch):
+    monkeypatch.setattr(sched, "quota_store", MemoryQuotaStore())
+    caller = Caller("user:quota", "quota", burst=1, per_hour=3600, weight=1)
+    assert sched.schedule(caller, lambda: {"url": "x"}).result(timeout=5) == {"url": "x"}
+    with pytest.raises(QuotaExceededError) as excinfo:
+        sched.schedule(caller, lambda: {"url": "y"})
+    assert excinfo.value.retry_after == pytest.approx(1.0)
+
+def test_cache_hits_are_refunded(clock, monkeypatch):
+    monkeypatch.setattr(sched, "quota_store", MemoryQuotaStore())
+    caller = Caller("user:cached", "cached", burst=1, per_hour=1, weight=1)
+    for _ in range(3):
+        sched.schedule(caller, lambda: {"url": "x", "cached": True}).result(timeout=5)
+    assert sched.quota_state(caller)["remaining"] == 1
+    assert sched.quota_state(caller)["used_today"] == 0
+
+def test_fair_queue_interleaves_callers_and_admins_jump_the_queue():
+    scheduler = FairScheduler(workers=1)
+    order: list[str] = []
+    release = threading.Event()
+
+    def run(name: str, block: bool = False):
+        def inner() -> dict:
+            if block:
+                release.wait(5)
+            order.append(name)
+            return {}
+        return inner
+
+    heavy = Caller("user:heavy", "heavy", burst=10, per_hour=10, weight=1)
+    light = Caller("user:light", "light", burst=10, per_hour=10, weight=1)
+    admin = Caller("user:admin", "admin", burst=0, per_hour=0, weight=1, priority=True)
+
+    futures = [scheduler.submit(heavy, run("blocker", block=True))]
+    while scheduler.load(heavy.key) != (0, 1): # The only worker is now busy
+        pass
+    futures += [scheduler.submit(heavy, run(f"heavy{i}")) for i in range(3)]
+    futures.append(scheduler.submit(light, run("light")))
+    futures.append(scheduler.submit(admin, run("admin")))
+    release.set()
+    for future in futures:
+        future.result(timeout=5)
+
+    assert order == ["blocker", "admin", "heavy0", "light", "heavy1", "heavy2"]
+    assert scheduler.drain(timeout=1)
+
+def test_backlog_per_caller_is_capped(monkeypatch):
+    monkeypatch.setattr(sched, "MAX_QUEUED_PER_CALLER", 1)
+    scheduler = FairScheduler(workers=1)
+    release = threading.Event()
+    caller = Caller("user:busy", "busy", burst=10, per_hour=10, weight=1)
+    first = scheduler.submit(caller, lambda: release.wait(5) or {})
+    while scheduler.load(caller.key) != (0, 1):
+        pass
+    second = scheduler.submit(caller, lambda: {})
+    with pytest.raises(QuotaExceededError):
+        scheduler.submit(caller, lambda: {})
+    release.set()
+    first.result(timeout=5)
+    second.result(timeout=5)
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+import base64
+import io
+import random
+import uuid
+import numpy as np
+import pytest
+from PIL import Image
+from pydantic import ValidationError
+from apps.api.modules.generation import similarity
+from apps.api.modules.generation.models import DesignHash
+from apps.api.modules.generation.phash import hamming, phash
+from apps.api.modules.generation.schemas import SimilarDesignsRequest
+from apps.api.modules.generation.similarity import BKTree, DesignIndex, find_similar_designs
+
+def test_radius_search_matches_brute_force():
+    rng = random.Random(7)
+    base = rng.getrandbits(64)
+    # Clustered hashes so small radii actually find something
+    hashes = [base ^ sum(1 << rng.randrange(64) for _ in range(rng.randrange(12))) for _ in range(300)]
+    hashes += [rng.getrandbits(64) for _ in range(300)]
+    tree = BKTree()
+    for i, value in enumerate(hashes):
+        tree.add(value, f"k{i}")
+
+    for radius in (0, 3, 6, 10):
+        query = hashes[rng.randrange(len(hashes))]
+        expected = sorted((hamming(query, value), f"k{i}") for i, value in enumerate(hashes)
+                          if hamming(query, value) <= radius)
+        assert tree.search(query, radius) == expected
+
+def test_duplicate_hashes_share_a_node():
+    tree = BKTree()
+    tree.add(0b1011, "a")
+    tree.add(0b1011, "b")
+    tree.add(0b1010, "c")
+    assert tree.search(0b1011, 0) == [(0, "a"), (0, "b")]
+    assert tree.search(0b1011, 1) == [(0, "a"), (0, "b"), (1, "c")]
+    assert BKTree().search(0, 64) == []
+
+def test_phash_is_stable_under_resizing_and_separates_different_images():
+    rng = np.random.default_rng(1)
+    pattern = Image.fromarray((rng.random((64, 64, 3)) * 255).astype(np.uint8)).resize((512, 512), Image.BILINEAR)
+    other = Image.fromarray((rng.random((64, 64, 3)) * 255).astype(np.uint8)).resize((512, 512), Image.BILINEAR)
+    assert hamming(phash(pattern), phash(pattern.resize((256, 256)))) <= 4
+    assert hamming(phash(pattern), phash(other)) > 10
+
+def _png_base64(size: tuple[int, int]) -> str:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "teal").save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode()
+
+def test_oversized_and_bomb_images_are_invalid_not_server_errors(monkeypatch):
+    monkeypatch.setattr(similarity, "SIMILAR_IMAGE_MAX_PIXELS", 50 * 50)
+    with pytest.raises(ValueError, match="too large"):
+        find_similar_designs(_png_base64((60, 60)), None, 6, 10)
+
+    # Past twice MAX_IMAGE_PIXELS Pillow raises DecompressionBombError, which isn't an OSError
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 100)
+    with pytest.raises(ValueError, match="Invalid image"):
+        find_similar_designs(_png_base64((30, 30)), None, 6, 10)
+
+    with pytest.raises(ValueError, match="Invalid image"):
+        find_similar_designs("not base64!", None, 6, 10)
+
+def test_image_uploads_are_length_capped():
+    with pytest.raises(ValidationError):
+        SimilarDesignsRequest(image_base64="A" * (similarity.SIMILAR_IMAGE_MAX_BASE64 + 4))
+
+def test_refresh_picks_up_rows_committed_behind_the_watermark(db):
+    index = DesignIndex()
+    now = datetime.utcnow()
+    first, late = uuid.uuid4().hex, uuid.uuid4().hex
+    db.add(DesignHash(digest=first, phash=1, created_at=now))
+    db.commit()
+    index.refresh(force=True)
+    assert first in index._designs
+
+    # Stamped earlier by another worker, but only committed after this process read past it
+    db.add(DesignHash(digest=late, phash=3, created_at=now - timedelta(seconds=5)))
+    db.commit()
+    index.refresh(force=True)
+    assert late in index._designs
+    assert index._loaded_until >= now
+    assert [design["digest"] for design in index.search(1, 1, 10) if design["digest"] in (first, late)] == [first, late]
@@ -0,0 +1,55 @@
+import threading
+import pytest
+from apps.api.modules.generation import speculative
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Fake models: images record their prompt, enhancement waits on `release`"""
+    state = {"images": [], "enhanced": threading.Event(), "release": threading.Event(), "result": "enhanced idea"}
+
+    def enhance(idea, provider=None):
+        state["release"].wait(5)
+        state["enhanced"].set()
+        return state["result"]
+
+    def generate(prompt, provider=None):
+        state["images"].append(prompt)
+        return prompt.encode()
+
+    monkeypatch.setattr(speculative, "enhance_prompt", enhance)
+    monkeypatch.setattr(speculative, "generate_image_bytes", generate)
+    monkeypatch.setattr(speculative, "build_image_result", lambda data, prompt: {"url": data.decode(), "prompt": prompt})
+    return state
+
+def test_draft_returns_first_and_still_submits_the_enhancement(calls):
+    result = speculative.generate_speculative("paisley", "draft")
+    assert result["draft"] and result["image_calls"] == 1
+    assert result["prompt"] == speculative.draft_prompt("paisley")
+    assert not calls["enhanced"].is_set()
+    calls["release"].set()
+    assert calls["enhanced"].wait(5) # Finishes in the background, warming the cache
+
+def test_refine_waits_and_carries_both_images(calls):
+    calls["release"].set()
+    result = speculative.generate_speculative("paisley", "refine")
+    assert result["draft"] is False and result["image_calls"] == 2
+    assert result["prompt"] == "enhanced idea"
+    assert result["draft_result"]["prompt"] == speculative.draft_prompt("paisley")
+    assert calls["images"] == [speculative.draft_prompt("paisley"), "enhanced idea"]
+
+def test_auto_keeps_the_draft_past_the_deadline(calls, monkeypatch):
+    monkeypatch.setattr(speculative, "SPECULATIVE_ENHANCE_TIMEOUT_SECONDS", 0.05)
+    result = speculative.generate_speculative("paisley", "auto")
+    calls["release"].set()
+    assert result["draft"] and len(calls["images"]) == 1
+
+def test_unchanged_enhancement_keeps_the_draft(calls):
+    calls["result"] = "paisley" # enhance_prompt hands the idea back when it fails
+    calls["release"].set()
+    result = speculative.generate_speculative("paisley", "refine")
+    assert result["draft"] and len(calls["images"]) == 1
+
+def test_image_call_budget_per_policy():
+    assert speculative.image_calls("draft") == 1
+    assert speculative.image_calls(None) == 1
+    assert speculative.image_calls("refine") == speculative.image_calls("auto") == 2
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Response, status
+from apps.api.modules.health.service import health_report, liveness, readiness
+
+router = APIRouter()
+
+@router.get("")
+async def health(response: Response):
+    """Dependency checks (database, Redis, Celery queue, saturation); 503 when a critical one is down"""
+    report = await health_report()
+    if report["status"] == "down":
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return report
+
+@router.get("/live")
+async def live():
+    """Liveness: answered on the event loop, so a wedged loop fails the probe and the worker is restarted"""
+    return liveness()
+
+@router.get("/ready")
+async def ready(response: Response):
+    """Readiness: 503 while starting up, draining for shutdown or with a critical dependency down"""
+    is_ready, report = await readiness()
+    if not is_ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return report
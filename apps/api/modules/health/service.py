@@ -0,0 +1,183 @@
+"""
+Process lifecycle and dependency checks behind the health probes.
+
+Liveness only proves the event loop answers. Readiness says whether this worker
+should get traffic: not before startup has finished, not once shutdown has begun
+draining it, and not while a critical dependency is down or exhausted.
+
+Dependency checks (a DB ping plus pool usage, a Redis ping, the Celery queue
+depth and local saturation) run on their own small thread pool with a timeout,
+so they still answer when the request threadpool is the thing that's full.
+Results are cached for HEALTH_CACHE_SECONDS and shared by concurrent probes.
+Each check is "ok", "degraded" (slow or backed up, still serving) or "down";
+a check that is down only fails readiness if the check is critical.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+import asyncio
+import os
+import time
+import anyio.to_thread
+from sqlalchemy import text
+from apps.api.modules.auth.database import engine
+from apps.api.modules.generation.progress import PROGRESS_BACKEND
+from apps.api.modules.generation.scheduler import GENERATION_QUOTA_BACKEND, GENERATION_WORKERS, scheduler
+
+HEALTH_CACHE_SECONDS = float(os.getenv("HEALTH_CACHE_SECONDS", "2"))
+HEALTH_CHECK_TIMEOUT_SECONDS = float(os.getenv("HEALTH_CHECK_TIMEOUT_SECONDS", "2"))
+HEALTH_DB_SLOW_MS = float(os.getenv("HEALTH_DB_SLOW_MS", "100"))
+HEALTH_REDIS_SLOW_MS = float(os.getenv("HEALTH_REDIS_SLOW_MS", "50"))
+HEALTH_CELERY_QUEUE_MAX = int(os.getenv("HEALTH_CELERY_QUEUE_MAX", "100"))
+HEALTH_GENERATION_BACKLOG_MAX = int(os.getenv("HEALTH_GENERATION_BACKLOG_MAX", str(GENERATION_WORKERS * 4)))
+CELERY_QUEUE = os.getenv("CELERY_DEFAULT_QUEUE", "celery")
+
+# Redis only takes the worker out of rotation when request handling depends on it; the audit buffer
+# queues locally while Redis is away, so it doesn't count
+REDIS_CRITICAL = "redis" in (PROGRESS_BACKEND, GENERATION_QUOTA_BACKEND)
+
+_probe_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="health-probe")
+
+class Lifecycle:
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.ready = False
+        self.draining = False
+
+    def mark_ready(self):
+        self.ready = True
+
+    def mark_draining(self):
+        self.draining = True
+
+lifecycle = Lifecycle()
+
+def _result(status: str, started: Optional[float] = None, **detail) -> dict:
+    result = {"status": status, **detail}
+    if started is not None:
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+def check_database() -> dict:
+    pool = engine.pool
+    # A ping on an exhausted pool would wait out pool_timeout, so report saturation without one
+    usage = {}
+    if hasattr(pool, "checkedout") and hasattr(pool, "size"):
+        usage = {"pool_checked_out": pool.checkedout(), "pool_size": pool.size(), "pool_overflow": pool.overflow()}
+        if pool.checkedout() >= pool.size() + max(getattr(pool, "_max_overflow", 0), 0):
+            return _result("down", detail="connection pool exhausted", **usage)
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    result = _result("ok", started, **usage)
+    if result["latency_ms"] > HEALTH_DB_SLOW_MS:
+        result["status"] = "degraded"
+    return result
+
+_redis_client = None
+
+def _redis():
+    global _redis_client
+    if _redis_client is None:
+        import redis
+        _redis_client = redis.Redis.from_url(
+            os.getenv("REDIS_URL", "redis://localhost:6379"),
+            socket_connect_timeout=HEALTH_CHECK_TIMEOUT_SECONDS, socket_timeout=HEALTH_CHECK_TIMEOUT_SECONDS
+        )
+    return _redis_client
+
+def check_redis() -> dict:
+    started = time.perf_counter()
+    _redis().ping()
+    result = _result("ok", started)
+    if result["latency_ms"] > HEALTH_REDIS_SLOW_MS:
+        result["status"] = "degraded"
+    return result
+
+def check_celery_queue() -> dict:
+    """Depth of the Celery broker queue, i.e. tasks published but not yet picked up by a worker"""
+    started = time.perf_counter()
+    depth = _redis().llen(CELERY_QUEUE)
+    status = "degraded" if depth > HEALTH_CELERY_QUEUE_MAX else "ok"
+    return _result(status, started, depth=depth, max=HEALTH_CELERY_QUEUE_MAX)
+
+def check_saturation() -> dict:
+    """Local backlog: generation runs waiting for a worker, and busy request threads"""
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    backlog = scheduler.pending()
+    threads_busy = limiter.borrowed_tokens >= limiter.total_tokens
+    status = "degraded" if backlog > HEALTH_GENERATION_BACKLOG_MAX or threads_busy else "ok"
+    return _result(
+        status, generation_pending=backlog, generation_backlog_max=HEALTH_GENERATION_BACKLOG_MAX,
+        threads_in_use=limiter.borrowed_tokens, threads_limit=limiter.total_tokens
+    )
+
+# name -> (check, critical); saturation reads the event loop's limiter, so it runs inline
+CHECKS: dict[str, tuple[Callable[[], dict], bool]] = {
+    "database": (check_database, True),
+    "redis": (check_redis, REDIS_CRITICAL),
+    "celery_queue": (check_celery_queue, False),
+}
+
+async def _run_check(check: Callable[[], dict]) -> dict:
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    try:
+        return await asyncio.wait_for(loop.run_in_executor(_probe_executor, check), HEALTH_CHECK_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        return _result("down", started, detail="timed out")
+    except Exception as e:
+        return _result("down", started, detail=str(e)[:200])
+
+class HealthCache:
+    """Single-flight cache: concurrent probes within HEALTH_CACHE_SECONDS share one round of checks"""
+    def __init__(self, ttl: float):
+        self._ttl = ttl
+        self._report: Optional[dict] = None
+        self._expires = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def get(self) -> dict:
+        if self._report is not None and time.monotonic() < self._expires:
+            return self._report
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._report is None or time.monotonic() >= self._expires:
+                self._report = await self._collect()
+                self._expires = time.monotonic() + self._ttl
+        return self._report
+
+    @staticmethod
+    async def _collect() -> dict:
+        names = list(CHECKS)
+        results = await asyncio.gather(*(_run_check(CHECKS[name][0]) for name in names))
+        checks = dict(zip(names, results))
+        checks["saturation"] = check_saturation()
+        for name, result in checks.items():
+            result["critical"] = CHECKS[name][1] if name in CHECKS else False
+
+        if any(result["status"] == "down" and result["critical"] for result in checks.values()):
+            status = "down"
+        elif any(result["status"] != "ok" for result in checks.values()):
+            status = "degraded"
+        else:
+            status = "ok"
+        return {"status": status, "checked_at": time.time(), "checks": checks}
+
+health_cache = HealthCache(HEALTH_CACHE_SECONDS)
+
+def liveness() -> dict:
+    return {"status": "alive", "pid": os.getpid(), "uptime_seconds": round(time.monotonic() - lifecycle.started_at, 1)}
+
+async def health_report() -> dict:
+    """Dependency report; status is "ok", "degraded" or "down" (a critical check is down)"""
+    return await health_cache.get()
+
+async def readiness() -> tuple[bool, dict]:
+    """(ready, report) for this worker"""
+    if lifecycle.draining:
+        return False, {"status": "draining", "pid": os.getpid()}
+    if not lifecycle.ready:
+        return False, {"status": "starting", "pid": os.getpid()}
+    report = await health_report()
+    return report["status"] != "down", {**report, "pid": os.getpid()}
@@ -0,0 +1,70 @@
+import asyncio
+import time
+import pytest
+from apps.api.modules.health import service
+
+def ok() -> dict:
+    return {"status": "ok"}
+
+def down() -> dict:
+    raise ConnectionError("refused")
+
+def slow() -> dict:
+    time.sleep(0.5)
+    return {"status": "ok"}
+
+def _collect(monkeypatch, checks: dict) -> dict:
+    monkeypatch.setattr(service, "CHECKS", checks)
+    return asyncio.run(service.HealthCache._collect())
+
+def test_all_ok(monkeypatch):
+    report = _collect(monkeypatch, {"database": (ok, True), "redis": (ok, False)})
+    assert report["status"] == "ok"
+    assert report["checks"]["saturation"]["status"] == "ok"
+
+def test_non_critical_failure_only_degrades(monkeypatch):
+    report = _collect(monkeypatch, {"database": (ok, True), "redis": (down, False)})
+    assert report["status"] == "degraded"
+    assert report["checks"]["redis"]["status"] == "down"
+    assert "refused" in report["checks"]["redis"]["detail"]
+
+def test_critical_failure_is_down(monkeypatch):
+    report = _collect(monkeypatch, {"database": (down, True), "redis": (ok, False)})
+    assert report["status"] == "down"
+    assert report["checks"]["database"]["critical"] is True
+
+def test_slow_check_times_out_as_down(monkeypatch):
+    monkeypatch.setattr(service, "HEALTH_CHECK_TIMEOUT_SECONDS", 0.1)
+    report = _collect(monkeypatch, {"database": (slow, True)})
+    assert report["status"] == "down"
+    assert report["checks"]["database"]["detail"] == "timed out"
+
+def test_degraded_check_degrades(monkeypatch):
+    report = _collect(monkeypatch, {"database": (lambda: {"status": "degraded"}, True)})
+    assert report["status"] == "degraded"
+
+def test_concurrent_probes_share_one_round_of_checks(monkeypatch):
+    calls = []
+
+    def counted() -> dict:
+        calls.append(1)
+        time.sleep(0.05)
+        return {"status": "ok"}
+
+    monkeypatch.setattr(service, "CHECKS", {"database": (counted, True)})
+
+    async def probe_many():
+        cache = service.HealthCache(ttl=60)
+        return await asyncio.gather(*(cache.get() for _ in range(5)))
+
+    reports = asyncio.run(probe_many())
+    assert len(calls) == 1
+    assert all(report is reports[0] for report in reports)
+
+@pytest.mark.parametrize("ready, draining, expected", [(False, False, "starting"), (True, True, "draining")])
+def test_readiness_before_start_and_while_draining(monkeypatch, ready, draining, expected):
+    monkeypatch.setattr(service, "lifecycle", service.Lifecycle())
+    service.lifecycle.ready = ready
+    service.lifecycle.draining = draining
+    is_ready, report = asyncio.run(service.readiness())
+    assert not is_ready and report["status"] == expected
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse
+from apps.api.modules.images.service import (
+    CACHE_CONTROL, VARIANTS, ImageSourceError, derivative_cache, verify
+)
+
+router = APIRouter()
+
+@router.get("/{variant}")
+def get_image_variant(
+    variant: str,
+    src: str = Query(..., description="Original image URL"),
+    sig: str = Query(..., description="Signature issued with the derivative URL")
+):
+    """Serve a resized WebP variant of a catalog image"""
+    if variant not in VARIANTS:
+        raise HTTPException(status_code=404, detail="Unknown image variant")
+    if not verify(src, sig):
+        raise HTTPException(status_code=403, detail="Invalid image signature")
+    try:
+        path = derivative_cache.get(src, variant)
+    except ImageSourceError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return FileResponse(path, media_type="image/webp", headers={"Cache-Control": CACHE_CONTROL})
@@ -0,0 +1,200 @@
+"""
+Size variants of catalog images (product and collection `image_url`), generated
+on demand or when a product is saved, and kept in an on-disk LRU cache with a
+byte budget.
+
+Derivative URLs carry an HMAC of the source URL, so the endpoint only ever
+fetches images the API itself handed out. Source URLs are treated as immutable:
+replacing an image means saving a new URL, which yields new derivative URLs,
+so responses can be cached by browsers and CDNs for a year.
+"""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlencode
+import hashlib
+import hmac
+import io
+import logging
+import os
+import threading
+from PIL import Image, ImageOps
+from apps.api.modules.auth.service import SECRET_KEY
+from apps.api.modules.generation.postprocess import MEDIA_ROOT, MEDIA_URL
+
+logger = logging.getLogger(__name__)
+
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", os.path.join(MEDIA_ROOT, "derivatives"))
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+IMAGE_SOURCE_MAX_BYTES = int(os.getenv("IMAGE_SOURCE_MAX_BYTES", str(20 * 1024 * 1024)))
+IMAGE_FETCH_TIMEOUT = float(os.getenv("IMAGE_FETCH_TIMEOUT", "10"))
+IMAGES_URL = "/api/images"
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Longest edge in pixels: list thumbnails, catalog cards, product detail
+VARIANTS = {"thumb": 160, "card": 480, "detail": 1200}
+
+class ImageSourceError(ValueError):
+    pass
+
+def sign(src: str) -> str:
+    return hmac.new(SECRET_KEY.encode(), src.encode(), hashlib.sha256).hexdigest()[:32]
+
+def verify(src: str, signature: str) -> bool:
+    return hmac.compare_digest(sign(src), signature)
+
+def _is_supported(src: str) -> bool:
+    return src.startswith(("http://", "https://", f"{MEDIA_URL}/"))
+
+def derivative_urls(src: Optional[str]) -> Optional[dict[str, str]]:
+    """Signed URLs of every size variant of an image, or None when it can't be derived"""
+    if not src or not _is_supported(src):
+        return None
+    query = urlencode({"src": src, "sig": sign(src)})
+    return {variant: f"{IMAGES_URL}/{variant}?{query}" for variant in VARIANTS}
+
+def _load_source(src: str) -> bytes:
+    if src.startswith(f"{MEDIA_URL}/"):
+        root = Path(MEDIA_ROOT).resolve()
+        path = (root / src[len(MEDIA_URL) + 1:]).resolve()
+        if not path.is_relative_to(root) or not path.is_file():
+            raise ImageSourceError("Image not found")
+        return path.read_bytes()
+
+    import requests
+    try:
+        with requests.get(src, timeout=IMAGE_FETCH_TIMEOUT, stream=True) as response:
+            response.raise_for_status()
+            data = response.raw.read(IMAGE_SOURCE_MAX_BYTES + 1, decode_content=True)
+    except requests.RequestException as e:
+        raise ImageSourceError(f"Could not fetch image: {e}")
+    if len(data) > IMAGE_SOURCE_MAX_BYTES:
+        raise ImageSourceError("Image is too large")
+    return data
+
+def render_variant(data: bytes, variant: str) -> bytes:
+    """Downscale to the variant's longest edge and encode as WebP"""
+    try:
+        image = Image.open(io.BytesIO(data))
+        image = ImageOps.exif_transpose(image)
+    except (OSError, Image.DecompressionBombError):
+        raise ImageSourceError("Unsupported image")
+    image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+    edge = VARIANTS[variant]
+    image.thumbnail((edge, edge), Image.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, format="WEBP", quality=82, method=4)
+    return buffer.getvalue()
+
+class DerivativeCache:
+    """
+    On-disk LRU of rendered variants with a byte budget.
+    The index lives in memory and is rebuilt from file mtimes on start; hits touch
+    the file so recency survives restarts. Every process keeps its own index, so a
+    file evicted by another worker is simply rendered again.
+    """
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._key_locks: dict[str, threading.Lock] = {}
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        files = sorted(self.directory.glob("*.webp"), key=lambda p: p.stat().st_mtime)
+        for path in files:
+            self._entries[path.stem] = path.stat().st_size
+            self._size += path.stat().st_size
+        self._loaded = True
+        self._evict()
+
+    def _evict(self):
+        while self._size > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._size -= size
+            (self.directory / f"{key}.webp").unlink(missing_ok=True)
+
+    @staticmethod
+    def key(src: str, variant: str) -> str:
+        return hashlib.sha256(f"{variant}|{src}".encode()).hexdigest()[:40]
+
+    def _lookup(self, key: str) -> Optional[Path]:
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            if key not in self._entries:
+                return None
+            path = self.directory / f"{key}.webp"
+            if not path.exists():
+                self._size -= self._entries.pop(key)
+                return None
+            self._entries.move_to_end(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted between the check and the touch; a miss unless it was stored again meanwhile
+            with self._lock:
+                if key in self._entries and not path.exists():
+                    self._size -= self._entries.pop(key)
+            return None
+        return path
+
+    def _store(self, key: str, data: bytes) -> Path:
+        path = self.directory / f"{key}.webp"
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._size += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self._evict()
+        return path
+
+    def get(self, src: str, variant: str) -> Path:
+        """Path of a cached variant, rendering it first on a miss"""
+        key = self.key(src, variant)
+        path = self._lookup(key)
+        if path:
+            self.hits += 1
+            return path
+
+        # One render per key at a time; concurrent requests wait for it
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            path = self._lookup(key)
+            if path:
+                self.hits += 1
+                return path
+            self.misses += 1
+            path = self._store(key, render_variant(_load_source(src), variant))
+        with self._lock:
+            self._key_locks.pop(key, None)
+        return path
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+derivative_cache = DerivativeCache(IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES)
+_warm_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="image-warm")
+
+def _warm(src: str):
+    for variant in VARIANTS:
+        try:
+            derivative_cache.get(src, variant)
+        except ImageSourceError as e:
+            logger.warning("Could not pre-render %s variant of %s: %s", variant, src, e)
+            return
+
+def warm_derivatives(src: Optional[str]):
+    """Render every variant of a newly saved image in the background"""
+    if src and _is_supported(src):
+        _warm_pool.submit(_warm, src)
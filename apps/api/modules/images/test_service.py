@@ -0,0 +1,103 @@
+import io
+import threading
+import time
+import uuid
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from PIL import Image
+from apps.api.modules.images import service
+from apps.api.modules.images.router import router
+from apps.api.modules.images.service import DerivativeCache, ImageSourceError, derivative_urls
+
+@pytest.fixture
+def src() -> str:
+    """A 1000x500 PNG under MEDIA_ROOT, by its /media URL"""
+    name = f"catalog/{uuid.uuid4().hex}.png"
+    path = Path(service.MEDIA_ROOT) / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", (1000, 500), "teal").save(path)
+    return f"{service.MEDIA_URL}/{name}"
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch) -> DerivativeCache:
+    cache = DerivativeCache(str(tmp_path / "derivatives"), max_bytes=10**9)
+    monkeypatch.setattr(service, "derivative_cache", cache)
+    monkeypatch.setattr("apps.api.modules.images.router.derivative_cache", cache)
+    return cache
+
+def test_signed_urls_serve_resized_webp_with_immutable_caching(src, cache):
+    app = FastAPI()
+    app.include_router(router, prefix="/api/images")
+    client = TestClient(app)
+    urls = derivative_urls(src)
+    assert set(urls) == set(service.VARIANTS)
+
+    response = client.get(urls["card"])
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == service.CACHE_CONTROL
+    assert Image.open(io.BytesIO(response.content)).size == (480, 240)
+    client.get(urls["card"])
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    query = parse_qs(urlparse(urls["card"]).query)
+    assert client.get("/api/images/card", params={"src": query["src"][0], "sig": "0" * 32}).status_code == 403
+    assert client.get("/api/images/huge", params={"src": query["src"][0], "sig": query["sig"][0]}).status_code == 404
+
+def test_unsupported_sources_get_no_variants_and_paths_stay_under_media_root(cache):
+    assert derivative_urls(None) is None
+    assert derivative_urls("file:///etc/passwd") is None
+    with pytest.raises(ImageSourceError):
+        cache.get(f"{service.MEDIA_URL}/../../etc/passwd", "thumb")
+
+def test_lru_evicts_least_recently_used_within_the_budget(src, tmp_path):
+    sizes = {variant: DerivativeCache(str(tmp_path / "sizes"), 10**9).get(src, variant).stat().st_size
+             for variant in service.VARIANTS}
+    # One byte short of holding all three, so the third render must evict exactly one
+    cache = DerivativeCache(str(tmp_path / "lru"), max_bytes=sum(sizes.values()) - 1)
+    thumb, card = cache.get(src, "thumb"), cache.get(src, "card")
+    cache.get(src, "thumb") # Now the most recent
+    detail = cache.get(src, "detail")
+    assert thumb.exists() and detail.exists() and not card.exists()
+    assert cache.stats()["bytes"] == sizes["thumb"] + sizes["detail"]
+
+    # A restarted process rebuilds the index from the files on disk
+    restarted = DerivativeCache(str(tmp_path / "lru"), max_bytes=10**9)
+    assert restarted.stats()["entries"] == 0
+    restarted.get(src, "thumb")
+    assert (restarted.hits, restarted.misses) == (1, 0)
+
+def test_concurrent_misses_share_one_render(src, cache, monkeypatch):
+    renders = []
+    real_render = service.render_variant
+
+    def slow_render(data, variant):
+        renders.append(variant)
+        time.sleep(0.1)
+        return real_render(data, variant)
+
+    monkeypatch.setattr(service, "render_variant", slow_render)
+    threads = [threading.Thread(target=cache.get, args=(src, "thumb")) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert renders == ["thumb"]
+
+def test_file_evicted_before_the_touch_is_rendered_again(src, cache, monkeypatch):
+    path = cache.get(src, "thumb")
+    utime = service.os.utime
+
+    def evict_then_touch(target, *args, **kwargs):
+        # Another worker removes the file between the existence check and the touch
+        monkeypatch.setattr(service.os, "utime", utime)
+        Path(target).unlink()
+        return utime(target, *args, **kwargs)
+
+    monkeypatch.setattr(service.os, "utime", evict_then_touch)
+    assert cache.get(src, "thumb") == path
+    assert path.exists()
+    assert (cache.hits, cache.misses) == (0, 2)
+    assert cache._size == path.stat().st_size
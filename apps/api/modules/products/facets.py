@@ -0,0 +1,174 @@
+"""
+Materialized catalog facets: how many products each category, collection, tag
+and price band has, for the storefront's filter sidebar.
+
+Counts live in `catalog_facets`, one row per facet value. ProductService applies
+the difference between a product's facet values before and after each create,
+update or delete in the same transaction as the product change, so reading the
+panel costs one small query instead of a count() per value. A full rebuild
+recounts everything from `products` to correct drift (rows written outside
+ProductService, or a FACET_PRICE_BANDS change); it runs when a worker starts and
+finds the table stale, every FACET_REBUILD_SECONDS, and on demand for admins.
+"""
+from sqlalchemy import case, delete, func, insert, literal, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from typing import Optional
+import logging
+import os
+import random
+import threading
+from apps.api.modules.auth.database import SessionLocal
+from apps.api.modules.products.models import Product, ProductCategory, Collection, Tag, CatalogFacet, product_tags
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the price bands; a band includes its lower bound and excludes its upper one
+FACET_PRICE_BANDS = sorted(float(bound) for bound in os.getenv("FACET_PRICE_BANDS", "20,40,60,100").split(",") if bound.strip())
+FACET_REBUILD_SECONDS = float(os.getenv("FACET_REBUILD_SECONDS", "3600"))
+
+FacetKey = tuple[str, str]
+
+def _bands() -> list[tuple[str, float, Optional[float]]]:
+    """(key, min_price, max_price) for each band, in price order"""
+    bounds = [0.0, *FACET_PRICE_BANDS]
+    bands = [(f"{lower:g}-{upper:g}", lower, upper) for lower, upper in zip(bounds, bounds[1:])]
+    return bands + [(f"{bounds[-1]:g}+", bounds[-1], None)]
+
+PRICE_BANDS = _bands()
+
+def price_band(price: float) -> str:
+    return next(key for key, _, upper in PRICE_BANDS if upper is None or price < upper)
+
+def facet_values(product: Product) -> set[FacetKey]:
+    """Every facet value a product counts towards"""
+    values = {("total", "all"), ("price", price_band(product.price))}
+    if product.category_id:
+        values.add(("category", product.category_id))
+    if product.collection_id:
+        values.add(("collection", product.collection_id))
+    values.update(("tag", tag.id) for tag in product.tags)
+    return values
+
+def _insert(db: Session):
+    # Both dialects support INSERT ... ON CONFLICT DO UPDATE, which makes each adjustment a single upsert
+    return postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+
+def apply_delta(db: Session, before: set[FacetKey], after: set[FacetKey]):
+    """Adjust counts for a product moving from `before` to `after`; commits with the caller's transaction"""
+    deltas = {value: 1 for value in after - before}
+    deltas.update({value: -1 for value in before - after})
+    if not deltas:
+        return
+    # Sorted so concurrent writers lock rows in the same order
+    rows = [{"facet": facet, "value": value, "count": delta} for (facet, value), delta in sorted(deltas.items())]
+    stmt = _insert(db)(CatalogFacet).values(rows)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[CatalogFacet.facet, CatalogFacet.value],
+        set_={"count": CatalogFacet.count + stmt.excluded.count}
+    ))
+
+def _counts(db: Session) -> list[dict]:
+    band = case(
+        *[(Product.price < upper, key) for key, _, upper in PRICE_BANDS if upper is not None],
+        else_=PRICE_BANDS[-1][0]
+    )
+    queries = {
+        "total": db.query(literal("all"), func.count(Product.id)),
+        "category": db.query(Product.category_id, func.count(Product.id))
+            .filter(Product.category_id.isnot(None)).group_by(Product.category_id),
+        "collection": db.query(Product.collection_id, func.count(Product.id))
+            .filter(Product.collection_id.isnot(None)).group_by(Product.collection_id),
+        "tag": db.query(product_tags.c.tag_id, func.count(product_tags.c.product_id)).group_by(product_tags.c.tag_id),
+        "price": db.query(band, func.count(Product.id)).group_by(band),
+    }
+    return [
+        {"facet": facet, "value": value, "count": count}
+        for facet, query in queries.items() for value, count in query if count
+    ]
+
+def rebuild(db: Session) -> int:
+    """Recount every facet from the products table; returns the number of facet rows"""
+    if db.get_bind().dialect.name == "postgresql":
+        # Conflicts with the row-exclusive lock upserts take: product writes in flight commit first and are
+        # counted here, later ones wait and apply their delta on top of the recount
+        db.execute(text("LOCK TABLE catalog_facets IN SHARE ROW EXCLUSIVE MODE"))
+    rows = _counts(db)
+    db.execute(delete(CatalogFacet))
+    if rows:
+        db.execute(insert(CatalogFacet), rows)
+    db.commit()
+    return len(rows)
+
+def is_stale(db: Session) -> bool:
+    """Whether the stored counts can't be trusted: no total, a wrong total or unknown price bands"""
+    total = db.query(CatalogFacet.count).filter(CatalogFacet.facet == "total").scalar() or 0
+    if total != db.query(func.count(Product.id)).scalar():
+        return True
+    stored_bands = {value for value, in db.query(CatalogFacet.value).filter(CatalogFacet.facet == "price", CatalogFacet.count > 0)}
+    return not stored_bands <= {key for key, _, _ in PRICE_BANDS}
+
+def catalog_facets(db: Session) -> dict:
+    """Facet panel data, read from the materialized counts"""
+    counts: dict[str, dict[str, int]] = {"total": {}, "category": {}, "collection": {}, "tag": {}, "price": {}}
+    for facet, value, count in db.query(CatalogFacet.facet, CatalogFacet.value, CatalogFacet.count).filter(CatalogFacet.count > 0):
+        counts.setdefault(facet, {})[value] = count
+
+    def named(model, facet: str) -> list[dict]:
+        if not counts[facet]:
+            return []
+        names = dict(db.query(model.id, model.name).filter(model.id.in_(counts[facet])))
+        values = [{"id": id_, "name": names[id_], "count": count} for id_, count in counts[facet].items() if id_ in names]
+        return sorted(values, key=lambda value: (-value["count"], value["name"]))
+
+    return {
+        "total": counts["total"].get("all", 0),
+        "categories": named(ProductCategory, "category"),
+        "collections": named(Collection, "collection"),
+        "tags": named(Tag, "tag"),
+        "price_bands": [
+            {"key": key, "min_price": lower, "max_price": upper, "count": counts["price"].get(key, 0)}
+            for key, lower, upper in PRICE_BANDS
+        ],
+    }
+
+class FacetRebuilder:
+    """Background thread: rebuilds stale counts at start, then every FACET_REBUILD_SECONDS"""
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="catalog-facets", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _rebuild(self, only_if_stale: bool):
+        db = SessionLocal()
+        try:
+            if only_if_stale and not is_stale(db):
+                return
+            logger.info("Rebuilt catalog facets (%d values)", rebuild(db))
+        except Exception:
+            logger.exception("Catalog facet rebuild failed")
+            db.rollback()
+        finally:
+            db.close()
+
+    def _run(self):
+        self._rebuild(only_if_stale=True)
+        if FACET_REBUILD_SECONDS <= 0:
+            return
+        # Jittered so workers started together don't all rebuild at once
+        while not self._stop.wait(FACET_REBUILD_SECONDS * random.uniform(0.9, 1.1)):
+            self._rebuild(only_if_stale=False)
+
+facet_rebuilder = FacetRebuilder()
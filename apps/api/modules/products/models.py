@@ -78,3 +78,14 @@ class Product(Base):
     
     def __repr__(self):
         return f"<Product {self.name}>"
+
+class CatalogFacet(Base):
+    """Materialized product counts per facet value, kept in step with products by facets.py"""
+    __tablename__ = "catalog_facets"
+
+    facet = Column(String, primary_key=True) # "category", "collection", "tag", "price" or "total"
+    value = Column(String, primary_key=True) # Category/collection/tag id, or the price band key
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<CatalogFacet {self.facet}={self.value}: {self.count}>"
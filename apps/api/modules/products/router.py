@@ -1,18 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from typing import Optional
+import logging
 from apps.api.modules.auth.database import get_db
 from apps.api.modules.auth.service import get_current_user, get_current_admin_user
 from apps.api.modules.auth.models import User
 from apps.api.modules.products.service import (
     ProductService, CategoryService, CollectionService, TagService
 )
+from apps.api.modules.products.facets import catalog_facets, rebuild
+from apps.api.modules.audit.service import record_event
 from apps.api.modules.products.schemas import (
     ProductCreate, ProductUpdate, ProductResponse, ProductListResponse, ProductFilter,
     CategoryCreate, CategoryResponse, CategoryUpdate,
-    CollectionCreate, CollectionResponse, CollectionUpdate, TagResponse, TagCreate, TagUpdate
+    CollectionCreate, CollectionResponse, CollectionUpdate, TagResponse, TagCreate, TagUpdate,
+    CatalogFacetsResponse, product_list_adapter
 )
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(tags=["products"])
 
 @router.get("", response_model=ProductListResponse)
@@ -43,11 +49,28 @@ async def list_products(
         page_size=page_size
     )
     try:
-        return ProductService.list_products(db, filters)
+        result = ProductService.list_products(db, filters)
+        # Already validated; dumping through the adapter skips FastAPI's second validation pass
+        return Response(product_list_adapter.dump_json(result), media_type="application/json")
     except Exception as e:
-        print(f"Error listing products: {str(e)}")
+        logger.exception("Error listing products")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/facets", response_model=CatalogFacetsResponse)
+def get_catalog_facets(db: Session = Depends(get_db)):
+    """Product counts per category, collection, tag and price band"""
+    return catalog_facets(db)
+
+@router.post("/facets/rebuild", response_model=CatalogFacetsResponse)
+def rebuild_catalog_facets(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Recount the facets from the products table (Admin only)"""
+    values = rebuild(db)
+    record_event("catalog.facets_rebuild", "catalog", actor_id=current_user.id, details={"values": values})
+    return catalog_facets(db)
+
 @router.post("", response_model=ProductResponse, status_code=status.HTTP_201_CREATED)
 async def create_product(
     product_data: ProductCreate,
@@ -55,7 +78,7 @@ async def create_product(
     current_user: User = Depends(get_current_admin_user)
 ):
     """Create a new product (Admin only)"""
-    return ProductService.create_product(db, product_data)
+    return ProductService.create_product(db, product_data, current_user.id)
 
 @router.get("/{product_id}", response_model=ProductResponse)
 async def get_product(product_id: str, db: Session = Depends(get_db)):
@@ -76,7 +99,7 @@ async def update_product(
     current_user: User = Depends(get_current_admin_user)
 ):
     """Update a product (Admin only)"""
-    product = ProductService.update_product(db, product_id, product_data)
+    product = ProductService.update_product(db, product_id, product_data, current_user.id)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -91,7 +114,7 @@ async def delete_product(
     current_user: User = Depends(get_current_admin_user)
 ):
     """Delete a product (Admin only)"""
-    if not ProductService.delete_product(db, product_id):
+    if not ProductService.delete_product(db, product_id, current_user.id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found"
@@ -123,7 +146,7 @@ async def create_category(
     current_user: User = Depends(get_current_admin_user)
 ):
     """Create a new category (Admin only)"""
-    return CategoryService.create_category(db, category_data)
+    return CategoryService.create_category(db, category_data, current_user.id)
 
 @category_router.put("/{category_id}", response_model=CategoryResponse)
 async def update_category(
@@ -133,7 +156,7 @@ async def update_category(
     current_user: User = Depends(get_current_admin_user)
 ):
     """Update a category (Admin only)"""
-    category = CategoryService.update_category(db, category_id, category_data)
+    category = CategoryService.update_category(db, category_id, category_data, current_user.id)
     if not category:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -151,14 +174,14 @@ async def delete_category(
 ):
     """Delete a category (Admin only)"""
     try:
-        if not CategoryService.delete_category(db, category_id):
+        if not CategoryService.delete_category(db, category_id, current_user.id):
             raise HTTPException(status_code=404, detail="Category not found")
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except IntegrityError as e:
         raise HTTPException(status_code=400, detail=f"Cannot delete: {str(e.orig)}")
     except Exception as e:
-        print(f"Delete category error: {str(e)}")
+        logger.exception("Delete category error")
         raise HTTPException(status_code=500, detail=str(e))
 
 # Collection Endpoints
@@ -176,7 +199,7 @@ async def create_collection(
     current_user: User = Depends(get_current_admin_user)
 ):
     """Create a new collection (Admin only)"""
-    return CollectionService.create_collection(db, collection_data)
+    return CollectionService.create_collection(db, collection_data, current_user.id)
 
 @collection_router.put("/{collection_id}", response_model=CollectionResponse)
 async def update_collection(
@@ -186,7 +209,7 @@ async def update_collection(
     current_user: User = Depends(get_current_admin_user)
 ):
     """Update a collection (Admin only)"""
-    collection = CollectionService.update_collection(db, collection_id, collection_data)
+    collection = CollectionService.update_collection(db, collection_id, collection_data, current_user.id)
     if not collection:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -202,14 +225,14 @@ async def delete_collection(
 ):
     """Delete a collection (Admin only)"""
     try:
-        if not CollectionService.delete_collection(db, collection_id):
+        if not CollectionService.delete_collection(db, collection_id, current_user.id):
             raise HTTPException(status_code=404, detail="Collection not found")
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except IntegrityError as e:
         raise HTTPException(status_code=400, detail=f"Cannot delete: {str(e.orig)}")
     except Exception as e:
-        print(f"Delete collection error: {str(e)}")
+        logger.exception("Delete collection error")
         raise HTTPException(status_code=500, detail=str(e))
 
 # Tag Endpoints
@@ -227,7 +250,7 @@ async def create_tag(
     current_user: User = Depends(get_current_admin_user)
 ):
     """Create a new tag (Admin only)"""
-    return TagService.get_or_create_tag(db, tag_data.name)
+    return TagService.get_or_create_tag(db, tag_data.name, current_user.id)
 
 @tag_router.put("/{tag_id}", response_model=TagResponse)
 async def update_tag(
@@ -237,7 +260,7 @@ async def update_tag(
     current_user: User = Depends(get_current_admin_user)
 ):
     """Update a tag (Admin only)"""
-    tag = TagService.update_tag(db, tag_id, tag_data)
+    tag = TagService.update_tag(db, tag_id, tag_data, current_user.id)
     if not tag:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -253,12 +276,12 @@ async def delete_tag(
 ):
     """Delete a tag (Admin only)"""
     try:
-        if not TagService.delete_tag(db, tag_id):
+        if not TagService.delete_tag(db, tag_id, current_user.id):
             raise HTTPException(status_code=404, detail="Tag not found")
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except IntegrityError as e:
         raise HTTPException(status_code=400, detail=f"Cannot delete: {str(e.orig)}")
     except Exception as e:
-        print(f"Delete tag error: {str(e)}")
+        logger.exception("Delete tag error")
         raise HTTPException(status_code=500, detail=str(e))
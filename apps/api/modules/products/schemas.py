@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter, computed_field
 from typing import Optional
 from datetime import datetime
+from apps.api.modules.images.service import derivative_urls
 
 # Category Schemas
 class CategoryBase(BaseModel):
@@ -27,6 +28,7 @@ class CollectionBase(BaseModel):
     description: Optional[str] = None
     season: Optional[str] = None
     year: Optional[int] = None
+    image_url: Optional[str] = None
 
 class CollectionCreate(CollectionBase):
     pass
@@ -36,10 +38,17 @@ class CollectionUpdate(BaseModel):
     description: Optional[str] = None
     season: Optional[str] = None
     year: Optional[int] = None
+    image_url: Optional[str] = None
 
 class CollectionResponse(CollectionBase):
     id: str
     created_at: datetime
+
+    @computed_field
+    @property
+    def image_variants(self) -> Optional[dict[str, str]]:
+        """Resized copies of image_url: thumb, card and detail"""
+        return derivative_urls(self.image_url)
     
     class Config:
         from_attributes = True
@@ -90,6 +99,12 @@ class ProductResponse(ProductBase):
     category: Optional[CategoryResponse] = None
     collection: Optional[CollectionResponse] = None
     tags: list[TagResponse] = []
+
+    @computed_field
+    @property
+    def image_variants(self) -> Optional[dict[str, str]]:
+        """Resized copies of image_url: thumb, card and detail"""
+        return derivative_urls(self.image_url)
     
     class Config:
         from_attributes = True
@@ -113,3 +128,25 @@ class ProductListResponse(BaseModel):
     page: int
     page_size: int
     total_pages: int
+
+# Facets
+class FacetValue(BaseModel):
+    id: str
+    name: str
+    count: int
+
+class PriceBandFacet(BaseModel):
+    key: str
+    min_price: float
+    max_price: Optional[float] = None # Exclusive; None for the open-ended top band
+    count: int
+
+class CatalogFacetsResponse(BaseModel):
+    total: int
+    categories: list[FacetValue]
+    collections: list[FacetValue]
+    tags: list[FacetValue]
+    price_bands: list[PriceBandFacet]
+
+# Built once at import: list responses validate plain row dicts and dump straight to JSON bytes through these
+product_list_adapter = TypeAdapter(ProductListResponse)
@@ -3,74 +3,139 @@ from sqlalchemy import or_, desc, asc
 from typing import Optional
 import math
 from apps.api.modules.products.models import Product, ProductCategory, Collection, Tag, product_tags
+from apps.api.modules.products.facets import apply_delta, facet_values
+from apps.api.modules.audit.service import record_event
+from apps.api.modules.images.service import warm_derivatives
+from apps.api.core.tracing import traced
 from apps.api.modules.products.schemas import (
-    ProductCreate, ProductUpdate, ProductFilter, ProductListResponse,
+    ProductCreate, ProductUpdate, ProductFilter, ProductListResponse, product_list_adapter,
     CategoryCreate, CategoryUpdate, CollectionCreate, CollectionUpdate, TagCreate, TagUpdate
 )
 
+# Columns read by the list endpoint; rows are turned into dicts so no ORM objects or lazy loads are involved
+_PRODUCT_COLUMNS = (
+    Product.id, Product.name, Product.description, Product.price, Product.category_id,
+    Product.collection_id, Product.image_url, Product.stock, Product.created_at, Product.updated_at
+)
+_CATEGORY_COLUMNS = (ProductCategory.id, ProductCategory.name, ProductCategory.description, ProductCategory.created_at)
+_COLLECTION_COLUMNS = (
+    Collection.id, Collection.name, Collection.description, Collection.season,
+    Collection.year, Collection.image_url, Collection.created_at
+)
+
+def _rows_by_id(db: Session, columns, ids: set) -> dict[str, dict]:
+    if not ids:
+        return {}
+    return {row.id: row._asdict() for row in db.query(*columns).filter(columns[0].in_(ids))}
+
+def _tags_by_product(db: Session, product_ids: list[str]) -> dict[str, list[dict]]:
+    tags: dict[str, list[dict]] = {}
+    if not product_ids:
+        return tags
+    rows = (
+        db.query(product_tags.c.product_id, Tag.id, Tag.name)
+        .join(Tag, Tag.id == product_tags.c.tag_id)
+        .filter(product_tags.c.product_id.in_(product_ids))
+    )
+    for product_id, tag_id, name in rows:
+        tags.setdefault(product_id, []).append({"id": tag_id, "name": name})
+    return tags
+
+def _locked_product(db: Session, product_id: str) -> Optional[Product]:
+    # FOR UPDATE holds the row until commit; populate_existing drops any copy the session already had
+    return db.query(Product).filter(Product.id == product_id).with_for_update().populate_existing().first()
+
 class ProductService:
     @staticmethod
-    def create_product(db: Session, product_data: ProductCreate) -> Product:
+    @traced()
+    def create_product(db: Session, product_data: ProductCreate, actor_id: Optional[str] = None) -> Product:
         """Create a new product"""
         # Extract relationship data
         tags = product_data.tags
         product_data_dict = product_data.model_dump(exclude={'tags'})
         
         product = Product(**product_data_dict)
+        db.add(product)
         
-        # Handle tags
+        # Handle tags; new ones are only flushed so they commit together with the product and its facet counts
+        new_tags = []
         if tags:
-            for tag_name in tags:
-                tag = TagService.get_or_create_tag(db, tag_name)
-                product.tags.append(tag)
+            product.tags, new_tags = TagService.resolve_tags(db, tags)
         
-        db.add(product)
+        apply_delta(db, set(), facet_values(product))
         db.commit()
         db.refresh(product)
+        warm_derivatives(product.image_url)
+        
+        TagService.record_created(new_tags, actor_id)
+        record_event(
+            "product.create", "product", target_id=product.id, actor_id=actor_id,
+            details={"name": product.name, "price": product.price}
+        )
         return product
     
     @staticmethod
-    def update_product(db: Session, product_id: str, product_data: ProductUpdate) -> Optional[Product]:
+    @traced()
+    def update_product(db: Session, product_id: str, product_data: ProductUpdate, actor_id: Optional[str] = None) -> Optional[Product]:
         """Update a product"""
-        product = db.query(Product).filter(Product.id == product_id).first()
+        # Locked so a concurrent update or delete can't read the same facets and apply its delta twice
+        product = _locked_product(db, product_id)
         if not product:
             return None
+        facets_before = facet_values(product)
         
         # Handle tags update if provided
+        new_tags = []
         if product_data.tags is not None:
-            product.tags = []
-            for tag_name in product_data.tags:
-                tag = TagService.get_or_create_tag(db, tag_name)
-                product.tags.append(tag)
+            product.tags, new_tags = TagService.resolve_tags(db, product_data.tags)
         
         update_data = product_data.model_dump(exclude_unset=True, exclude={'tags'})
         for field, value in update_data.items():
             setattr(product, field, value)
         
+        apply_delta(db, facets_before, facet_values(product))
         db.commit()
         db.refresh(product)
+        if "image_url" in update_data:
+            warm_derivatives(product.image_url)
+        
+        TagService.record_created(new_tags, actor_id)
+        record_event(
+            "product.update", "product", target_id=product.id, actor_id=actor_id,
+            details=product_data.model_dump(exclude_unset=True)
+        )
         return product
 
     @staticmethod
+    @traced()
     def get_product(db: Session, product_id: str) -> Optional[Product]:
         """Get a product by ID"""
         return db.query(Product).filter(Product.id == product_id).first()
     
     @staticmethod
-    def delete_product(db: Session, product_id: str) -> bool:
+    @traced()
+    def delete_product(db: Session, product_id: str, actor_id: Optional[str] = None) -> bool:
         """Delete a product"""
-        product = db.query(Product).filter(Product.id == product_id).first()
+        product = _locked_product(db, product_id)
         if not product:
             return False
         
+        product_name = product.name
+        apply_delta(db, facet_values(product), set())
         db.delete(product)
         db.commit()
+        
+        record_event(
+            "product.delete", "product", target_id=product_id, actor_id=actor_id,
+            details={"name": product_name}
+        )
         return True
     
     @staticmethod
+    @traced()
     def list_products(db: Session, filters: ProductFilter) -> ProductListResponse:
         """List products with filtering, sorting, and pagination"""
-        query = db.query(Product)
+        query = db.query(*_PRODUCT_COLUMNS)
         
         # Apply filters
         if filters.category_id:
@@ -80,7 +145,9 @@ class ProductService:
             query = query.filter(Product.collection_id == filters.collection_id)
             
         if filters.tag:
-            query = query.join(Product.tags).filter(Tag.name == filters.tag)
+            query = query.join(product_tags, product_tags.c.product_id == Product.id).join(
+                Tag, Tag.id == product_tags.c.tag_id
+            ).filter(Tag.name == filters.tag)
         
         if filters.min_price is not None:
             query = query.filter(Product.price >= filters.min_price)
@@ -100,7 +167,6 @@ class ProductService:
         # Count total before pagination
         total = query.count()
         
-        # Apply sorting
         # Apply sorting
         if filters.sort_by:
             sort_column = getattr(Product, filters.sort_by, Product.created_at)
@@ -114,26 +180,40 @@ class ProductService:
         
         # Apply pagination
         offset = (filters.page - 1) * filters.page_size
-        products = query.offset(offset).limit(filters.page_size).all()
+        products = [row._asdict() for row in query.offset(offset).limit(filters.page_size)]
+        
+        # One query per relation for the whole page instead of lazy loads per product
+        categories = _rows_by_id(db, _CATEGORY_COLUMNS, {p["category_id"] for p in products if p["category_id"]})
+        collections = _rows_by_id(db, _COLLECTION_COLUMNS, {p["collection_id"] for p in products if p["collection_id"]})
+        tags = _tags_by_product(db, [p["id"] for p in products])
+        for product in products:
+            product["category"] = categories.get(product["category_id"])
+            product["collection"] = collections.get(product["collection_id"])
+            product["tags"] = tags.get(product["id"], [])
         
         total_pages = math.ceil(total / filters.page_size) if total > 0 else 0
         
-        return ProductListResponse(
-            products=products,
-            total=total,
-            page=filters.page,
-            page_size=filters.page_size,
-            total_pages=total_pages
-        )
+        return product_list_adapter.validate_python({
+            "products": products,
+            "total": total,
+            "page": filters.page,
+            "page_size": filters.page_size,
+            "total_pages": total_pages
+        })
 
 class CategoryService:
     @staticmethod
-    def create_category(db: Session, category_data: CategoryCreate) -> ProductCategory:
+    def create_category(db: Session, category_data: CategoryCreate, actor_id: Optional[str] = None) -> ProductCategory:
         """Create a new category"""
         category = ProductCategory(**category_data.model_dump())
         db.add(category)
         db.commit()
         db.refresh(category)
+        
+        record_event(
+            "category.create", "category", target_id=category.id, actor_id=actor_id,
+            details={"name": category.name}
+        )
         return category
     
     @staticmethod
@@ -147,7 +227,7 @@ class CategoryService:
         return db.query(ProductCategory).all()
     
     @staticmethod
-    def update_category(db: Session, category_id: str, category_data: CategoryUpdate) -> Optional[ProductCategory]:
+    def update_category(db: Session, category_id: str, category_data: CategoryUpdate, actor_id: Optional[str] = None) -> Optional[ProductCategory]:
         """Update a category"""
         category = db.query(ProductCategory).filter(ProductCategory.id == category_id).first()
         if not category:
@@ -159,10 +239,15 @@ class CategoryService:
             
         db.commit()
         db.refresh(category)
+        
+        record_event(
+            "category.update", "category", target_id=category.id, actor_id=actor_id,
+            details=update_data
+        )
         return category
 
     @staticmethod
-    def delete_category(db: Session, category_id: str) -> bool:
+    def delete_category(db: Session, category_id: str, actor_id: Optional[str] = None) -> bool:
         """Delete a category"""
         category = db.query(ProductCategory).filter(ProductCategory.id == category_id).first()
         if not category:
@@ -172,18 +257,30 @@ class CategoryService:
         if category.products:
             raise ValueError("Cannot delete category being used by products")
             
+        category_name = category.name
         db.delete(category)
         db.commit()
+        
+        record_event(
+            "category.delete", "category", target_id=category_id, actor_id=actor_id,
+            details={"name": category_name}
+        )
         return True
 
 class CollectionService:
     @staticmethod
-    def create_collection(db: Session, collection_data: CollectionCreate) -> Collection:
+    def create_collection(db: Session, collection_data: CollectionCreate, actor_id: Optional[str] = None) -> Collection:
         """Create a new collection"""
         collection = Collection(**collection_data.model_dump())
         db.add(collection)
         db.commit()
         db.refresh(collection)
+        warm_derivatives(collection.image_url)
+        
+        record_event(
+            "collection.create", "collection", target_id=collection.id, actor_id=actor_id,
+            details={"name": collection.name}
+        )
         return collection
     
     @staticmethod
@@ -192,7 +289,7 @@ class CollectionService:
         return db.query(Collection).all()
 
     @staticmethod
-    def update_collection(db: Session, collection_id: str, collection_data: CollectionUpdate) -> Optional[Collection]:
+    def update_collection(db: Session, collection_id: str, collection_data: CollectionUpdate, actor_id: Optional[str] = None) -> Optional[Collection]:
         """Update a collection"""
         collection = db.query(Collection).filter(Collection.id == collection_id).first()
         if not collection:
@@ -204,10 +301,17 @@ class CollectionService:
             
         db.commit()
         db.refresh(collection)
+        if "image_url" in update_data:
+            warm_derivatives(collection.image_url)
+        
+        record_event(
+            "collection.update", "collection", target_id=collection.id, actor_id=actor_id,
+            details=update_data
+        )
         return collection
     
     @staticmethod
-    def delete_collection(db: Session, collection_id: str) -> bool:
+    def delete_collection(db: Session, collection_id: str, actor_id: Optional[str] = None) -> bool:
         """Delete a collection"""
         collection = db.query(Collection).filter(Collection.id == collection_id).first()
         if not collection:
@@ -217,13 +321,19 @@ class CollectionService:
         if collection.products:
             raise ValueError("Cannot delete collection being used by products")
             
+        collection_name = collection.name
         db.delete(collection)
         db.commit()
+        
+        record_event(
+            "collection.delete", "collection", target_id=collection_id, actor_id=actor_id,
+            details={"name": collection_name}
+        )
         return True
 
 class TagService:
     @staticmethod
-    def get_or_create_tag(db: Session, name: str) -> Tag:
+    def get_or_create_tag(db: Session, name: str, actor_id: Optional[str] = None) -> Tag:
         """Get existing tag or create new one"""
         tag = db.query(Tag).filter(Tag.name == name).first()
         if not tag:
@@ -231,7 +341,30 @@ class TagService:
             db.add(tag)
             db.commit()
             db.refresh(tag)
+            
+            TagService.record_created([tag], actor_id)
         return tag
+
+    @staticmethod
+    def resolve_tags(db: Session, names: list[str]) -> tuple[list[Tag], list[Tag]]:
+        """Tags for the given names and those of them that are new; new tags are only flushed, so the caller
+        commits them and then passes them to record_created"""
+        tags, created = [], []
+        for name in names:
+            tag = db.query(Tag).filter(Tag.name == name).first()
+            if not tag:
+                tag = Tag(name=name)
+                db.add(tag)
+                db.flush()
+                created.append(tag)
+            tags.append(tag)
+        return tags, created
+
+    @staticmethod
+    def record_created(tags: list[Tag], actor_id: Optional[str] = None) -> None:
+        """Audit newly created tags, once they are committed"""
+        for tag in tags:
+            record_event("tag.create", "tag", target_id=tag.id, actor_id=actor_id, details={"name": tag.name})
     
     @staticmethod
     def list_tags(db: Session) -> list[Tag]:
@@ -239,19 +372,25 @@ class TagService:
         return db.query(Tag).all()
 
     @staticmethod
-    def update_tag(db: Session, tag_id: str, tag_data: TagUpdate) -> Optional[Tag]:
+    def update_tag(db: Session, tag_id: str, tag_data: TagUpdate, actor_id: Optional[str] = None) -> Optional[Tag]:
         """Update a tag"""
         tag = db.query(Tag).filter(Tag.id == tag_id).first()
         if not tag:
             return None
             
+        previous_name = tag.name
         tag.name = tag_data.name
         db.commit()
         db.refresh(tag)
+        
+        record_event(
+            "tag.update", "tag", target_id=tag.id, actor_id=actor_id,
+            details={"from": previous_name, "to": tag.name}
+        )
         return tag
     
     @staticmethod
-    def delete_tag(db: Session, tag_id: str) -> bool:
+    def delete_tag(db: Session, tag_id: str, actor_id: Optional[str] = None) -> bool:
         """Delete a tag"""
         tag = db.query(Tag).filter(Tag.id == tag_id).first()
         if not tag:
@@ -262,6 +401,12 @@ class TagService:
         if tag.products:
              raise ValueError("Cannot delete tag being used by products")
 
+        tag_name = tag.name
         db.delete(tag)
         db.commit()
+        
+        record_event(
+            "tag.delete", "tag", target_id=tag_id, actor_id=actor_id,
+            details={"name": tag_name}
+        )
         return True
@@ -0,0 +1,122 @@
+import uuid
+import pytest
+from sqlalchemy import event
+from apps.api.modules.products import facets, service
+from apps.api.modules.products.models import CatalogFacet, ProductCategory, Tag
+from apps.api.modules.products.schemas import ProductCreate, ProductUpdate
+from apps.api.modules.products.service import ProductService
+
+def _unique(prefix: str) -> str:
+    return f"{prefix}-{uuid.uuid4().hex[:8]}"
+
+def _counts(db) -> dict[tuple[str, str], int]:
+    return {(row.facet, row.value): row.count for row in db.query(CatalogFacet) if row.count}
+
+@pytest.fixture
+def catalog(db):
+    facets.rebuild(db)
+    category = ProductCategory(name=_unique("paisley"))
+    db.add(category)
+    db.commit()
+    return category
+
+def test_counts_follow_create_update_and_delete(db, catalog):
+    red, blue = _unique("red"), _unique("blue")
+    cheap = ProductService.create_product(db, ProductCreate(name="a", price=10, category_id=catalog.id, tags=[red]))
+    pricey = ProductService.create_product(db, ProductCreate(name="b", price=150, tags=[red, blue]))
+    counts = _counts(db)
+    tag_ids = {tag.name: tag.id for tag in pricey.tags}
+    assert counts[("category", catalog.id)] == 1
+    assert counts[("tag", tag_ids[red])] == 2
+    assert counts[("tag", tag_ids[blue])] == 1
+    assert counts[("price", facets.price_band(10))] >= 1
+    assert counts[("price", facets.price_band(150))] >= 1
+
+    before = _counts(db)
+    ProductService.update_product(db, cheap.id, ProductUpdate(price=150, category_id=None, tags=[blue]))
+    after = _counts(db)
+    assert after.get(("category", catalog.id), 0) == 0
+    assert after[("tag", tag_ids[red])] == 1
+    assert after[("tag", tag_ids[blue])] == 2
+    assert after.get(("price", facets.price_band(10)), 0) == before[("price", facets.price_band(10))] - 1
+    assert after[("price", facets.price_band(150))] == before[("price", facets.price_band(150))] + 1
+    assert after[("total", "all")] == before[("total", "all")]
+
+    ProductService.delete_product(db, pricey.id)
+    counts = _counts(db)
+    assert counts.get(("tag", tag_ids[red]), 0) == 0
+    assert counts[("tag", tag_ids[blue])] == 1
+    assert counts[("total", "all")] == after[("total", "all")] - 1
+
+def test_incremental_counts_match_a_rebuild(db, catalog):
+    for i, price in enumerate([5, 25, 45, 99.99, 100, 250]):
+        ProductService.create_product(db, ProductCreate(
+            name=f"p{i}", price=price, category_id=catalog.id if i % 2 else None, tags=[_unique("t"), "shared"]
+        ))
+    incremental = _counts(db)
+    assert not facets.is_stale(db)
+    facets.rebuild(db)
+    assert _counts(db) == incremental
+
+def test_failed_create_leaves_tags_and_counts_untouched(db, catalog, monkeypatch):
+    before = _counts(db)
+    tag_name = _unique("orphan")
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    events = []
+    monkeypatch.setattr(service, "record_event", lambda action, *args, **kwargs: events.append(action))
+    monkeypatch.setattr(service, "apply_delta", fail)
+    with pytest.raises(RuntimeError):
+        ProductService.create_product(db, ProductCreate(name="x", price=10, tags=[tag_name]))
+    db.rollback()
+
+    assert _counts(db) == before
+    assert db.query(Tag).filter(Tag.name == tag_name).first() is None
+    assert events == []
+
+def test_new_tags_are_audited_after_the_commit(db, catalog, monkeypatch):
+    committed = []
+    events = []
+
+    def on_commit(session):
+        committed.append(True)
+
+    event.listen(db, "after_commit", on_commit)
+
+    def record(action, target_type, target_id=None, **kwargs):
+        events.append((action, kwargs.get("details"), bool(committed)))
+
+    monkeypatch.setattr(service, "record_event", record)
+    fresh, extra = _unique("fresh"), _unique("extra")
+    committed.clear()
+    product = ProductService.create_product(db, ProductCreate(name="x", price=10, tags=[fresh, "shared"]))
+    committed.clear()
+    ProductService.update_product(db, product.id, ProductUpdate(tags=[fresh, extra]))
+
+    tag_events = [(details["name"], after_commit) for action, details, after_commit in events if action == "tag.create"]
+    assert (fresh, True) in tag_events
+    assert (extra, True) in tag_events
+    assert [name for name, _ in tag_events].count(fresh) == 1
+    event.remove(db, "after_commit", on_commit)
+
+def test_update_and_delete_lock_the_product_row(db, catalog):
+    product = ProductService.create_product(db, ProductCreate(name="x", price=10))
+    locked = []
+
+    def on_execute(state):
+        if state.is_select and state.statement._for_update_arg is not None:
+            locked.append(True)
+
+    event.listen(db, "do_orm_execute", on_execute)
+    ProductService.update_product(db, product.id, ProductUpdate(price=20))
+    ProductService.delete_product(db, product.id)
+    event.remove(db, "do_orm_execute", on_execute)
+    assert len(locked) == 2
+
+def test_price_bands_split_at_their_upper_bound():
+    keys = [key for key, _, _ in facets.PRICE_BANDS]
+    assert facets.price_band(0) == keys[0]
+    assert facets.price_band(facets.FACET_PRICE_BANDS[0]) == keys[1]
+    assert facets.price_band(10_000) == keys[-1]
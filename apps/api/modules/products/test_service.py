@@ -0,0 +1,53 @@
+import uuid
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from apps.api.modules.auth.database import get_db
+from apps.api.modules.products.models import Collection, Product, ProductCategory
+from apps.api.modules.products.router import router
+from apps.api.modules.products.schemas import ProductCreate, ProductFilter, ProductResponse
+from apps.api.modules.products.service import ProductService
+
+def _seed(db) -> str:
+    """Products that exercise every relation; returns a search term matching only them"""
+    marker = uuid.uuid4().hex[:8]
+    category = ProductCategory(name=f"cat-{marker}")
+    collection = Collection(name=f"col-{marker}", season="spring", year=2026)
+    db.add_all([category, collection])
+    db.commit()
+    for i, (price, tags) in enumerate([(12.5, ["red", "blue"]), (30, []), (75, ["red"])]):
+        ProductService.create_product(db, ProductCreate(
+            name=f"{marker} bandana {i}", price=price, image_url=f"/media/catalog/{marker}-{i}.png" if i else None,
+            category_id=category.id if i != 1 else None, collection_id=collection.id if i == 2 else None,
+            tags=[f"{tag}-{marker}" for tag in tags]
+        ))
+    return marker
+
+def test_list_matches_orm_serialization(db):
+    marker = _seed(db)
+    result = ProductService.list_products(db, ProductFilter(search=marker, sort_by="price"))
+    assert result.total == 3
+    expected = [ProductResponse.model_validate(db.get(Product, p.id)).model_dump() for p in result.products]
+    listed = [p.model_dump() for p in result.products]
+    # Tag order isn't part of the contract
+    for product in expected + listed:
+        product["tags"].sort(key=lambda tag: tag["name"])
+    assert listed == expected
+    assert [p["price"] for p in listed] == [12.5, 30, 75]
+
+def test_tag_filter_and_pagination(db):
+    marker = _seed(db)
+    result = ProductService.list_products(db, ProductFilter(tag=f"red-{marker}", page_size=1, sort_order="desc", sort_by="price"))
+    assert (result.total, result.total_pages) == (2, 2)
+    assert [p.price for p in result.products] == [75]
+    assert {tag.name for tag in result.products[0].tags} == {f"red-{marker}"}
+
+def test_router_json_matches_the_response_model(db):
+    marker = _seed(db)
+    app = FastAPI()
+    app.include_router(router, prefix="/api/products")
+    app.dependency_overrides[get_db] = lambda: db
+    response = TestClient(app).get("/api/products", params={"search": marker, "sort_by": "price"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    expected = ProductService.list_products(db, ProductFilter(search=marker, sort_by="price")).model_dump(mode="json")
+    assert response.json() == expected
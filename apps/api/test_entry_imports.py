@@ -0,0 +1,20 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+
+BUDGET = json.loads((Path(__file__).parent / "benchmarks" / "import_budget.json").read_text())
+ROOT = Path(__file__).resolve().parents[2]
+
+@pytest.mark.parametrize("module", sorted(BUDGET))
+def test_entry_modules_leave_heavy_imports_for_later(module):
+    # A fresh interpreter, since this one has already imported whatever the other tests needed
+    script = f"import json, sys; import {module}; print(json.dumps(sorted(sys.modules)))"
+    output = subprocess.run(
+        [sys.executable, "-c", script], cwd=ROOT, env=os.environ, capture_output=True, text=True, check=True
+    ).stdout
+    imported = json.loads(output.splitlines()[-1])
+    for forbidden in BUDGET[module]["forbidden"]:
+        assert not [name for name in imported if name == forbidden or name.startswith(forbidden + ".")], forbidden
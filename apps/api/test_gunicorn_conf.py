@@ -0,0 +1,40 @@
+import os
+import runpy
+import pytest
+
+CONFIG = os.path.join(os.path.dirname(__file__), "gunicorn.conf.py")
+SHARED = {"PROGRESS_BACKEND": "redis", "GENERATION_QUOTA_BACKEND": "redis"}
+
+def _load(monkeypatch, **env) -> dict:
+    for name in ("PROGRESS_BACKEND", "GENERATION_QUOTA_BACKEND", "PROMETHEUS_MULTIPROC_DIR"):
+        monkeypatch.delenv(name, raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    return runpy.run_path(CONFIG)
+
+@pytest.mark.parametrize("env", [
+    {},
+    {"PROGRESS_BACKEND": "redis"},
+    {"GENERATION_QUOTA_BACKEND": "redis"},
+])
+def test_several_workers_with_per_process_backends_refuse_to_start(monkeypatch, tmp_path, env):
+    with pytest.raises(RuntimeError, match="must be 'redis'"):
+        _load(monkeypatch, WEB_CONCURRENCY="2", PROMETHEUS_MULTIPROC_DIR=str(tmp_path), **env)
+
+def test_several_workers_need_multiprocess_metrics(monkeypatch):
+    with pytest.raises(RuntimeError, match="PROMETHEUS_MULTIPROC_DIR"):
+        _load(monkeypatch, WEB_CONCURRENCY="2", **SHARED)
+
+def test_shared_backends_or_a_single_worker_start(monkeypatch, tmp_path):
+    assert _load(monkeypatch, WEB_CONCURRENCY="1")["workers"] == 1
+
+    metrics_dir = tmp_path / "prometheus"
+    metrics_dir.mkdir()
+    (metrics_dir / "counter_1.db").write_bytes(b"stale")
+    config = _load(monkeypatch, WEB_CONCURRENCY="4", PROMETHEUS_MULTIPROC_DIR=str(metrics_dir), **SHARED)
+    assert config["workers"] == 4
+    assert list(metrics_dir.iterdir()) == [] # A previous run's files are cleared before the app loads
+    assert isinstance(config["graceful_timeout"], int) # gunicorn rejects anything else
+    assert config["graceful_timeout"] > (
+        config["SERVER_DRAIN_DELAY_SECONDS"] + config["SERVER_DRAIN_SECONDS"] + config["GENERATION_DRAIN_SECONDS"]
+    )
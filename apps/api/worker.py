@@ -0,0 +1,24 @@
+"""
+Celery app and worker entry point.
+
+Start workers with `celery -A apps.api.worker.celery_app worker`: this module
+only sets up Celery, logging and tracing, so workers don't import the FastAPI
+app, its routers or the model SDKs at boot. Tasks import what they need when
+they run. apps.api.main re-exports celery_app for code that publishes tasks.
+"""
+from celery import Celery
+from celery.signals import worker_process_init
+import os
+from apps.api.core.logging_config import setup_logging
+from apps.api.core.tracing import instrument_celery, setup_tracing
+
+redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
+celery_app = Celery("gen_wear", broker=redis_url, backend=redis_url)
+celery_app.conf.worker_hijack_root_logger = False # Keep the queue-based logging from setup_logging
+instrument_celery(celery_app)
+
+@worker_process_init.connect(weak=False)
+def _init_worker_process(**kwargs):
+    # Both are no-ops if the process already set them up (e.g. when imported via apps.api.main)
+    setup_logging()
+    setup_tracing("gen-wear-worker")
@@ -1,7 +1,7 @@
 'use client';
 
 import { useState, useEffect } from 'react';
-import { productsAPI, Product, Category, Collection, Tag } from '@/src/services/products';
+import { productsAPI, imageSrc, Product, Category, Collection, Tag } from '@/src/services/products';
 import { adminProductsAPI } from '@/src/services/admin-products';
 import { ProductForm } from '@/src/components/admin/products/ProductForm';
 import { Search, Plus, Pencil, Trash2, Filter } from 'lucide-react';
@@ -239,7 +239,7 @@ export default function AdminProductsPage() {
                                         <div className="flex items-center gap-3">
                                             <div className="w-12 h-12 rounded-lg bg-slate-700 overflow-hidden flex-shrink-0">
                                                 {product.image_url ? (
-                                                     <img src={product.image_url} alt={product.name} className="w-full h-full object-cover" />
+                                                     <img src={imageSrc(product, 'thumb')} alt={product.name} loading="lazy" className="w-full h-full object-cover" />
                                                 ) : (
                                                     <div className="w-full h-full flex items-center justify-center text-xl">👕</div>
                                                 )}
@@ -1,4 +1,4 @@
-import { Product } from '@/src/services/products';
+import { Product, imageSrc } from '@/src/services/products';
 import { ShoppingBag, Star } from 'lucide-react';
 import Link from 'next/link';
 
@@ -17,8 +17,9 @@ export function ProductCard({ product }: ProductCardProps) {
             <div className="relative aspect-[4/5] overflow-hidden bg-slate-700">
                 {product.image_url ? (
                     <img 
-                        src={product.image_url} 
+                        src={imageSrc(product, 'card')} 
                         alt={product.name}
+                        loading="lazy"
                         className="w-full h-full object-cover transform group-hover:scale-105 transition-transform duration-500"
                     />
                 ) : (
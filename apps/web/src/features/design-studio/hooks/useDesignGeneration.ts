@@ -1,15 +1,61 @@
-import { useState } from "react";
+import { useRef, useState } from "react";
 
 interface GenResponse {
     url: string;
     prompt: string;
 }
 
+interface JobResponse {
+    job_id: string;
+    events_url: string;
+}
+
+// Stage names streamed by the API while a generation job runs
+export type GenerationStage =
+    | "queued"
+    | "started"
+    | "cache_hit"
+    | "prompt_enhanced"
+    | "image_queued"
+    | "image_ready"
+    | "postprocessed"
+    | "completed"
+    | "failed";
+
+const STAGES: GenerationStage[] = [
+    "queued", "started", "cache_hit", "prompt_enhanced", "image_queued", "image_ready", "postprocessed",
+];
+
+// Follow a job's SSE stream until it completes; EventSource resumes with Last-Event-ID on reconnect
+function followJob(eventsUrl: string, onStage: (stage: GenerationStage, data: any) => void): Promise<GenResponse> {
+    return new Promise((resolve, reject) => {
+        const source = new EventSource(`${process.env.NEXT_PUBLIC_API_URL}${eventsUrl}`);
+        STAGES.forEach((stage) =>
+            source.addEventListener(stage, (event) => onStage(stage, JSON.parse((event as MessageEvent).data)))
+        );
+        source.addEventListener("completed", (event) => {
+            source.close();
+            resolve(JSON.parse((event as MessageEvent).data).result);
+        });
+        source.addEventListener("failed", (event) => {
+            source.close();
+            reject(new Error(JSON.parse((event as MessageEvent).data).detail));
+        });
+        source.onerror = () => {
+            // CLOSED means the server refused to resume (job expired or already finished)
+            if (source.readyState === EventSource.CLOSED) {
+                reject(new Error("Lost the generation progress stream"));
+            }
+        };
+    });
+}
+
 interface UseDesignGenerationReturn {
     prompt: string;
     setPrompt: (prompt: string) => void;
     generatedPrompt: string;
     isLoading: boolean;
+    stage: GenerationStage | undefined;
     textureUrl: string | undefined;
     generatePattern: () => Promise<void>;
 }
@@ -18,7 +64,9 @@ export function useDesignGeneration(): UseDesignGenerationReturn {
     const [prompt, setPrompt] = useState("");
     const [generatedPrompt, setGeneratedPrompt] = useState("");
     const [isLoading, setIsLoading] = useState(false);
+    const [stage, setStage] = useState<GenerationStage | undefined>();
     const [textureUrl, setTextureUrl] = useState<string | undefined>();
+    const lastPromptRef = useRef<string | null>(null);
 
     const generatePattern = async () => {
         if (!prompt) return;
@@ -26,12 +74,17 @@ export function useDesignGeneration(): UseDesignGenerationReturn {
         setIsLoading(true);
         // Clear previous results while loading
         setGeneratedPrompt("");
-        
+        setStage(undefined);
+
+        // Submitting the same prompt again asks for a new design, so skip the server's prompt cache
+        const useCache = prompt !== lastPromptRef.current;
+        lastPromptRef.current = prompt;
+
         try {
-            const response = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/generation`, {
+            const response = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/generation/jobs`, {
                 method: "POST",
                 headers: { "Content-Type": "application/json" },
-                body: JSON.stringify({ prompt }),
+                body: JSON.stringify({ prompt, use_cache: useCache }),
             });
 
             if (!response.ok) {
@@ -42,7 +95,14 @@ export function useDesignGeneration(): UseDesignGenerationReturn {
                 throw new Error(`API responded with status ${response.status}: ${errorText}`);
             }
 
-            const data: GenResponse = await response.json();
+            const job: JobResponse = await response.json();
+            const data = await followJob(job.events_url, (next, payload) => {
+                setStage(next);
+                if (next === "prompt_enhanced" && payload.prompt) {
+                    setGeneratedPrompt(payload.prompt);
+                }
+            });
+            setStage("completed");
             if (data.url) {
                 setTextureUrl(data.url);
             }
@@ -50,6 +110,7 @@ export function useDesignGeneration(): UseDesignGenerationReturn {
                 setGeneratedPrompt(data.prompt);
             }
         } catch (error) {
+            setStage("failed");
             console.error("Failed to generate:", error);
         } finally {
             setIsLoading(false);
@@ -61,6 +122,7 @@ export function useDesignGeneration(): UseDesignGenerationReturn {
         setPrompt,
         generatedPrompt,
         isLoading,
+        stage,
         textureUrl,
         generatePattern,
     };
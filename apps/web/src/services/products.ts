@@ -9,8 +9,13 @@ export interface Collection {
     description?: string;
     season?: string;
     year?: number;
+    image_url?: string;
+    image_variants?: ImageVariants;
 }
 
+export type ImageVariant = 'thumb' | 'card' | 'detail';
+export type ImageVariants = Record<ImageVariant, string>;
+
 export interface Tag {
     id: string;
     name: string;
@@ -24,6 +29,7 @@ export interface Product {
     category_id?: string;
     collection_id?: string;
     image_url?: string;
+    image_variants?: ImageVariants;
     stock: number;
     created_at: string;
     category?: Category;
@@ -58,6 +64,12 @@ export interface ProductListResponse {
     total_pages: number;
 }
 
+// Resized copy served by the API when available, falling back to the original image
+export function imageSrc(item: { image_url?: string; image_variants?: ImageVariants }, variant: ImageVariant) {
+    const path = item.image_variants?.[variant];
+    return path ? `${API_URL}${path}` : item.image_url;
+}
+
 export const productsAPI = {
     getProducts: async (filters: ProductFilters = {}) => {
         const params = new URLSearchParams();